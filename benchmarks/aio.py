@@ -0,0 +1,101 @@
+"""Benchmarks for writing and reading response series from asyncio code."""
+
+import asyncio
+import datetime
+import os
+import time
+
+import numpy as np
+from pynwb import NWBHDF5IO, NWBFile
+
+from ndx_photometry import FiberPhotometryResponseSeries
+from ndx_photometry.aio import AsyncResponseSeriesStream, async_iter_blocks, async_write
+
+# ten minutes of four fibers at 1 kHz, acquired in blocks of 100 ms
+RATE = 1000.0
+N_FIBERS = 4
+N_BLOCKS = 6000
+BLOCK_SAMPLES = 100
+TICK = 0.001
+
+
+def _nwbfile():
+    return NWBFile(
+        session_description="benchmark",
+        identifier="benchmark",
+        session_start_time=datetime.datetime.now(datetime.timezone.utc),
+    )
+
+
+async def _ticker(stalls, stop):
+    """Record the largest delay of the event loop, as seen by a task that wakes up every millisecond."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        stalls.append(time.perf_counter() - start - TICK)
+
+
+async def _stream(path):
+    block = np.zeros((BLOCK_SAMPLES, N_FIBERS), dtype=np.float32)
+    nwbfile = _nwbfile()
+    async with AsyncResponseSeriesStream(rate=RATE) as stream:
+        await stream.append(block)
+        nwbfile.add_acquisition(await stream.create_series(name="response", unit="F"))
+        write = asyncio.ensure_future(async_write(path=path, nwbfile=nwbfile))
+        for _ in range(N_BLOCKS - 1):
+            await stream.append(block)
+    await write
+
+
+async def _blocking(path):
+    nwbfile = _nwbfile()
+    data = np.zeros((N_BLOCKS * BLOCK_SAMPLES, N_FIBERS), dtype=np.float32)
+    nwbfile.add_acquisition(FiberPhotometryResponseSeries(name="response", data=data, unit="F", rate=RATE))
+    with NWBHDF5IO(path, mode="w") as io:
+        io.write(nwbfile)
+
+
+async def _read(path):
+    async for _ in async_iter_blocks(path=path, name="response"):
+        pass
+
+
+def _max_stall(coroutine):
+    async def main():
+        stalls, stop = [], asyncio.Event()
+        ticker = asyncio.ensure_future(_ticker(stalls, stop))
+        # let the ticker start before the I/O
+        await asyncio.sleep(0)
+        await coroutine
+        stop.set()
+        await ticker
+        return max(stalls)
+
+    return asyncio.run(main())
+
+
+class AsyncIO:
+    """The time to stream a session into a file from asyncio code, and the largest event loop stall meanwhile."""
+
+    path = "aio.nwb"
+
+    def teardown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def time_stream_write(self):
+        asyncio.run(_stream(self.path))
+
+    def track_max_loop_stall_stream_write(self):
+        return _max_stall(_stream(self.path))
+
+    def track_max_loop_stall_blocking_write(self):
+        return _max_stall(_blocking(self.path))
+
+    def track_max_loop_stall_read(self):
+        asyncio.run(_stream(self.path))
+        return _max_stall(_read(self.path))
+
+    track_max_loop_stall_stream_write.unit = "seconds"
+    track_max_loop_stall_blocking_write.unit = "seconds"
+    track_max_loop_stall_read.unit = "seconds"
@@ -0,0 +1,73 @@
+"""Benchmarks for extracting peri-event windows from a FiberPhotometryResponseSeries."""
+
+import datetime
+
+import numpy as np
+from pynwb import NWBHDF5IO, NWBFile
+
+import ndx_photometry
+
+# one hour of four fibers at 1 kHz, written chunked and compressed
+RATE = 1000.0
+N_FIBERS = 4
+N_SAMPLES = int(3600 * RATE)
+N_EVENTS = 2000
+BEFORE = 2.0
+AFTER = 5.0
+
+
+class TimePeriEventWindows:
+    timeout = 600
+
+    def setup_cache(self):
+        nwbfile = NWBFile(
+            session_description="benchmark",
+            identifier="benchmark",
+            session_start_time=datetime.datetime.now(datetime.timezone.utc),
+        )
+        data = np.random.default_rng(0).standard_normal((N_SAMPLES, N_FIBERS)).astype(np.float32)
+        series = ndx_photometry.FiberPhotometryResponseSeries(name="response", data=data, unit="F", rate=RATE)
+        series.set_chunked_compression()
+        nwbfile.add_acquisition(series)
+        with NWBHDF5IO("alignment.nwb", mode="w") as io:
+            io.write(nwbfile)
+
+    def setup(self):
+        self.io = NWBHDF5IO("alignment.nwb", mode="r")
+        self.response = self.io.read().acquisition["response"]
+        self.event_times = np.random.default_rng(1).uniform(0, N_SAMPLES / RATE, size=N_EVENTS)
+
+    def teardown(self):
+        self.io.close()
+
+    def time_per_event_loop(self):
+        """One read per event, as done by hand in analysis code."""
+        np.stack(
+            [
+                self.response.get_window(start=t - BEFORE, stop=t + AFTER)[0][: int((BEFORE + AFTER) * RATE)]
+                for t in self.event_times
+                if BEFORE <= t <= N_SAMPLES / RATE - AFTER
+            ]
+        )
+
+    def time_get_peri_event_windows(self):
+        ndx_photometry.get_peri_event_windows(
+            series=self.response, event_times=self.event_times, before=BEFORE, after=AFTER
+        )
+
+    def time_iter_peri_event_windows(self):
+        for _ in ndx_photometry.iter_peri_event_windows(
+            series=self.response, event_times=self.event_times, before=BEFORE, after=AFTER, batch_size=200
+        ):
+            pass
+
+    def peakmem_get_peri_event_windows(self):
+        ndx_photometry.get_peri_event_windows(
+            series=self.response, event_times=self.event_times, before=BEFORE, after=AFTER
+        )
+
+    def peakmem_iter_peri_event_windows(self):
+        for _ in ndx_photometry.iter_peri_event_windows(
+            series=self.response, event_times=self.event_times, before=BEFORE, after=AFTER, batch_size=200
+        ):
+            pass
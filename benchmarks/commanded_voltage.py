@@ -0,0 +1,83 @@
+"""Benchmarks for writing the commanded voltages of a long session, as full arrays or compact data."""
+
+import datetime
+import os
+import time
+
+import numpy as np
+from pynwb import NWBHDF5IO, NWBFile
+
+import ndx_photometry
+
+# one hour at 10 kHz of two LEDs driven by the same 200 Hz sine, a constant level and one pulse per minute
+RATE = 10000.0
+N_SAMPLES = int(3600 * RATE)
+STORAGES = ["full", "compact"]
+
+
+def _voltages():
+    sine = 2.5 + 2.5 * np.sin(2 * np.pi * np.arange(50) / 50)
+    pulses = np.zeros(N_SAMPLES)
+    for start in range(0, N_SAMPLES, int(60 * RATE)):
+        pulses[start : start + int(RATE)] = 5.0
+    return dict(
+        sine_470=np.tile(sine, N_SAMPLES // len(sine)),
+        sine_405=np.tile(sine, N_SAMPLES // len(sine)),
+        constant=np.full(N_SAMPLES, 1.5),
+        pulses=pulses,
+    )
+
+
+def _write(path, voltages, storage):
+    nwbfile = NWBFile(
+        session_description="benchmark",
+        identifier="benchmark",
+        session_start_time=datetime.datetime.now(datetime.timezone.utc),
+    )
+    commanded_voltages = ndx_photometry.MultiCommandedVoltage()
+    for name, data in voltages.items():
+        if storage == "compact":
+            commanded_voltages.create_compact_commanded_voltage_series(name=name, data=data, power=1.0, rate=RATE)
+        else:
+            commanded_voltages.create_commanded_voltage_series(name=name, data=data, power=1.0, rate=RATE, unit="volts")
+    nwbfile.add_acquisition(commanded_voltages)
+    with NWBHDF5IO(path, mode="w") as io:
+        io.write(nwbfile)
+
+
+class CommandedVoltageIO:
+    params = STORAGES
+    param_names = ["storage"]
+    timeout = 600
+
+    def setup_cache(self):
+        voltages = _voltages()
+        for storage in STORAGES:
+            _write(f"voltages_{storage}.nwb", voltages, storage)
+
+    def setup(self, storage):
+        self.voltages = _voltages()
+
+    def teardown(self, storage):
+        if os.path.exists("write.nwb"):
+            os.remove("write.nwb")
+
+    def time_write(self, storage):
+        _write("write.nwb", self.voltages, storage)
+
+    def track_write_seconds(self, storage):
+        start = time.perf_counter()
+        _write("write.nwb", self.voltages, storage)
+        return time.perf_counter() - start
+
+    track_write_seconds.unit = "s"
+
+    def track_file_size(self, storage):
+        return os.path.getsize(f"voltages_{storage}.nwb") / 1024**2
+
+    track_file_size.unit = "MiB"
+
+    def time_read(self, storage):
+        with NWBHDF5IO(f"voltages_{storage}.nwb", mode="r") as io:
+            for series in io.read().acquisition["commanded_voltages"].commanded_voltage_series.values():
+                series.data[:]
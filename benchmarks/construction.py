@@ -0,0 +1,33 @@
+"""Benchmarks for constructing the tables and series of ndx-photometry in a loop."""
+
+import numpy as np
+
+from ndx_photometry import CommandedVoltageSeries, FiberPhotometryResponseSeries, FibersTable
+
+N_OBJECTS = 1000
+
+
+class TimeConstruct:
+
+    def setup(self):
+        self.fibers_table = FibersTable(description="fibers table")
+        self.fibers_table.add_rows(location=["VTA", "NAc"])
+        self.data = np.zeros((100, 2))
+
+    def time_fibers_table(self):
+        for _ in range(N_OBJECTS):
+            FibersTable(description="fibers table")
+
+    def time_response_series(self):
+        for i in range(N_OBJECTS):
+            FiberPhotometryResponseSeries(
+                name=f"response{i}",
+                data=self.data,
+                unit="F",
+                rate=30.0,
+                fibers=self.fibers_table.create_fiber_region(region=[0, 1], description="fibers"),
+            )
+
+    def time_commanded_voltage_series(self):
+        for i in range(N_OBJECTS):
+            CommandedVoltageSeries(name=f"voltage{i}", data=self.data[:, 0], unit="volts", rate=30.0, power=1.0)
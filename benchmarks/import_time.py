@@ -0,0 +1,36 @@
+"""Benchmarks for ``import ndx_photometry``.
+
+Each ``timeraw_`` benchmark runs in a fresh interpreter. ``pynwb`` is imported in the untimed setup so that only
+the cost of loading the ndx-photometry namespace and generating its classes is measured.
+"""
+
+
+def timeraw_import_without_cache():
+    code = "import ndx_photometry"
+    setup = "import os; os.environ['NDX_PHOTOMETRY_NO_CACHE'] = '1'; import pynwb"
+    return code, setup
+
+
+def timeraw_import_with_cache():
+    # the first run populates the cache, every later run reads it
+    code = "import ndx_photometry"
+    setup = "import os; os.environ.pop('NDX_PHOTOMETRY_NO_CACHE', None); import pynwb"
+    return code, setup
+
+
+def timeraw_import_and_get_one_class():
+    code = "from ndx_photometry import FibersTable"
+    setup = "import pynwb"
+    return code, setup
+
+
+def timeraw_import_and_get_all_classes():
+    code = "from ndx_photometry import *"
+    setup = "import pynwb"
+    return code, setup
+
+
+def timeraw_import_and_get_all_runtime_classes():
+    code = "from ndx_photometry import *"
+    setup = "import os; os.environ['NDX_PHOTOMETRY_RUNTIME_CLASSES'] = '1'; import pynwb"
+    return code, setup
@@ -0,0 +1,23 @@
+"""Benchmarks for creating regions of the metadata tables."""
+
+import numpy as np
+
+import ndx_photometry
+
+
+class TimeCreateFiberRegions:
+    params = [10, 100]
+    param_names = ["n_regions"]
+
+    def setup(self, n_regions):
+        self.fibers_table = ndx_photometry.FibersTable(description="fibers")
+        self.fibers_table.add_rows(location=[f"site {i}" for i in range(64)])
+        self.regions = np.random.randint(0, 64, size=(n_regions, 4))
+        self.region_lists = self.regions.tolist()
+
+    def time_create_fiber_region(self, n_regions):
+        for region in self.region_lists:
+            self.fibers_table.create_fiber_region(region=region, description="fibers")
+
+    def time_create_fiber_regions(self, n_regions):
+        self.fibers_table.create_fiber_regions(regions=self.regions, description="fibers")
@@ -0,0 +1,182 @@
+"""Benchmarks for writing and reading FiberPhotometryResponseSeries data, plain or chunked and compressed."""
+
+import datetime
+import os
+
+import numpy as np
+from pynwb import NWBHDF5IO, NWBFile
+
+import ndx_photometry
+
+# two hours of four fibers at 1 kHz
+RATE = 1000.0
+N_FIBERS = 4
+N_SAMPLES = int(2 * 3600 * RATE)
+WINDOW_SECONDS = 10.0
+LAYOUTS = ["plain", "chunked"]
+
+
+def _synthetic_data():
+    """Photobleaching decay plus noise, quantized like the output of a 16 bit acquisition board."""
+    rng = np.random.default_rng(0)
+    time = np.arange(N_SAMPLES, dtype=np.float32) / np.float32(RATE)
+    decay = 1.0 + 0.2 * np.exp(-time / 1800.0)
+    data = decay[:, None] + 0.01 * rng.standard_normal((N_SAMPLES, N_FIBERS), dtype=np.float32)
+    return (np.round(data * 2**14) / 2**14).astype(np.float32)
+
+
+def _write(path, data, layout):
+    nwbfile = NWBFile(
+        session_description="benchmark",
+        identifier="benchmark",
+        session_start_time=datetime.datetime.now(datetime.timezone.utc),
+    )
+    fibers_table = ndx_photometry.FibersTable(description="fibers")
+    fibers_table.add_rows(location=[f"site {i}" for i in range(N_FIBERS)])
+    nwbfile.create_processing_module(name="fibers", description="fibers").add(fibers_table)
+    series = ndx_photometry.FiberPhotometryResponseSeries(
+        name="response",
+        data=data,
+        unit="F",
+        rate=RATE,
+        fibers=fibers_table.create_fiber_region(region=slice(0, N_FIBERS), description="fibers"),
+    )
+    if layout == "chunked":
+        series.set_chunked_compression()
+    nwbfile.add_acquisition(series)
+    with NWBHDF5IO(path, mode="w") as io:
+        io.write(nwbfile)
+
+
+class ResponseSeriesIO:
+    params = LAYOUTS
+    param_names = ["layout"]
+    timeout = 600
+
+    def setup_cache(self):
+        data = _synthetic_data()
+        for layout in LAYOUTS:
+            _write(f"{layout}.nwb", data, layout)
+
+    def setup(self, layout):
+        self.data = _synthetic_data()
+        self.io = NWBHDF5IO(f"{layout}.nwb", mode="r")
+        self.response = self.io.read().acquisition["response"]
+        self.window_starts = np.random.default_rng(1).integers(0, N_SAMPLES - int(WINDOW_SECONDS * RATE), size=20)
+
+    def teardown(self, layout):
+        self.io.close()
+        if os.path.exists("write.nwb"):
+            os.remove("write.nwb")
+
+    def time_write(self, layout):
+        _write("write.nwb", self.data, layout)
+
+    def track_write_throughput(self, layout):
+        import time
+
+        start = time.perf_counter()
+        _write("write.nwb", self.data, layout)
+        return self.data.nbytes / 1024**2 / (time.perf_counter() - start)
+
+    track_write_throughput.unit = "MiB/s"
+
+    def track_file_size(self, layout):
+        return os.path.getsize(f"{layout}.nwb") / 1024**2
+
+    track_file_size.unit = "MiB"
+
+    def time_read_window(self, layout):
+        n_window = int(WINDOW_SECONDS * RATE)
+        for start in self.window_starts:
+            self.response.data[start : start + n_window]
+
+    def time_read_window_one_fiber(self, layout):
+        n_window = int(WINDOW_SECONDS * RATE)
+        for start in self.window_starts:
+            self.response.data[start : start + n_window, 0]
+
+    def time_repeated_scans(self, layout):
+        """Scan the whole trace several times, reading it from the file each time."""
+        for _ in range(5):
+            self.response.read_data(memmap=False).max(axis=0)
+
+    def time_repeated_scans_memmap(self, layout):
+        """Scan the whole trace several times over a memory map of the file (read into memory if compressed)."""
+        for _ in range(5):
+            self.response.read_data().max(axis=0)
+
+    def peakmem_read_data(self, layout):
+        self.response.read_data(memmap=False).max(axis=0)
+
+    def peakmem_read_data_memmap(self, layout):
+        self.response.read_data().max(axis=0)
+
+
+# half an hour of four fibers at 1 kHz, for the matrix of chunk sizes and compression settings
+N_SAMPLES_MATRIX = int(1800 * RATE)
+CHUNK_KIB = [64, 1024, 4096]
+COMPRESSIONS = ["none", "gzip1", "gzip4", "lzf"]
+
+
+def _write_matrix(path, data, chunk_kib, compression):
+    nwbfile = NWBFile(
+        session_description="benchmark",
+        identifier="benchmark",
+        session_start_time=datetime.datetime.now(datetime.timezone.utc),
+    )
+    series = ndx_photometry.FiberPhotometryResponseSeries(name="response", data=data, unit="F", rate=RATE)
+    kwargs = dict(chunk_bytes=chunk_kib * 1024, shuffle=compression != "none")
+    if compression == "none":
+        kwargs["compression"] = False
+    elif compression == "lzf":
+        kwargs["compression"] = "lzf"
+    else:
+        kwargs.update(compression="gzip", compression_opts=int(compression[-1]))
+    series.set_chunked_compression(**kwargs)
+    nwbfile.add_acquisition(series)
+    with NWBHDF5IO(path, mode="w") as io:
+        io.write(nwbfile)
+
+
+class ChunkingCompressionIO:
+    """Write and read the same series with each chunk size and compression setting."""
+
+    params = [CHUNK_KIB, COMPRESSIONS]
+    param_names = ["chunk_kib", "compression"]
+    timeout = 900
+
+    def setup_cache(self):
+        data = _synthetic_data()[:N_SAMPLES_MATRIX]
+        for chunk_kib in CHUNK_KIB:
+            for compression in COMPRESSIONS:
+                _write_matrix(f"matrix_{chunk_kib}_{compression}.nwb", data, chunk_kib, compression)
+
+    def setup(self, chunk_kib, compression):
+        self.data = _synthetic_data()[:N_SAMPLES_MATRIX]
+        self.io = NWBHDF5IO(f"matrix_{chunk_kib}_{compression}.nwb", mode="r")
+        self.response = self.io.read().acquisition["response"]
+        self.window_starts = np.random.default_rng(1).integers(
+            0, N_SAMPLES_MATRIX - int(WINDOW_SECONDS * RATE), size=20
+        )
+
+    def teardown(self, chunk_kib, compression):
+        self.io.close()
+        if os.path.exists("write_matrix.nwb"):
+            os.remove("write_matrix.nwb")
+
+    def time_write(self, chunk_kib, compression):
+        _write_matrix("write_matrix.nwb", self.data, chunk_kib, compression)
+
+    def track_file_size(self, chunk_kib, compression):
+        return os.path.getsize(f"matrix_{chunk_kib}_{compression}.nwb") / 1024**2
+
+    track_file_size.unit = "MiB"
+
+    def time_read_all(self, chunk_kib, compression):
+        self.response.data[:]
+
+    def time_read_window(self, chunk_kib, compression):
+        n_window = int(WINDOW_SECONDS * RATE)
+        for start in self.window_starts:
+            self.response.data[start : start + n_window]
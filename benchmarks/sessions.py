@@ -0,0 +1,93 @@
+"""Benchmarks for reading the metadata and response series of a directory of NWB files."""
+
+import datetime
+import os
+
+import numpy as np
+from pynwb import NWBHDF5IO, NWBFile
+
+import ndx_photometry
+
+# a cohort of 16 sessions of ten minutes of four fibers at 1 kHz
+N_SESSIONS = 16
+RATE = 1000.0
+N_FIBERS = 4
+N_SAMPLES = int(600 * RATE)
+DIRECTORY = "sessions"
+
+
+def _write_session(path, seed, n_series=1, n_samples=N_SAMPLES):
+    nwbfile = NWBFile(
+        session_description="benchmark",
+        identifier=f"session {seed}",
+        session_start_time=datetime.datetime.now(datetime.timezone.utc),
+    )
+    excitation_sources_table = ndx_photometry.ExcitationSourcesTable(description="excitation sources")
+    excitation_sources_table.add_rows(peak_wavelength=[470.0, 405.0], source_type=["LED", "LED"])
+    photodetectors_table = ndx_photometry.PhotodetectorsTable(description="photodetectors")
+    photodetectors_table.add_rows(peak_wavelength=[500.0], type=["PMT"])
+    fluorophores_table = ndx_photometry.FluorophoresTable(description="fluorophores")
+    fluorophores_table.add_rows(label=["dlight"], excitation_peak_wavelength=[470.0], emission_peak_wavelength=[516.0])
+    fibers_table = ndx_photometry.FibersTable(description="fibers")
+    fibers_table.add_rows(location=[f"site {i}" for i in range(N_FIBERS)])
+    nwbfile.add_lab_meta_data(
+        ndx_photometry.FiberPhotometry(
+            fibers=fibers_table,
+            excitation_sources=excitation_sources_table,
+            photodetectors=photodetectors_table,
+            fluorophores=fluorophores_table,
+        )
+    )
+    rng = np.random.default_rng(seed)
+    for i in range(n_series):
+        series = ndx_photometry.FiberPhotometryResponseSeries(
+            name="response" if i == 0 else f"response{i}",
+            data=rng.standard_normal((n_samples, N_FIBERS)).astype(np.float32),
+            unit="F",
+            rate=RATE,
+            fibers=fibers_table.create_fiber_region(region=slice(0, N_FIBERS), description="fibers"),
+        )
+        series.set_chunked_compression()
+        nwbfile.add_acquisition(series)
+    with NWBHDF5IO(path, mode="w") as io:
+        io.write(nwbfile)
+
+
+class TimeScanSessions:
+    timeout = 600
+
+    def setup_cache(self):
+        os.makedirs(DIRECTORY, exist_ok=True)
+        for i in range(N_SESSIONS):
+            _write_session(os.path.join(DIRECTORY, f"session_{i:02d}.nwb"), i)
+
+    def time_read_session_loop(self):
+        for name in sorted(os.listdir(DIRECTORY)):
+            ndx_photometry.read_session(path=os.path.join(DIRECTORY, name), series=["response"])
+
+    def time_iter_sessions_one_worker(self):
+        for _ in ndx_photometry.iter_sessions(paths=DIRECTORY, series=["response"], max_workers=1):
+            pass
+
+    def time_iter_sessions(self):
+        for _ in ndx_photometry.iter_sessions(paths=DIRECTORY, series=["response"]):
+            pass
+
+    def time_iter_sessions_metadata(self):
+        for _ in ndx_photometry.iter_sessions(paths=DIRECTORY):
+            pass
+
+
+class TimeReadMetadata:
+    """Read the FiberPhotometry metadata of a file with many response series."""
+
+    def setup_cache(self):
+        _write_session("metadata.nwb", 0, n_series=200, n_samples=100)
+
+    def time_read(self):
+        with NWBHDF5IO("metadata.nwb", mode="r", load_namespaces=False) as io:
+            io.read().lab_meta_data["fiber_photometry"].fibers.to_dataframe()
+
+    def time_read_fiber_photometry(self):
+        with NWBHDF5IO("metadata.nwb", mode="r", load_namespaces=False) as io:
+            ndx_photometry.read_fiber_photometry(io=io).fibers.to_dataframe()
@@ -0,0 +1,300 @@
+"""Benchmarks for filling, exporting and reading the metadata tables."""
+
+import datetime
+import threading
+
+import numpy as np
+from pynwb import NWBHDF5IO, NWBFile
+
+import ndx_photometry
+
+
+class TimeFillFibersTable:
+    params = [100, 1000]
+    param_names = ["n_fibers"]
+
+    def setup(self, n_fibers):
+        self.fluorophores_table = ndx_photometry.FluorophoresTable(description="fluorophores")
+        self.fluorophores_table.add_rows(
+            label=["dlight", "gcamp", "rcamp"],
+            excitation_peak_wavelength=[470.0, 470.0, 560.0],
+            emission_peak_wavelength=[516.0, 512.0, 600.0],
+        )
+        self.locations = [f"site {i}" for i in range(n_fibers)]
+        self.coordinates = np.random.rand(n_fibers, 3)
+        self.fluorophores = [[i % 3, (i + 1) % 3] for i in range(n_fibers)]
+
+    def _fibers_table(self):
+        fibers_table = ndx_photometry.FibersTable(description="fibers")
+        fibers_table.add_column("fluorophores", "fluorophores", table=self.fluorophores_table, index=True)
+        return fibers_table
+
+    def time_add_row(self, n_fibers):
+        fibers_table = self._fibers_table()
+        for location, coordinates, fluorophores in zip(self.locations, self.coordinates, self.fluorophores):
+            fibers_table.add_row(location=location, coordinates=coordinates, fluorophores=fluorophores)
+
+    def time_add_rows(self, n_fibers):
+        fibers_table = self._fibers_table()
+        fibers_table.add_rows(location=self.locations, coordinates=self.coordinates, fluorophores=self.fluorophores)
+
+
+class TimeFillMetadataTables:
+    """Fill the excitation sources, photodetectors and fluorophores tables, one row at a time or in bulk."""
+
+    params = [["ExcitationSourcesTable", "PhotodetectorsTable", "FluorophoresTable"], [100, 1000]]
+    param_names = ["table", "n_rows"]
+
+    def setup(self, table, n_rows):
+        columns = {
+            "ExcitationSourcesTable": dict(peak_wavelength=[470.0, 405.0], source_type=["LED", "laser"]),
+            "PhotodetectorsTable": dict(peak_wavelength=[500.0, 600.0], type=["PMT", "photodiode"]),
+            "FluorophoresTable": dict(
+                label=["dlight", "gcamp"],
+                excitation_peak_wavelength=[470.0, 470.0],
+                emission_peak_wavelength=[516.0, 512.0],
+            ),
+        }[table]
+        self.table_cls = getattr(ndx_photometry, table)
+        self.columns = {name: [values[i % 2] for i in range(n_rows)] for name, values in columns.items()}
+        self.rows = [{name: values[i] for name, values in self.columns.items()} for i in range(n_rows)]
+
+    def time_add_row(self, table, n_rows):
+        metadata_table = self.table_cls(description="metadata")
+        for row in self.rows:
+            metadata_table.add_row(**row)
+
+    def time_add_rows(self, table, n_rows):
+        self.table_cls(description="metadata").add_rows(**self.columns)
+
+
+class TimeConcurrentFill:
+    """Fill the fibers table from 8 threads, with add_row under a lock or staged in a FiberPhotometryBuilder."""
+
+    params = [1000, 10000]
+    param_names = ["n_fibers"]
+
+    def setup(self, n_fibers):
+        self.locations = [[f"site {thread}-{i}" for i in range(n_fibers // 8)] for thread in range(8)]
+
+    def _fiber_photometry(self):
+        return ndx_photometry.FiberPhotometry(
+            fibers=ndx_photometry.FibersTable(description="fibers"),
+            excitation_sources=ndx_photometry.ExcitationSourcesTable(description="excitation sources"),
+            photodetectors=ndx_photometry.PhotodetectorsTable(description="photodetectors"),
+            fluorophores=ndx_photometry.FluorophoresTable(description="fluorophores"),
+        )
+
+    def _run(self, target):
+        threads = [threading.Thread(target=target, args=(locations,)) for locations in self.locations]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def time_add_row_with_lock(self, n_fibers):
+        fibers_table, lock = self._fiber_photometry().fibers, threading.Lock()
+
+        def fill(locations):
+            for location in locations:
+                with lock:
+                    fibers_table.add_row(location=location)
+
+        self._run(fill)
+
+    def time_builder(self, n_fibers):
+        builder = ndx_photometry.FiberPhotometryBuilder(fiber_photometry=self._fiber_photometry())
+
+        def fill(locations):
+            for location in locations:
+                builder.add_row(table="fibers", location=location)
+
+        self._run(fill)
+        builder.commit()
+
+
+class TimeExportFiberPhotometry:
+    params = [100, 1000]
+    param_names = ["n_fibers"]
+
+    def setup(self, n_fibers):
+        excitation_sources_table = ndx_photometry.ExcitationSourcesTable(description="excitation sources")
+        excitation_sources_table.add_rows(peak_wavelength=[470.0, 405.0], source_type=["LED", "LED"])
+        photodetectors_table = ndx_photometry.PhotodetectorsTable(description="photodetectors")
+        photodetectors_table.add_rows(peak_wavelength=[500.0, 600.0], type=["PMT", "photodiode"])
+        fluorophores_table = ndx_photometry.FluorophoresTable(description="fluorophores")
+        fluorophores_table.add_rows(
+            label=["dlight", "gcamp", "rcamp"],
+            excitation_peak_wavelength=[470.0, 470.0, 560.0],
+            emission_peak_wavelength=[516.0, 512.0, 600.0],
+        )
+        fibers_table = ndx_photometry.FibersTable(description="fibers")
+        fibers_table.add_column("excitation_source", "excitation source", table=excitation_sources_table)
+        fibers_table.add_column("photodetector", "photodetector", table=photodetectors_table)
+        fibers_table.add_column("fluorophores", "fluorophores", table=fluorophores_table, index=True)
+        fibers_table.add_rows(
+            location=[f"site {i}" for i in range(n_fibers)],
+            excitation_source=[i % 2 for i in range(n_fibers)],
+            photodetector=[i % 2 for i in range(n_fibers)],
+            fluorophores=[[i % 3, (i + 1) % 3] for i in range(n_fibers)],
+        )
+        self.fiber_photometry = ndx_photometry.FiberPhotometry(
+            fibers=fibers_table,
+            excitation_sources=excitation_sources_table,
+            photodetectors=photodetectors_table,
+            fluorophores=fluorophores_table,
+        )
+
+    def time_to_dataframe(self, n_fibers):
+        self.fiber_photometry.to_dataframe()
+
+    def time_join_table_dataframes(self, n_fibers):
+        """Join the DataFrames of each table in pandas, as done without to_dataframe."""
+        fiber_photometry = self.fiber_photometry
+        fibers = fiber_photometry.fibers.to_dataframe(index=True).explode("fluorophores")
+        for name, table in [
+            ("excitation_source", fiber_photometry.excitation_sources),
+            ("photodetector", fiber_photometry.photodetectors),
+            ("fluorophores", fiber_photometry.fluorophores),
+        ]:
+            fibers = fibers.merge(
+                table.to_dataframe().add_prefix(f"{name}_"), left_on=name, right_index=True, how="left"
+            )
+
+
+def _write_fibers_file(path, n_fibers):
+    excitation_sources_table = ndx_photometry.ExcitationSourcesTable(description="excitation sources")
+    excitation_sources_table.add_rows(peak_wavelength=[470.0, 405.0], source_type=["LED", "LED"])
+    photodetectors_table = ndx_photometry.PhotodetectorsTable(description="photodetectors")
+    photodetectors_table.add_rows(peak_wavelength=[500.0, 600.0], type=["PMT", "photodiode"])
+    fluorophores_table = ndx_photometry.FluorophoresTable(description="fluorophores")
+    fluorophores_table.add_rows(
+        label=["dlight", "gcamp", "rcamp"],
+        excitation_peak_wavelength=[470.0, 470.0, 560.0],
+        emission_peak_wavelength=[516.0, 512.0, 600.0],
+    )
+    fibers_table = ndx_photometry.FibersTable(description="fibers")
+    fibers_table.add_column("excitation_source", "excitation source", table=excitation_sources_table)
+    fibers_table.add_column("photodetector", "photodetector", table=photodetectors_table)
+    fibers_table.add_column("fluorophores", "fluorophores", table=fluorophores_table, index=True)
+    fibers_table.add_rows(
+        location=[f"site {i}" for i in range(n_fibers)],
+        excitation_source=[i % 2 for i in range(n_fibers)],
+        photodetector=[i % 2 for i in range(n_fibers)],
+        fluorophores=[[i % 3, (i + 1) % 3] for i in range(n_fibers)],
+    )
+    nwbfile = NWBFile(
+        session_description="benchmark",
+        identifier="benchmark",
+        session_start_time=datetime.datetime.now(datetime.timezone.utc),
+    )
+    nwbfile.add_lab_meta_data(
+        ndx_photometry.FiberPhotometry(
+            fibers=fibers_table,
+            excitation_sources=excitation_sources_table,
+            photodetectors=photodetectors_table,
+            fluorophores=fluorophores_table,
+        )
+    )
+    with NWBHDF5IO(path, mode="w") as io:
+        io.write(nwbfile)
+
+
+class TimeReadFibersTable:
+    """Read the rows of a fibers table from a file, resolving the referenced rows or not."""
+
+    params = [1000, 5000]
+    param_names = ["n_fibers"]
+    timeout = 300
+
+    def setup_cache(self):
+        for n_fibers in self.params:
+            _write_fibers_file(f"fibers_{n_fibers}.nwb", n_fibers)
+
+    def setup(self, n_fibers):
+        self.io = NWBHDF5IO(f"fibers_{n_fibers}.nwb", mode="r")
+        self.fibers_table = self.io.read().lab_meta_data["fiber_photometry"].fibers
+
+    def teardown(self, n_fibers):
+        self.io.close()
+
+    def time_getitem(self, n_fibers):
+        self.fibers_table[:]
+
+    def time_to_dataframe(self, n_fibers):
+        self.fibers_table.to_dataframe()
+
+    def time_read_rows_index(self, n_fibers):
+        self.fibers_table.read_rows(references="index")
+
+    def time_read_rows_proxy(self, n_fibers):
+        self.fibers_table.read_rows()
+
+    def time_read_rows_resolve_all(self, n_fibers):
+        for reference in self.fibers_table.read_rows()["fluorophores"]:
+            reference.resolve()
+
+    def peakmem_to_dataframe(self, n_fibers):
+        self.fibers_table.to_dataframe()
+
+    def peakmem_read_rows_proxy(self, n_fibers):
+        self.fibers_table.read_rows()
+
+
+class TimeValidateReferences:
+    """Check the references of a fibers table in a file."""
+
+    params = [1000, 100000]
+    param_names = ["n_fibers"]
+    timeout = 300
+
+    def setup_cache(self):
+        for n_fibers in self.params:
+            _write_fibers_file(f"validate_{n_fibers}.nwb", n_fibers)
+
+    def time_validate_references(self, n_fibers):
+        ndx_photometry.validate_references(paths=f"validate_{n_fibers}.nwb")
+
+    def time_check_rows(self, n_fibers):
+        """Check the references row by row through the objects of the file, as done without validate_references."""
+        with NWBHDF5IO(f"validate_{n_fibers}.nwb", mode="r") as io:
+            fibers_table = io.read().lab_meta_data["fiber_photometry"].fibers
+            for name in ["excitation_source", "photodetector"]:
+                column = fibers_table[name]
+                n_rows = len(column.table)
+                assert all(0 <= row < n_rows for row in column.data)
+
+
+class TimeRepeatedLookups:
+    """Look up the fluorophores, excitation source and photodetector of each fiber, over several analysis passes."""
+
+    params = [64]
+    param_names = ["n_fibers"]
+    n_passes = 20
+
+    def setup_cache(self):
+        for n_fibers in self.params:
+            _write_fibers_file(f"lookups_{n_fibers}.nwb", n_fibers)
+
+    def setup(self, n_fibers):
+        self.io = NWBHDF5IO(f"lookups_{n_fibers}.nwb", mode="r")
+        self.fiber_photometry = self.io.read().lab_meta_data["fiber_photometry"]
+
+    def teardown(self, n_fibers):
+        self.io.close()
+
+    def time_regions(self, n_fibers):
+        fibers = self.fiber_photometry.fibers
+        for _ in range(self.n_passes):
+            for fiber in range(n_fibers):
+                fibers["fluorophores"][fiber]["label"].tolist()
+                fibers["excitation_source"][fiber]["peak_wavelength"].item()
+                fibers["photodetector"][fiber]["type"].item()
+
+    def time_row_cache(self, n_fibers):
+        fiber_photometry = self.fiber_photometry
+        for _ in range(self.n_passes):
+            for fiber in range(n_fibers):
+                [row["label"] for row in fiber_photometry.get_referenced_rows(row=fiber, column="fluorophores")]
+                fiber_photometry.get_referenced_rows(row=fiber, column="excitation_source")[0]["peak_wavelength"]
+                fiber_photometry.get_referenced_rows(row=fiber, column="photodetector")[0]["type"]
@@ -0,0 +1,79 @@
+"""Benchmarks for reading time windows of a FiberPhotometryResponseSeries from a multi-GB file."""
+
+import datetime
+
+import numpy as np
+from pynwb import NWBHDF5IO, NWBFile
+
+import ndx_photometry
+
+# two hours of four fibers at 10 kHz, about 2.3 GB of data
+RATE = 10_000.0
+N_FIBERS = 4
+N_SAMPLES = int(2 * 3600 * RATE)
+BLOCK_SIZE = int(10 * RATE)
+WINDOW_SECONDS = 5.0
+N_WINDOWS = 10
+TIMING = ["rate", "timestamps"]
+
+
+def _blocks(timing):
+    """Yield ten seconds of synthetic samples at a time, with jittered timestamps if `timing` is "timestamps"."""
+    rng = np.random.default_rng(0)
+    for start in range(0, N_SAMPLES, BLOCK_SIZE):
+        n = min(BLOCK_SIZE, N_SAMPLES - start)
+        data = rng.standard_normal((n, N_FIBERS))
+        if timing == "rate":
+            yield data
+        else:
+            yield data, (start + np.arange(n) + rng.uniform(0.0, 0.5, size=n)) / RATE
+
+
+class TimeGetWindow:
+    params = TIMING
+    param_names = ["timing"]
+    timeout = 1200
+    number = 1
+    repeat = 3
+
+    def setup_cache(self):
+        for timing in TIMING:
+            nwbfile = NWBFile(
+                session_description="benchmark",
+                identifier="benchmark",
+                session_start_time=datetime.datetime.now(datetime.timezone.utc),
+            )
+            stream = ndx_photometry.ResponseSeriesStream(
+                blocks=_blocks(timing), rate=RATE if timing == "rate" else None
+            )
+            nwbfile.add_acquisition(stream.create_series(name="response", unit="F"))
+            with NWBHDF5IO(f"{timing}.nwb", mode="w") as io:
+                io.write(nwbfile, exhaust_dci=False)
+
+    def setup(self, timing):
+        self.io = NWBHDF5IO(f"{timing}.nwb", mode="r")
+        self.response = self.io.read().acquisition["response"]
+        rng = np.random.default_rng(1)
+        self.starts = rng.uniform(0, N_SAMPLES / RATE - WINDOW_SECONDS, size=N_WINDOWS)
+
+    def teardown(self, timing):
+        self.io.close()
+
+    def time_get_window(self, timing):
+        for start in self.starts:
+            self.response.get_window(start=start, stop=start + WINDOW_SECONDS)
+
+    def time_get_window_one_fiber(self, timing):
+        for start in self.starts:
+            self.response.get_window(start=start, stop=start + WINDOW_SECONDS, fibers=0)
+
+    def time_full_load(self, timing):
+        """Load the whole series and slice it in memory, as analysis code does without get_window."""
+        data = self.response.data[:]
+        if timing == "rate":
+            timestamps = self.response.starting_time + np.arange(len(data)) / self.response.rate
+        else:
+            timestamps = self.response.timestamps[:]
+        for start in self.starts:
+            mask = (timestamps >= start) & (timestamps < start + WINDOW_SECONDS)
+            data[mask]
@@ -1,5 +1,6 @@
 import os
-from pynwb import load_namespaces, get_class
+
+from ._spec_cache import get_global_type_map, load_namespace
 
 try:
     from importlib.resources import files
@@ -15,35 +16,59 @@ __spec_path = __location_of_this_file / "spec" / "ndx-photometry.namespace.yaml"
 if not os.path.exists(__spec_path):
     __spec_path = __location_of_this_file.parent.parent.parent / "spec" / "ndx-photometry.namespace.yaml"
 
-# Load the namespace
-load_namespaces(str(__spec_path))
-
-# TODO: Define your classes here to make them accessible at the package level.
-# Either have PyNWB generate a class from the spec using `get_class` as shown
-# below or write a custom class and register it using the class decorator
-# `@register_class("TetrodeSeries", "ndx-photometry")`
-from .photometry import (
-    FibersTable,
-    FluorophoresTable,
-    PhotodetectorsTable,
-    ExcitationSourcesTable,
-    FiberPhotometryResponseSeries,
-)
-
-(
-    CommandedVoltageSeries,
-    DeconvolvedFiberPhotometryResponseSeries,
-    MultiCommandedVoltage,
-    FiberPhotometry,
-) = [
-    get_class(x, "ndx-photometry")
-    for x in (
-        "CommandedVoltageSeries",
-        "DeconvolvedFiberPhotometryResponseSeries",
-        "MultiCommandedVoltage",
-        "FiberPhotometry",
-    )
-]
+from . import instrumentation
+
+# Keep the timings of the import for the instrumentations entered with startup=True
+instrumentation._importing = True
+
+# Load the namespace, from the on-disk cache when it matches the spec files and the installed pynwb/hdmf versions
+with instrumentation._timed("load_namespaces"):
+    load_namespace(str(__spec_path))
+
+# The classes for the neurodata types are generated from the spec ahead of time by `src/spec/generate_classes.py`,
+# extended in `photometry.py`, and made accessible at the package level. If the spec files changed since the classes
+# were generated, they are generated by PyNWB at runtime instead, lazily on first access, e.g.
+# `from ndx_photometry import FibersTable`, so that importing the package does not generate all of them.
+from . import photometry
+
+photometry._use_generated_classes(str(__spec_path))
+
+from .photometry import get_chunk_shape, get_compression_options, get_photometry_class
+from .streaming import ResponseSeriesStream
+from .alignment import get_peri_event_windows, iter_peri_event_windows
+from .sessions import iter_sessions, read_fiber_photometry, read_session
+from .memmap import as_memmap
+from .compact import PeriodicData, RunLengthData, compact_voltage
+from .lazy import RowReference
+from .demodulation import demodulate
+from .processing import compute_delta_f_over_f, downsample, fit_isosbestic
+from .instrumentation import Instrumentation, TimingEvent, instrument
+from .validation import Violation, validate_references
+from .builder import FiberPhotometryBuilder, StagedRow
+
+__all__ = list(photometry.NEURODATA_TYPES)
+
+# Without access to the global type map, classes generated when reading a file could not be shared with the ones
+# exposed here, so generate all of them now
+if get_global_type_map() is None:
+    for __neurodata_type in __all__:
+        globals()[__neurodata_type] = get_photometry_class(__neurodata_type)
+
+instrumentation._importing = False
+
+
+def __getattr__(name):
+    if name in __all__:
+        cls = get_photometry_class(name)
+        # store the class so that later lookups do not go through __getattr__
+        globals()[name] = cls
+        return cls
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
 
 # Remove these functions from the package
-del load_namespaces, get_class
+del load_namespace, get_global_type_map
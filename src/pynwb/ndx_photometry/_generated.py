@@ -0,0 +1,485 @@
+"""The classes of the ndx-photometry neurodata types, generated from the spec files by
+``src/spec/generate_classes.py``. Do not edit this file, run ``python src/spec/create_extension_spec.py`` instead.
+
+The fields, columns and constructor arguments of each class are the ones that hdmf generates at runtime from the
+spec, with the versions of hdmf and pynwb below. With other versions, the classes are generated at runtime instead.
+"""
+
+import numpy as np
+from hdmf.common.table import DynamicTable, DynamicTableRegion, MeaningsTable, VectorData
+from hdmf.container import MultiContainerInterface
+from hdmf.utils import docval, get_docval, popargs
+from pynwb.base import TimeSeries
+from pynwb.core import NWBDataInterface
+from pynwb.file import LabMetaData
+
+# the hash of the spec files, and the versions of hdmf and pynwb, that the classes were generated from
+SPEC_HASH = "f8129e5361b47cd32cb37584bb805579"
+HDMF_VERSION = "6.2.0"
+PYNWB_VERSION = "4.2.0"
+
+
+def _inherited(base, required, exclude=()):
+    """Return the required or the optional constructor arguments of a base class, except the excluded ones."""
+    args = get_docval(base.__init__)
+    return [arg for arg in args if ("default" not in arg) == required and arg["name"] not in exclude]
+
+
+class FibersTable(DynamicTable, MultiContainerInterface):
+    """Extends DynamicTable to hold various Fibers"""
+
+    __columns__ = (
+        {"name": "location", "description": "location of fiber", "required": True, "class": VectorData},
+        {
+            "name": "coordinates",
+            "description": "Fiber placement in stereotactic coordinates (AP, ML, DV) mm relative to Bregma",
+            "required": False,
+            "class": VectorData,
+        },
+        {"name": "notes", "description": "description of fiber", "required": False, "class": VectorData},
+        {"name": "fiber_model_number", "description": "fiber model number", "required": False, "class": VectorData},
+        {
+            "name": "dichroic_model_number",
+            "description": "dichroic model number",
+            "required": False,
+            "class": VectorData,
+        },
+    )
+
+    __clsconf__ = [
+        {
+            "attr": "meanings_tables__meanings_tables",
+            "type": MeaningsTable,
+            "add": "add_meanings_tables__meanings_tables",
+            "get": "get_meanings_tables__meanings_tables",
+            "create": "create_meanings_tables__meanings_tables",
+        },
+    ]
+
+    @docval(
+        *_inherited(DynamicTable, True, exclude=("name",)),
+        *_inherited(DynamicTable, False, exclude=("name",)),
+        {
+            "name": "meanings_tables__meanings_tables",
+            "type": (list, tuple, dict, MeaningsTable),
+            "doc": "MeaningsTable objects that provide meanings for values in VectorData columns within this "
+            "DynamicTable. Tables should be named according to the column they provide meanings for with a "
+            '"_meanings" suffix. e.g., if a VectorData column is named "stimulus_type", the corresponding '
+            'MeaningsTable should be named "stimulus_type_meanings".',
+            "default": None,
+        },
+        {"name": "skip_post_init", "type": bool, "doc": "bool to skip post_init", "default": False},
+    )
+    def __init__(self, **kwargs):
+        popargs("skip_post_init", kwargs)
+        meanings_tables__meanings_tables = popargs("meanings_tables__meanings_tables", kwargs)
+        super().__init__(name="fibers", **kwargs)
+        self.meanings_tables__meanings_tables = meanings_tables__meanings_tables
+
+
+class PhotodetectorsTable(DynamicTable, MultiContainerInterface):
+    """Extends DynamicTable to hold various Photodetectors"""
+
+    __columns__ = (
+        {
+            "name": "peak_wavelength",
+            "description": "peak wavelength of photodetector",
+            "required": False,
+            "class": VectorData,
+        },
+        {"name": "type", "description": '"PMT" or "photodiode"', "required": True, "class": VectorData},
+        {"name": "gain", "description": "gain on the photodetector", "required": False, "class": VectorData},
+        {
+            "name": "model_number",
+            "description": "model number of the photodetector",
+            "required": False,
+            "class": VectorData,
+        },
+    )
+
+    __clsconf__ = [
+        {
+            "attr": "meanings_tables__meanings_tables",
+            "type": MeaningsTable,
+            "add": "add_meanings_tables__meanings_tables",
+            "get": "get_meanings_tables__meanings_tables",
+            "create": "create_meanings_tables__meanings_tables",
+        },
+    ]
+
+    @docval(
+        *_inherited(DynamicTable, True, exclude=("name",)),
+        *_inherited(DynamicTable, False, exclude=("name",)),
+        {
+            "name": "meanings_tables__meanings_tables",
+            "type": (list, tuple, dict, MeaningsTable),
+            "doc": "MeaningsTable objects that provide meanings for values in VectorData columns within this "
+            "DynamicTable. Tables should be named according to the column they provide meanings for with a "
+            '"_meanings" suffix. e.g., if a VectorData column is named "stimulus_type", the corresponding '
+            'MeaningsTable should be named "stimulus_type_meanings".',
+            "default": None,
+        },
+        {"name": "skip_post_init", "type": bool, "doc": "bool to skip post_init", "default": False},
+    )
+    def __init__(self, **kwargs):
+        popargs("skip_post_init", kwargs)
+        meanings_tables__meanings_tables = popargs("meanings_tables__meanings_tables", kwargs)
+        super().__init__(name="photodetectors", **kwargs)
+        self.meanings_tables__meanings_tables = meanings_tables__meanings_tables
+
+
+class ExcitationSourcesTable(DynamicTable, MultiContainerInterface):
+    """Extends DynamicTable to hold various Excitation Sources"""
+
+    __columns__ = (
+        {
+            "name": "peak_wavelength",
+            "description": "peak wavelength of the excitation source",
+            "required": True,
+            "class": VectorData,
+        },
+        {"name": "source_type", "description": '"LED" or "laser"', "required": True, "class": VectorData},
+        {
+            "name": "commanded_voltage",
+            "description": "references CommandedVoltageSeries",
+            "required": False,
+            "class": VectorData,
+        },
+        {
+            "name": "output",
+            "description": "excitation output, references TimeSeries",
+            "required": False,
+            "class": VectorData,
+        },
+        {
+            "name": "model_number",
+            "description": "model number of the excitation source",
+            "required": False,
+            "class": VectorData,
+        },
+    )
+
+    __clsconf__ = [
+        {
+            "attr": "meanings_tables__meanings_tables",
+            "type": MeaningsTable,
+            "add": "add_meanings_tables__meanings_tables",
+            "get": "get_meanings_tables__meanings_tables",
+            "create": "create_meanings_tables__meanings_tables",
+        },
+    ]
+
+    @docval(
+        *_inherited(DynamicTable, True, exclude=("name",)),
+        *_inherited(DynamicTable, False, exclude=("name",)),
+        {
+            "name": "meanings_tables__meanings_tables",
+            "type": (list, tuple, dict, MeaningsTable),
+            "doc": "MeaningsTable objects that provide meanings for values in VectorData columns within this "
+            "DynamicTable. Tables should be named according to the column they provide meanings for with a "
+            '"_meanings" suffix. e.g., if a VectorData column is named "stimulus_type", the corresponding '
+            'MeaningsTable should be named "stimulus_type_meanings".',
+            "default": None,
+        },
+        {"name": "skip_post_init", "type": bool, "doc": "bool to skip post_init", "default": False},
+    )
+    def __init__(self, **kwargs):
+        popargs("skip_post_init", kwargs)
+        meanings_tables__meanings_tables = popargs("meanings_tables__meanings_tables", kwargs)
+        super().__init__(name="excitation_sources", **kwargs)
+        self.meanings_tables__meanings_tables = meanings_tables__meanings_tables
+
+
+class FluorophoresTable(DynamicTable, MultiContainerInterface):
+    """Extends DynamicTable to hold various Fluorophores"""
+
+    __columns__ = (
+        {"name": "label", "description": "name of fluorophore", "required": True, "class": VectorData},
+        {"name": "location", "description": "injection brain region name", "required": False, "class": VectorData},
+        {
+            "name": "coordinates",
+            "description": "Fluorophore injection location in stereotactic coordinates (AP, ML, DV) mm relative to "
+            "Bregma",
+            "required": False,
+            "class": VectorData,
+        },
+        {
+            "name": "emission_peak_wavelength",
+            "description": "Peak wavelength of emission of the fluorophore, in nanometers.",
+            "required": True,
+            "class": VectorData,
+        },
+        {
+            "name": "excitation_peak_wavelength",
+            "description": "Peak wavelength of excitation of the fluorophore, in nanometers.",
+            "required": True,
+            "class": VectorData,
+        },
+    )
+
+    __clsconf__ = [
+        {
+            "attr": "meanings_tables__meanings_tables",
+            "type": MeaningsTable,
+            "add": "add_meanings_tables__meanings_tables",
+            "get": "get_meanings_tables__meanings_tables",
+            "create": "create_meanings_tables__meanings_tables",
+        },
+    ]
+
+    @docval(
+        *_inherited(DynamicTable, True, exclude=("name",)),
+        *_inherited(DynamicTable, False, exclude=("name",)),
+        {
+            "name": "meanings_tables__meanings_tables",
+            "type": (list, tuple, dict, MeaningsTable),
+            "doc": "MeaningsTable objects that provide meanings for values in VectorData columns within this "
+            "DynamicTable. Tables should be named according to the column they provide meanings for with a "
+            '"_meanings" suffix. e.g., if a VectorData column is named "stimulus_type", the corresponding '
+            'MeaningsTable should be named "stimulus_type_meanings".',
+            "default": None,
+        },
+        {"name": "skip_post_init", "type": bool, "doc": "bool to skip post_init", "default": False},
+    )
+    def __init__(self, **kwargs):
+        popargs("skip_post_init", kwargs)
+        meanings_tables__meanings_tables = popargs("meanings_tables__meanings_tables", kwargs)
+        super().__init__(name="fluorophores", **kwargs)
+        self.meanings_tables__meanings_tables = meanings_tables__meanings_tables
+
+
+class FiberPhotometryResponseSeries(TimeSeries):
+    """Extends TimeSeries to hold Fiber Photometry data"""
+
+    __nwbfields__ = (
+        {"name": "fibers", "doc": "references row(s) of FibersTable", "child": True, "required_name": "fibers"},
+        {
+            "name": "excitation_sources",
+            "doc": "references row(s) of ExcitationSourcesTable",
+            "child": True,
+            "required_name": "excitation_sources",
+        },
+        {
+            "name": "fluorophores",
+            "doc": "references row(s) of FluorophoresTable",
+            "child": True,
+            "required_name": "fluorophores",
+        },
+        {
+            "name": "photodetectors",
+            "doc": "references row(s) of PhotodetectorsTable",
+            "child": True,
+            "required_name": "photodetectors",
+        },
+    )
+
+    @docval(
+        *_inherited(TimeSeries, True),
+        *_inherited(TimeSeries, False),
+        {
+            "name": "fibers",
+            "type": DynamicTableRegion,
+            "doc": "references row(s) of FibersTable",
+            "shape": [None],
+            "default": None,
+        },
+        {
+            "name": "excitation_sources",
+            "type": DynamicTableRegion,
+            "doc": "references row(s) of ExcitationSourcesTable",
+            "shape": [None],
+            "default": None,
+        },
+        {
+            "name": "fluorophores",
+            "type": DynamicTableRegion,
+            "doc": "references row(s) of FluorophoresTable",
+            "shape": [None],
+            "default": None,
+        },
+        {
+            "name": "photodetectors",
+            "type": DynamicTableRegion,
+            "doc": "references row(s) of PhotodetectorsTable",
+            "shape": [None],
+            "default": None,
+        },
+        {"name": "skip_post_init", "type": bool, "doc": "bool to skip post_init", "default": False},
+    )
+    def __init__(self, **kwargs):
+        popargs("skip_post_init", kwargs)
+        fibers, excitation_sources, fluorophores, photodetectors = popargs(
+            "fibers", "excitation_sources", "fluorophores", "photodetectors", kwargs
+        )
+        super().__init__(**kwargs)
+        self.fibers = fibers
+        self.excitation_sources = excitation_sources
+        self.fluorophores = fluorophores
+        self.photodetectors = photodetectors
+
+
+class DeconvolvedFiberPhotometryResponseSeries(FiberPhotometryResponseSeries):
+    """Extends FiberPhotometryResponseSeries to hold deconvolved data"""
+
+    __nwbfields__ = (
+        {
+            "name": "deconvolution_filter",
+            "doc": "description of deconvolution filter used",
+            "child": True,
+            "required_name": "deconvolution_filter",
+        },
+        {
+            "name": "downsampling_filter",
+            "doc": "description of downsampling filter used",
+            "child": True,
+            "required_name": "downsampling_filter",
+        },
+        {"name": "raw", "doc": "ref to fiber photometry response series"},
+    )
+
+    @docval(
+        *_inherited(FiberPhotometryResponseSeries, True, exclude=("skip_post_init",)),
+        {"name": "raw", "type": FiberPhotometryResponseSeries, "doc": "ref to fiber photometry response series"},
+        *_inherited(FiberPhotometryResponseSeries, False, exclude=("skip_post_init",)),
+        {
+            "name": "deconvolution_filter",
+            "type": VectorData,
+            "doc": "description of deconvolution filter used",
+            "shape": [[None], [None, None], [None, None, None], [None, None, None, None]],
+            "default": None,
+        },
+        {
+            "name": "downsampling_filter",
+            "type": VectorData,
+            "doc": "description of downsampling filter used",
+            "shape": [[None], [None, None], [None, None, None], [None, None, None, None]],
+            "default": None,
+        },
+        {"name": "skip_post_init", "type": bool, "doc": "bool to skip post_init", "default": False},
+    )
+    def __init__(self, **kwargs):
+        popargs("skip_post_init", kwargs)
+        deconvolution_filter, downsampling_filter, raw = popargs(
+            "deconvolution_filter", "downsampling_filter", "raw", kwargs
+        )
+        super().__init__(**kwargs)
+        self.deconvolution_filter = deconvolution_filter
+        self.downsampling_filter = downsampling_filter
+        self.raw = raw
+
+
+class CommandedVoltageSeries(TimeSeries):
+    """Extends TimeSeries to hold a Commanded Voltage"""
+
+    __nwbfields__ = (
+        {"name": "frequency", "doc": "voltage frequency in unit hertz"},
+        {"name": "frequency__unit", "doc": "frequency unit", "settable": False},
+        {"name": "power", "doc": "voltage power in unit volts"},
+        {"name": "power__unit", "doc": "power unit", "settable": False},
+    )
+
+    @docval(
+        *_inherited(TimeSeries, True),
+        {"name": "power", "type": (float, np.float32, np.float64), "doc": "voltage power in unit volts"},
+        *_inherited(TimeSeries, False),
+        {
+            "name": "frequency",
+            "type": (float, np.float32, np.float64),
+            "doc": "voltage frequency in unit hertz",
+            "default": None,
+        },
+        {"name": "skip_post_init", "type": bool, "doc": "bool to skip post_init", "default": False},
+    )
+    def __init__(self, **kwargs):
+        popargs("skip_post_init", kwargs)
+        frequency, power = popargs("frequency", "power", kwargs)
+        super().__init__(**kwargs)
+        self.frequency = frequency
+        self.power = power
+        self.fields["frequency__unit"] = "hertz"
+        self.fields["power__unit"] = "volts"
+
+
+class MultiCommandedVoltage(NWBDataInterface, MultiContainerInterface):
+    """holds CommandedVoltageSeries objects"""
+
+    __clsconf__ = [
+        {
+            "attr": "commanded_voltage_series",
+            "type": CommandedVoltageSeries,
+            "add": "add_commanded_voltage_series",
+            "get": "get_commanded_voltage_series",
+            "create": "create_commanded_voltage_series",
+        },
+    ]
+
+    @docval(
+        *_inherited(NWBDataInterface, True, exclude=("name",)),
+        *_inherited(NWBDataInterface, False, exclude=("name",)),
+        {
+            "name": "commanded_voltage_series",
+            "type": (list, tuple, dict, CommandedVoltageSeries),
+            "doc": "commanded voltage series",
+            "default": None,
+        },
+        {"name": "skip_post_init", "type": bool, "doc": "bool to skip post_init", "default": False},
+    )
+    def __init__(self, **kwargs):
+        popargs("skip_post_init", kwargs)
+        commanded_voltage_series = popargs("commanded_voltage_series", kwargs)
+        super().__init__(name="commanded_voltages", **kwargs)
+        self.commanded_voltage_series = commanded_voltage_series
+
+
+class FiberPhotometry(LabMetaData):
+    """all Fiber Photometry metadata"""
+
+    __nwbfields__ = (
+        {"name": "fibers", "doc": "table of fibers used", "child": True, "required_name": "fibers"},
+        {
+            "name": "excitation_sources",
+            "doc": "table of excitation sources used",
+            "child": True,
+            "required_name": "excitation_sources",
+        },
+        {
+            "name": "photodetectors",
+            "doc": "table of photodetectors used",
+            "child": True,
+            "required_name": "photodetectors",
+        },
+        {"name": "fluorophores", "doc": "table of fluorophores used", "child": True, "required_name": "fluorophores"},
+        {
+            "name": "commanded_voltages",
+            "doc": "multiple commanded voltage container",
+            "child": True,
+            "required_name": "commanded_voltages",
+        },
+    )
+
+    @docval(
+        *_inherited(LabMetaData, True, exclude=("name",)),
+        {"name": "fibers", "type": FibersTable, "doc": "table of fibers used"},
+        {"name": "excitation_sources", "type": ExcitationSourcesTable, "doc": "table of excitation sources used"},
+        {"name": "photodetectors", "type": PhotodetectorsTable, "doc": "table of photodetectors used"},
+        {"name": "fluorophores", "type": FluorophoresTable, "doc": "table of fluorophores used"},
+        *_inherited(LabMetaData, False, exclude=("name",)),
+        {
+            "name": "commanded_voltages",
+            "type": MultiCommandedVoltage,
+            "doc": "multiple commanded voltage container",
+            "default": None,
+        },
+        {"name": "skip_post_init", "type": bool, "doc": "bool to skip post_init", "default": False},
+    )
+    def __init__(self, **kwargs):
+        popargs("skip_post_init", kwargs)
+        fibers, excitation_sources, photodetectors, fluorophores, commanded_voltages = popargs(
+            "fibers", "excitation_sources", "photodetectors", "fluorophores", "commanded_voltages", kwargs
+        )
+        super().__init__(name="fiber_photometry", **kwargs)
+        self.fibers = fibers
+        self.excitation_sources = excitation_sources
+        self.photodetectors = photodetectors
+        self.fluorophores = fluorophores
+        self.commanded_voltages = commanded_voltages
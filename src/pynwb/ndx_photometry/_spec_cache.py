@@ -0,0 +1,224 @@
+"""On-disk cache of the resolved ndx-photometry namespace.
+
+Loading ``ndx-photometry.namespace.yaml`` parses the YAML and re-registers every type of the included ``core``
+namespace, which dominates the cost of ``import ndx_photometry``. PyNWB already pickles its own core TypeMap to a
+user cache directory; this module does the same for the resolved ndx-photometry ``SpecNamespace`` so that later
+processes only have to unpickle it.
+
+The cache file name contains a hash of the spec files and of the installed pynwb/hdmf versions, so editing the
+spec or upgrading either library invalidates it automatically. Writing a cache file removes the older ones of the
+same spec path and library versions only, so environments with other versions that share the cache directory keep
+theirs; `clear_cache` removes them all. Set ``NDX_PHOTOMETRY_NO_CACHE=1`` to disable the
+cache and ``NDX_PHOTOMETRY_CACHE_DIR`` to change its location.
+"""
+
+import glob
+import hashlib
+import os
+import pickle
+import tempfile
+
+import hdmf
+import pynwb
+from hdmf.build.manager import TypeSource
+from pynwb import get_type_map, load_namespaces
+
+# bump this whenever the layout of the pickled payload changes
+_CACHE_FORMAT = 1
+_CACHE_PREFIX = "namespace-"
+
+
+def _cache_disabled():
+    return os.environ.get("NDX_PHOTOMETRY_NO_CACHE", "0") == "1"
+
+
+def get_cache_dir():
+    """Return the directory used for the cached namespace."""
+    cache_dir = os.environ.get("NDX_PHOTOMETRY_CACHE_DIR")
+    if cache_dir is None:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        cache_dir = os.path.join(base, "ndx-photometry")
+    return cache_dir
+
+
+def _spec_sources(namespace_path):
+    """Return the namespace file followed by the other spec files next to it, in a stable order."""
+    spec_dir = os.path.dirname(namespace_path)
+    sources = [namespace_path]
+    for path in sorted(glob.glob(os.path.join(spec_dir, "*.yaml"))):
+        if os.path.abspath(path) != os.path.abspath(namespace_path):
+            sources.append(path)
+    return sources
+
+
+def _update_with_spec_files(digest, namespace_path):
+    for path in _spec_sources(namespace_path):
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+
+
+def get_cache_key(namespace_path):
+    """Hash the spec files together with the pynwb and hdmf versions."""
+    digest = hashlib.sha256()
+    digest.update(f"{_CACHE_FORMAT}|{pynwb.__version__}|{hdmf.__version__}|{pickle.HIGHEST_PROTOCOL}".encode())
+    _update_with_spec_files(digest, namespace_path)
+    return digest.hexdigest()[:32]
+
+
+def _source_key(namespace_path):
+    """Hash the path of the spec and the pynwb and hdmf versions, the part of the cache key that edits do not change."""
+    digest = hashlib.sha256()
+    digest.update(f"{_CACHE_FORMAT}|{pynwb.__version__}|{hdmf.__version__}|{pickle.HIGHEST_PROTOCOL}".encode())
+    digest.update(os.path.abspath(namespace_path).encode())
+    return digest.hexdigest()[:16]
+
+
+def get_spec_hash(namespace_path):
+    """Hash the spec files alone, e.g. to check that code generated from them is up to date."""
+    digest = hashlib.sha256()
+    _update_with_spec_files(digest, namespace_path)
+    return digest.hexdigest()[:32]
+
+
+def get_cache_path(namespace_path):
+    name = f"{_CACHE_PREFIX}{_source_key(namespace_path)}-{get_cache_key(namespace_path)}.pkl"
+    return os.path.join(get_cache_dir(), name)
+
+
+def clear_cache():
+    """Remove all cached namespaces."""
+    for path in glob.glob(os.path.join(get_cache_dir(), f"{_CACHE_PREFIX}*.pkl")):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _dump(type_map, namespace_name, dependencies, cache_path, source_key):
+    ns_catalog = type_map.namespace_catalog
+    namespace = ns_catalog.get_namespace(namespace_name)
+    own_sources = namespace.get_source_files()
+    source_types = [
+        dt for dt in namespace.get_registered_types() if namespace.catalog.get_spec_source_file(dt) in own_sources
+    ]
+    # hdmf>=4 writes the cached spec of a file from the unresolved specs kept by the catalog. Keep a copy of them
+    # so that files written from a cached namespace embed exactly the same spec as files written without it.
+    unresolved = dict()
+    if hasattr(ns_catalog, "get_spec_source_dict"):
+        for source in own_sources:
+            unresolved[source] = ns_catalog.get_spec_source_dict(source)
+    payload = dict(
+        name=namespace_name,
+        namespace=namespace,
+        source_types=source_types,
+        dependencies=dependencies,
+        unresolved=unresolved,
+    )
+
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    # write to a temporary file and rename it so that concurrent processes never see a partial cache file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    # remove the caches made from older versions of the same spec files with the same library versions
+    for path in glob.glob(os.path.join(os.path.dirname(cache_path), f"{_CACHE_PREFIX}{source_key}-*.pkl")):
+        if path != cache_path:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _register(type_map, payload):
+    """Register a cached namespace the same way ``TypeMap.load_namespaces`` registers a freshly loaded one."""
+    ns_name = payload["name"]
+    ns_catalog = type_map.namespace_catalog
+    ns_catalog.add_namespace(name=ns_name, namespace=payload["namespace"])
+    for source, spec_dict in payload["unresolved"].items():
+        # add_namespace fills this entry from the resolved specs, replace it with the original unresolved ones
+        cached = ns_catalog.get_spec_source_dict(source)
+        if cached is not None and spec_dict is not None:
+            cached.clear()
+            cached.update(spec_dict)
+    for dt in payload["source_types"]:
+        type_map.register_container_type(ns_name, dt, TypeSource(ns_name, dt))
+    for src_ns, dep_types in payload["dependencies"].items():
+        for dt in dep_types:
+            type_map.register_container_type(ns_name, dt, TypeSource(src_ns, dt))
+
+
+def _unregister(type_map, payload):
+    """Remove a namespace that failed to register from the type map, so that it can be loaded from its spec files.
+
+    The catalog and the type map have no public method to remove a namespace, their private attributes are cleared
+    where they exist. Return whether the namespace was removed.
+    """
+    ns_name = payload["name"]
+    ns_catalog = type_map.namespace_catalog
+    sources = payload["namespace"].get_source_files()
+    getattr(ns_catalog, "_NamespaceCatalog__namespaces", dict()).pop(ns_name, None)
+    getattr(ns_catalog, "_NamespaceCatalog__source_types", dict()).pop(ns_name, None)
+    for name in ("_NamespaceCatalog__loaded_specs", "_NamespaceCatalog__unresolved_spec_dicts"):
+        specs = getattr(ns_catalog, name, dict())
+        for source in sources:
+            specs.pop(source, None)
+    getattr(type_map, "_TypeMap__ns_dt_to_container_cls", dict()).pop(ns_name, None)
+    container_types = getattr(type_map, "_TypeMap__container_cls_to_ns_dt", dict())
+    for container_cls, (namespace, _) in list(container_types.items()):
+        if namespace == ns_name:
+            del container_types[container_cls]
+    return ns_name not in ns_catalog.namespaces
+
+
+def get_global_type_map():
+    """Return the global PyNWB type map, or None if the installed version of pynwb does not give access to it."""
+    try:
+        return get_type_map(copy=False)
+    except TypeError:
+        return None
+
+
+def load_namespace(namespace_path, namespace_name="ndx-photometry"):
+    """Load the namespace into the global PyNWB type map, reading it from the on-disk cache when possible."""
+    namespace_path = str(namespace_path)
+    type_map = get_global_type_map()
+    if type_map is None or _cache_disabled() or namespace_name in type_map.namespace_catalog.namespaces:
+        load_namespaces(namespace_path)
+        return False
+
+    try:
+        cache_path = get_cache_path(namespace_path)
+    except OSError:
+        load_namespaces(namespace_path)
+        return False
+
+    if os.path.exists(cache_path):
+        payload = None
+        try:
+            with open(cache_path, "rb") as f:
+                payload = pickle.load(f)
+            _register(type_map, payload)
+            return True
+        except Exception:
+            # unreadable or incompatible cache, remove what was registered from it and rebuild it
+            registered = namespace_name in type_map.namespace_catalog.namespaces
+            if registered and not (isinstance(payload, dict) and _unregister(type_map, payload)):
+                raise
+            try:
+                os.remove(cache_path)
+            except OSError:
+                pass
+
+    dependencies = load_namespaces(namespace_path)[namespace_name]
+    try:
+        _dump(type_map, namespace_name, dependencies, cache_path, _source_key(namespace_path))
+    except (OSError, PermissionError, pickle.PicklingError):
+        pass  # skip caching if the cache directory is not writable
+    return False
@@ -0,0 +1,334 @@
+"""Write and read photometry NWB files from asyncio code without blocking the event loop.
+
+HDF5 I/O runs in a thread pool that is bounded to `DEFAULT_MAX_WORKERS` threads, or in a given executor:
+
+- `AsyncResponseSeriesStream` creates a FiberPhotometryResponseSeries whose data are appended with
+  ``await stream.append(block)`` while `async_write` writes the file, through a `ResponseSeriesStream`. At most
+  ``max_pending`` blocks wait to be written, `append` waits for the writer when they are all taken, so a slow disk
+  slows down the appends instead of filling the memory.
+- `async_read_session` reads the metadata tables and response series of a file with `read_session`.
+- `async_iter_blocks` reads the data of a response series block by block, with at most ``max_pending`` blocks read
+  ahead of the consumer.
+
+The writes of files with streamed series last until their streams are closed. They run on a thread of their own
+instead of the executor, so that they do not take the threads that read the blocks they wait for, e.g. when a series
+is copied from one file to another. HDF5 itself runs one operation at a time.
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import h5py
+import numpy as np
+from hdmf.utils import docval, popargs
+from pynwb import NWBHDF5IO, NWBFile
+
+from .sessions import _find_series_group, read_session
+from .streaming import ResponseSeriesStream, _StreamIterator
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_PENDING = 8
+DEFAULT_BLOCK_BYTES = 1024**2
+
+_executor = None
+_executor_lock = threading.Lock()
+# put in the queue of a stream when it is closed
+_END = object()
+
+
+def _get_executor(executor):
+    """Return the given executor, or the thread pool shared by the functions of this module."""
+    global _executor
+    if executor is not None:
+        return executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DEFAULT_MAX_WORKERS, thread_name_prefix="ndx-photometry-io")
+        return _executor
+
+
+def _run(executor, func, *args, **kwargs):
+    """Run a blocking function in the executor and return a future for its result."""
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(_get_executor(executor), functools.partial(func, *args, **kwargs))
+
+
+def _submit_thread(func, *args):
+    """Run a blocking function on a new thread and return a concurrent future for its result."""
+    future = concurrent.futures.Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = func(*args)
+        except BaseException as error:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    # not a daemon thread, the interpreter waits for the file to be written before exiting
+    threading.Thread(target=run, name="ndx-photometry-stream-write").start()
+    return future
+
+
+_EXECUTOR_ARG = {
+    "name": "executor",
+    "type": ThreadPoolExecutor,
+    "doc": "the executor to run the HDF5 I/O in, by default a thread pool shared by ndx_photometry",
+    "default": None,
+}
+_MAX_PENDING_ARG = {
+    "name": "max_pending",
+    "type": int,
+    "doc": "the number of blocks that can wait to be written or to be consumed",
+    "default": DEFAULT_MAX_PENDING,
+}
+
+
+class AsyncResponseSeriesStream:
+    """Append blocks of photometry samples to a FiberPhotometryResponseSeries from asyncio code while it is written.
+
+    Append the first block, create the series with `create_series`, add it to a file and start writing the file with
+    `async_write`, then append the other blocks and `close` the stream. As in `ResponseSeriesStream`, each block has
+    the shape (n_samples,) or (n_samples, n_fibers), or is a pair (data, timestamps) when ``rate`` is not given.
+    """
+
+    @docval(
+        {
+            "name": "rate",
+            "type": (int, float),
+            "doc": "the sampling rate, if the blocks have no timestamps",
+            "default": None,
+        },
+        {"name": "chunk_bytes", "type": int, "doc": "the target size of one chunk, in bytes", "default": 1024**2},
+        _MAX_PENDING_ARG,
+    )
+    def __init__(self, **kwargs):
+        self.rate, self.chunk_bytes, max_pending = popargs("rate", "chunk_bytes", "max_pending", kwargs)
+        if max_pending < 1:
+            raise ValueError("max_pending must be positive")
+        self.stream = None
+        self._blocks = queue.SimpleQueue()
+        # the number of blocks that can still be appended before the writer takes one
+        self._slots = asyncio.Semaphore(max_pending)
+        # set once the first block is appended, or the stream closed
+        self._started = asyncio.Event()
+        self._max_pending = max_pending
+        self._loop = None
+        self._closed = False
+        self._stopped = False
+
+    def _release(self, n=1):
+        for _ in range(n):
+            self._slots.release()
+
+    def _iter_blocks(self):
+        """Yield the appended blocks, in the thread that writes the file."""
+        try:
+            while True:
+                block = self._blocks.get()
+                if block is _END:
+                    return
+                self._loop.call_soon_threadsafe(self._release)
+                yield block
+        finally:
+            # the writer stopped, wake up the appends that wait for it
+            self._stopped = True
+            if self._loop is not None and not self._loop.is_closed():
+                self._loop.call_soon_threadsafe(self._release, self._max_pending)
+
+    async def append(self, block):
+        """Append a block of samples, waiting while `max_pending` blocks wait to be written."""
+        if self._closed:
+            raise ValueError("cannot append to a closed stream")
+        self._loop = asyncio.get_running_loop()
+        await self._slots.acquire()
+        if self._stopped:
+            self._slots.release()
+            raise RuntimeError("the series is not being written anymore, the write stopped or failed")
+        # copy the block, the caller may reuse its buffer
+        if isinstance(block, tuple):
+            block = tuple(np.array(part) for part in block)
+        else:
+            block = np.array(block)
+        self._blocks.put(block)
+        self._started.set()
+
+    @docval(
+        {
+            "name": "series_type",
+            "type": str,
+            "doc": "the neurodata type of the series to create",
+            "default": "FiberPhotometryResponseSeries",
+        },
+        allow_extra=True,
+    )
+    async def create_series(self, **kwargs):
+        """Create a series whose data are the blocks of this stream, once the first block is appended.
+
+        The other arguments are passed to the class of the series, e.g. ``name``, ``unit`` and ``fibers``.
+        """
+        if self.stream is not None:
+            raise ValueError("the series of this stream was already created")
+        self._loop = asyncio.get_running_loop()
+        # the first block is read to find the shape and data type of the samples, it is in the queue once appended
+        await self._started.wait()
+        self.stream = ResponseSeriesStream(blocks=self._iter_blocks(), rate=self.rate, chunk_bytes=self.chunk_bytes)
+        return self.stream.create_series(**kwargs)
+
+    async def close(self):
+        """Mark the end of the blocks, after which the write of the series can finish."""
+        if not self._closed:
+            self._closed = True
+            self._blocks.put(_END)
+            self._started.set()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+def _write(path, nwbfile, kwargs):
+    with NWBHDF5IO(os.fspath(path), mode="w") as io:
+        io.write(nwbfile, **kwargs)
+
+
+def _streams(nwbfile):
+    """Return the streamed data and timestamps of the series of a file."""
+    values = []
+    for obj in nwbfile.objects.values():
+        for value in (getattr(obj, "data", None), getattr(obj, "timestamps", None)):
+            if isinstance(value, _StreamIterator):
+                values.append(value)
+    return values
+
+
+def _close_streams(streams):
+    """Close the blocks of the streamed series of a written file, so that appends to them fail instead of waiting."""
+    for value in streams:
+        if hasattr(value._stream._blocks, "close"):
+            value._stream._blocks.close()
+
+
+@docval(
+    {"name": "path", "type": (str, Path), "doc": "the path of the NWB file to write"},
+    {"name": "nwbfile", "type": NWBFile, "doc": "the file to write"},
+    _EXECUTOR_ARG,
+    allow_extra=True,
+    is_method=False,
+)
+async def async_write(**kwargs):
+    """Write an NWB file in the executor. The other arguments are passed to ``NWBHDF5IO.write``.
+
+    The series of `AsyncResponseSeriesStream` objects in the file are written as their blocks are appended, so the
+    write finishes once all their streams are closed. Such a write runs on a thread of its own instead of the
+    executor.
+    """
+    path, nwbfile, executor = popargs("path", "nwbfile", "executor", kwargs)
+    streams = _streams(nwbfile)
+    if streams:
+        future = _submit_thread(_write, path, nwbfile, kwargs)
+    else:
+        future = _get_executor(executor).submit(_write, path, nwbfile, kwargs)
+    try:
+        await asyncio.wrap_future(future)
+    finally:
+        # if the task is cancelled, the write may still be running and its streams cannot be closed
+        if future.done():
+            _close_streams(streams)
+
+
+@docval(
+    {"name": "path", "type": (str, Path), "doc": "the path of the NWB file"},
+    {"name": "series", "type": (list, tuple), "doc": "the names of the response series to read", "default": ()},
+    _EXECUTOR_ARG,
+    is_method=False,
+)
+async def async_read_session(**kwargs):
+    """Read the photometry metadata tables and the given response series of a file in the executor.
+
+    Returns the same dict as `read_session`.
+    """
+    path, series, executor = popargs("path", "series", "executor", kwargs)
+    return await _run(executor, read_session, path=path, series=series)
+
+
+def _open_data(path, name):
+    file = h5py.File(os.fspath(path), mode="r")
+    try:
+        return file, _find_series_group(file, name)["data"]
+    except Exception:
+        file.close()
+        raise
+
+
+def _block_samples(data, block_bytes):
+    """Return the number of samples of about block_bytes, rounded up to whole chunks."""
+    sample_bytes = max(data.dtype.itemsize * int(np.prod(data.shape[1:])), 1)
+    n_samples = max(block_bytes // sample_bytes, 1)
+    if data.chunks is not None:
+        n_samples = -(-n_samples // data.chunks[0]) * data.chunks[0]
+    return n_samples
+
+
+@docval(
+    {"name": "path", "type": (str, Path), "doc": "the path of the NWB file"},
+    {"name": "name", "type": str, "doc": "the name of the response series, in the acquisition or a processing module"},
+    {
+        "name": "block_samples",
+        "type": int,
+        "doc": "the number of samples of each block, by default about 1 MiB of samples rounded up to whole chunks",
+        "default": None,
+    },
+    {
+        "name": "max_pending",
+        "type": int,
+        "doc": "the number of blocks read ahead of the consumer",
+        "default": 2,
+    },
+    _EXECUTOR_ARG,
+    is_method=False,
+)
+async def async_iter_blocks(**kwargs):
+    """Iterate over the data of a response series of a file, block by block, reading ahead in the executor.
+
+    Each block is a numpy array of `block_samples` consecutive samples (fewer for the last one), in order. At most
+    `max_pending` blocks are read ahead, the reads wait for the consumer otherwise. The file is opened with h5py
+    only, no object of the file is built.
+    """
+    path, name, block_samples, max_pending, executor = popargs(
+        "path", "name", "block_samples", "max_pending", "executor", kwargs
+    )
+    if max_pending < 1:
+        raise ValueError("max_pending must be positive")
+    file, data = await _run(executor, _open_data, path, name)
+    reads = []
+    try:
+        if block_samples is None:
+            block_samples = _block_samples(data, DEFAULT_BLOCK_BYTES)
+        starts = iter(range(0, len(data), block_samples))
+        for start in starts:
+            reads.append(_run(executor, data.__getitem__, slice(start, start + block_samples)))
+            if len(reads) == max_pending:
+                break
+        while reads:
+            block = await reads.pop(0)
+            start = next(starts, None)
+            if start is not None:
+                reads.append(_run(executor, data.__getitem__, slice(start, start + block_samples)))
+            yield block
+    finally:
+        # the reads in progress use the file, wait for them before closing it
+        for read in reads:
+            read.cancel()
+        await asyncio.gather(*reads, return_exceptions=True)
+        await _run(executor, file.close)
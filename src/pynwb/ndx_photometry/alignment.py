@@ -0,0 +1,194 @@
+"""Extract windows of samples around events from a FiberPhotometryResponseSeries.
+
+The windows of all events are sorted and the ones that overlap or are close to each other are merged, so that each
+range of samples is read from the file once instead of once per event. The windows are then gathered from each read
+block with a single numpy indexing operation.
+"""
+
+import numpy as np
+from hdmf.utils import docval, popargs
+from pynwb import TimeSeries
+
+from .photometry import _sampling_rate, _search_sorted
+
+# read at most this many bytes of data, or of timestamps, at once
+DEFAULT_MAX_READ_BYTES = 64 * 1024**2
+
+_WINDOW_ARGS = (
+    {"name": "series", "type": TimeSeries, "doc": "the series to extract the windows from"},
+    {"name": "event_times", "type": "array_data", "doc": "the times of the events, in seconds"},
+    {"name": "before", "type": (int, float), "doc": "the duration of the window before each event, in seconds"},
+    {"name": "after", "type": (int, float), "doc": "the duration of the window after each event, in seconds"},
+    {
+        "name": "fibers",
+        "type": (int, slice, list, tuple, np.ndarray),
+        "doc": "the fibers (columns of the data) to extract, all of them by default",
+        "default": None,
+    },
+    {
+        "name": "max_read_bytes",
+        "type": int,
+        "doc": "the maximum size of one read from the file, in bytes",
+        "default": DEFAULT_MAX_READ_BYTES,
+    },
+)
+
+
+def _event_samples(series, event_times, max_read_bytes):
+    """Return the index of the first sample at or after each event, for sorted event times.
+
+    Timestamps that are not in memory are read in blocks of at most `max_read_bytes`: the first timestamp of the next
+    event that is not found yet is searched with `_search_sorted`, then the events up to the last timestamp of the
+    block that starts there are found in that block.
+    """
+    if series.timestamps is None:
+        offsets = (event_times - float(series.starting_time or 0.0)) * float(series.rate)
+        return np.ceil(offsets - 1e-9).astype(np.int64)
+    timestamps = series.timestamps
+    if isinstance(timestamps, np.ndarray):
+        return np.searchsorted(timestamps, event_times, side="left").astype(np.int64)
+    n_timestamps = len(timestamps)
+    itemsize = np.dtype(getattr(timestamps, "dtype", np.float64)).itemsize
+    block_size = max(max_read_bytes // itemsize, 1)
+    if n_timestamps <= block_size:
+        return np.searchsorted(np.asarray(timestamps[:]), event_times, side="left").astype(np.int64)
+    samples = np.empty(len(event_times), dtype=np.int64)
+    i = 0
+    while i < len(event_times):
+        first = _search_sorted(timestamps, event_times[i])
+        block = np.asarray(timestamps[first : first + block_size])
+        if first + len(block) >= n_timestamps:
+            j = len(event_times)
+        else:
+            # block[0] is at or after event i, so the block holds the sample of at least that event
+            j = i + int(np.searchsorted(event_times[i:], block[-1], side="right"))
+        samples[i:j] = first + np.searchsorted(block, event_times[i:j], side="left")
+        i = j
+    return samples
+
+
+class _WindowReader:
+    """Read the windows of samples starting at given indices, merging close windows into one read."""
+
+    def __init__(self, series, before, after, fibers, max_read_bytes):
+        self.data = series.data
+        rate = _sampling_rate(series)
+        self.n_before = int(round(before * rate))
+        self.n_samples = self.n_before + int(round(after * rate))
+        if self.n_samples <= 0:
+            raise ValueError("the windows must contain at least one sample")
+        self.fibers = fibers
+        self.n_total = len(self.data)
+
+        shape = self.data.shape if hasattr(self.data, "shape") else np.shape(self.data[:1])
+        n_columns = int(np.prod(shape[1:], dtype=np.int64))
+        if fibers is None:
+            self.window_shape = tuple(shape[1:])
+        elif isinstance(fibers, int):
+            self.window_shape = ()
+        elif isinstance(fibers, slice):
+            self.window_shape = (len(range(*fibers.indices(shape[1]))),)
+        else:
+            self.fibers = np.asarray(fibers, dtype=np.int64)
+            self.window_shape = (len(self.fibers),)
+        dtype = getattr(self.data, "dtype", None)
+        dtype = np.asarray(self.data[:1]).dtype if dtype is None else np.dtype(dtype)
+        # windows that extend past the recording are padded with NaN
+        self.dtype = np.promote_types(dtype, np.float32)
+        self.max_read_bytes = max_read_bytes
+        self.max_read_samples = max(max_read_bytes // (max(n_columns, 1) * dtype.itemsize), self.n_samples)
+
+    def _read(self, first, last):
+        if self.fibers is None:
+            return np.asarray(self.data[first:last])
+        if isinstance(self.fibers, (int, slice)):
+            return np.asarray(self.data[first:last, self.fibers])
+        return np.asarray(self.data[first:last])[:, self.fibers]
+
+    def _groups(self, starts):
+        """Split sorted window starts into runs that are read together."""
+        ends = starts + self.n_samples
+        # merge windows separated by less than a window, reading the gap is cheaper than another read
+        breaks = np.flatnonzero(starts[1:] > ends[:-1] + self.n_samples) + 1
+        for a, b in zip(np.r_[0, breaks], np.r_[breaks, len(starts)]):
+            while a < b:
+                # keep each read under max_read_samples
+                c = a + int(np.searchsorted(starts[a:b], starts[a] + self.max_read_samples - self.n_samples, "right"))
+                c = max(c, a + 1)
+                yield a, c
+                a = c
+
+    def fill(self, starts, out, positions=None):
+        """Fill `out` with the windows starting at the sorted indices `starts`.
+
+        The window starting at ``starts[i]`` is written to ``out[positions[i]]``, or to ``out[i]`` if `positions` is
+        None.
+        """
+        for a, c in self._groups(starts):
+            first = min(max(int(starts[a]), 0), self.n_total)
+            last = min(max(int(starts[c - 1]) + self.n_samples, 0), self.n_total)
+            block = self._read(first, last)
+            indices = starts[a:c, None] + np.arange(self.n_samples)
+            valid = (indices >= 0) & (indices < self.n_total)
+            if len(block):
+                windows = block[np.clip(indices - first, 0, len(block) - 1)].astype(self.dtype, copy=False)
+            else:
+                windows = np.empty((c - a, self.n_samples) + self.window_shape, dtype=self.dtype)
+            if not valid.all():
+                windows[~valid] = np.nan
+            out[slice(a, c) if positions is None else positions[a:c]] = windows
+
+
+def _sorted_starts(series, event_times, reader):
+    event_times = np.asarray(event_times, dtype=np.float64)
+    if event_times.ndim != 1:
+        raise ValueError("event_times must be one-dimensional")
+    order = np.argsort(event_times, kind="stable")
+    starts = _event_samples(series, event_times[order], reader.max_read_bytes) - reader.n_before
+    return order, starts
+
+
+@docval(*_WINDOW_ARGS, is_method=False)
+def get_peri_event_windows(**kwargs):
+    """Return the samples around each event as an array of shape (n_events, n_samples, n_fibers).
+
+    Each window is aligned on the first sample at or after its event: sample ``round(before * rate)`` of each window
+    is that sample. The second dimension is dropped if the series has a single dimension or `fibers` is an int.
+    Samples outside of the recording are NaN. For series with timestamps, the number of samples in the windows is
+    computed from the mean sampling rate.
+    """
+    series, event_times, before, after, fibers, max_read_bytes = popargs(
+        "series", "event_times", "before", "after", "fibers", "max_read_bytes", kwargs
+    )
+    reader = _WindowReader(series, before, after, fibers, max_read_bytes)
+    order, starts = _sorted_starts(series, event_times, reader)
+    windows = np.empty((len(starts), reader.n_samples) + reader.window_shape, dtype=reader.dtype)
+    # read the windows in time order and put each one at the position of its event
+    reader.fill(starts, windows, positions=order)
+    return windows
+
+
+@docval(
+    *_WINDOW_ARGS,
+    {"name": "batch_size", "type": int, "doc": "the maximum number of events per batch", "default": 1000},
+    is_method=False,
+)
+def iter_peri_event_windows(**kwargs):
+    """Yield the samples around the events in batches, for lists of events too large to extract at once.
+
+    Each batch is a tuple (event_indices, windows) where `event_indices` are the positions of the events of the batch
+    in `event_times` and `windows` is an array of shape (len(event_indices), n_samples, n_fibers), as returned by
+    `get_peri_event_windows`. The batches are in time order.
+    """
+    series, event_times, before, after, fibers, max_read_bytes, batch_size = popargs(
+        "series", "event_times", "before", "after", "fibers", "max_read_bytes", "batch_size", kwargs
+    )
+    if batch_size < 1:
+        raise ValueError("batch_size must be positive")
+    reader = _WindowReader(series, before, after, fibers, max_read_bytes)
+    order, starts = _sorted_starts(series, event_times, reader)
+    for batch_start in range(0, len(starts), batch_size):
+        batch = slice(batch_start, batch_start + batch_size)
+        windows = np.empty((len(starts[batch]), reader.n_samples) + reader.window_shape, dtype=reader.dtype)
+        reader.fill(starts[batch], windows)
+        yield order[batch], windows
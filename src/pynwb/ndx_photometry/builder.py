@@ -0,0 +1,242 @@
+"""Build the metadata tables and response series of a FiberPhotometry container from several threads.
+
+The tables of hdmf and the region helpers of `photometry.py` are not thread-safe. A `FiberPhotometryBuilder` lets
+threads stage rows and series instead: each thread appends to its own queue, without taking a lock, and gets a
+`StagedRow` back for each row, to reference it from the regions of series and from the region columns of other
+rows. `commit` then takes everything staged so far, by all threads, and adds it to the tables with one `add_rows`
+per table, and creates the regions of the series. Rows are added in the order they were staged.
+"""
+
+import itertools
+import threading
+from collections import deque
+
+import numpy as np
+from hdmf.utils import docval, popargs
+from pynwb import NWBFile
+from pynwb.base import TimeSeries
+from pynwb.file import LabMetaData
+
+from .photometry import get_photometry_class
+
+# the tables of a FiberPhotometry container, in the order they are committed so that the rows of a table can
+# reference the rows of the tables before it, e.g. the fibers can reference their excitation source
+_TABLES = ("fluorophores", "photodetectors", "excitation_sources", "fibers")
+_REGION_METHODS = dict(
+    fibers="create_fiber_region",
+    excitation_sources="create_excitation_source_region",
+    fluorophores="create_fluorophore_region",
+    photodetectors="create_photodetector_region",
+)
+_REGION_TYPE = (list, tuple, np.ndarray)
+
+
+class StagedRow:
+    """A row staged in a table of a `FiberPhotometryBuilder`, with its index in the table once committed."""
+
+    __slots__ = ("table", "data", "index", "_order")
+
+    def __init__(self, table, data, order):
+        self.table = table
+        self.data = data
+        self.index = None
+        self._order = order
+
+    def __repr__(self):
+        return f"StagedRow({self.table!r}, index={self.index})"
+
+
+class _StagedSeries:
+    __slots__ = ("series", "regions", "_order", "committed")
+
+    def __init__(self, series, regions, order):
+        self.series = series
+        self.regions = regions
+        self._order = order
+        self.committed = False
+
+
+def _staged_rows(value):
+    """Return the staged rows referenced by a value of a row or a region."""
+    if isinstance(value, StagedRow):
+        return [value]
+    if isinstance(value, (list, tuple)):
+        return [row for item in value for row in _staged_rows(item)]
+    return []
+
+
+def _resolve(value):
+    """Replace the staged rows of a value by their index."""
+    if isinstance(value, StagedRow):
+        if value.index is None:
+            raise ValueError(
+                f"a staged row of '{value.table}' is referenced before it is committed, rows can only reference the "
+                f"staged rows of the tables before their own in {_TABLES}"
+            )
+        return value.index
+    if isinstance(value, (list, tuple)):
+        return [_resolve(item) for item in value]
+    return value
+
+
+class FiberPhotometryBuilder:
+    """Stage the rows and response series of a FiberPhotometry container from several threads, then commit them."""
+
+    @docval(
+        {
+            "name": "fiber_photometry",
+            "type": LabMetaData,
+            "doc": "the FiberPhotometry container whose tables the staged rows are added to",
+        },
+    )
+    def __init__(self, **kwargs):
+        fiber_photometry = popargs("fiber_photometry", kwargs)
+        if not isinstance(fiber_photometry, get_photometry_class("FiberPhotometry")):
+            raise TypeError(f"expected a FiberPhotometry container, got {type(fiber_photometry).__name__}")
+        self.fiber_photometry = fiber_photometry
+        self._local = threading.local()
+        self._queues = []
+        self._queues_lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+        # next() on a count is atomic, the order of the items of all the threads
+        self._order = itertools.count()
+        # the items of a commit that failed, committed first by the next one
+        self._retry = []
+
+    def _queue(self):
+        queue = getattr(self._local, "queue", None)
+        if queue is None:
+            # the only lock taken while staging, once per thread
+            queue = self._local.queue = deque()
+            with self._queues_lock:
+                self._queues.append(queue)
+        return queue
+
+    @docval(
+        {
+            "name": "table",
+            "type": str,
+            "doc": "the table to add the row to: 'fibers', 'excitation_sources', 'photodetectors' or 'fluorophores'",
+        },
+        allow_extra=True,
+    )
+    def add_row(self, **kwargs):
+        """Stage a row of a table, given as keyword arguments as with `add_row`, and return it as a `StagedRow`.
+
+        The values of region columns can be indices of rows or staged rows of the tables committed before this
+        one: fluorophores, photodetectors, excitation sources, then fibers.
+        """
+        table = popargs("table", kwargs)
+        if table not in _TABLES:
+            raise ValueError(f"table must be one of {_TABLES}, not '{table}'")
+        row = StagedRow(table, kwargs, next(self._order))
+        self._queue().append(row)
+        return row
+
+    @docval(
+        {"name": "series", "type": TimeSeries, "doc": "the response series, created without its regions"},
+        {
+            "name": "fibers",
+            "type": _REGION_TYPE,
+            "doc": "the fibers of the series, as row indices or staged rows",
+            "default": None,
+        },
+        {
+            "name": "excitation_sources",
+            "type": _REGION_TYPE,
+            "doc": "the excitation sources of the series",
+            "default": None,
+        },
+        {"name": "fluorophores", "type": _REGION_TYPE, "doc": "the fluorophores of the series", "default": None},
+        {"name": "photodetectors", "type": _REGION_TYPE, "doc": "the photodetectors of the series", "default": None},
+    )
+    def add_series(self, **kwargs):
+        """Stage a response series, whose regions are created from row indices or staged rows when committed."""
+        series = popargs("series", kwargs)
+        regions = {name: list(rows) for name, rows in kwargs.items() if rows is not None}
+        self._queue().append(_StagedSeries(series, regions, next(self._order)))
+        return series
+
+    def _drain(self):
+        items, self._retry = self._retry, []
+        for queue in list(self._queues):
+            # popleft and append are atomic, an item staged while draining is taken now or by the next commit
+            while True:
+                try:
+                    items.append(queue.popleft())
+                except IndexError:
+                    break
+        return items
+
+    def _commit_rows(self, table, rows):
+        """Add rows to a table with one add_rows per run of rows with the same columns."""
+        start = 0
+        while start < len(rows):
+            columns = sorted(rows[start].data)
+            stop = start + 1
+            while stop < len(rows) and sorted(rows[stop].data) == columns:
+                stop += 1
+            batch = rows[start:stop]
+            first = len(table)
+            table.add_rows(**{name: [_resolve(row.data[name]) for row in batch] for name in columns})
+            for i, row in enumerate(batch):
+                row.index = first + i
+            start = stop
+
+    def _commit_series(self, staged):
+        for name, rows in staged.regions.items():
+            table = getattr(self.fiber_photometry, name)
+            region = getattr(table, _REGION_METHODS[name])(
+                region=[_resolve(row) for row in rows], description=f"the {name.replace('_', ' ')} of this series"
+            )
+            setattr(staged.series, name, region)
+        staged.committed = True
+
+    @docval(
+        {
+            "name": "nwbfile",
+            "type": NWBFile,
+            "doc": "a file to add the FiberPhotometry container (if it is not in the file) and the series to, as "
+            "acquisition",
+            "default": None,
+        },
+    )
+    def commit(self, **kwargs):
+        """Add the rows and series staged so far by all the threads, and return the committed series.
+
+        Commits are serialized, staging is not blocked while committing. If a row or series cannot be added, e.g.
+        because of a missing column, the error is raised and the rows and series that were not added yet are kept
+        for the next commit.
+        """
+        nwbfile = popargs("nwbfile", kwargs)
+        with self._commit_lock:
+            items = self._drain()
+            series = [item for item in items if isinstance(item, _StagedSeries)]
+            # rows can also be referenced before the commit that drains the queue of the thread that staged them
+            rows = {id(item): item for item in items if isinstance(item, StagedRow)}
+            pending = list(rows.values())
+            pending += [row for staged in series for value in staged.regions.values() for row in _staged_rows(value)]
+            while pending:
+                row = pending.pop()
+                if row.index is None:
+                    rows[id(row)] = row
+                    pending += [
+                        ref for value in row.data.values() for ref in _staged_rows(value) if id(ref) not in rows
+                    ]
+            rows = sorted((row for row in rows.values() if row.index is None), key=lambda row: row._order)
+            series.sort(key=lambda staged: staged._order)
+            try:
+                for name in _TABLES:
+                    self._commit_rows(getattr(self.fiber_photometry, name), [row for row in rows if row.table == name])
+                for staged in series:
+                    self._commit_series(staged)
+            except Exception:
+                self._retry = [row for row in rows if row.index is None]
+                self._retry += [staged for staged in series if not staged.committed]
+                raise
+            if nwbfile is not None:
+                if self.fiber_photometry.name not in nwbfile.lab_meta_data:
+                    nwbfile.add_lab_meta_data(self.fiber_photometry)
+                for staged in series:
+                    nwbfile.add_acquisition(staged.series)
+        return [staged.series for staged in series]
@@ -0,0 +1,357 @@
+"""Store periodic or piecewise-constant commanded voltages compactly.
+
+Commanded voltages are usually constant levels or the same waveform repeated for the whole session. Such data is
+described by one period and a number of samples (`PeriodicData`), or by runs of constant values (`RunLengthData`),
+and is expanded one HDF5 chunk at a time while the file is written:
+
+- chunks in which all samples are equal to the most common level are not written at all, HDF5 returns the fill
+  value of the dataset for them, so a constant voltage takes no space in the file;
+- the other chunks are compressed, and a chunk made of whole periods of a waveform compresses to little more than
+  one period, for periods shorter than the 32 KiB window of gzip (4096 float64 samples).
+
+The dataset is read back through the normal `data` interface. Series of a MultiCommandedVoltage with the same
+voltages are stored once and linked from the others.
+"""
+
+import hashlib
+
+import numpy as np
+from hdmf.backends.hdf5 import H5DataIO
+from hdmf.data_utils import AbstractDataChunkIterator, DataChunk
+from hdmf.utils import docval, popargs
+
+# number of samples of one chunk of a compact dataset, rounded to whole periods for periodic data
+COMPACT_CHUNK_SAMPLES = 2**16
+# look for periods of up to this many samples
+DEFAULT_MAX_PERIOD = 2**16
+# store runs of constant values when the runs are at least this long on average
+_MIN_MEAN_RUN = 64
+_N_PERIOD_PROBES = 256
+
+
+class _CompactData(AbstractDataChunkIterator):
+    """Data expanded from a compact description, by indexing or one chunk at a time when written."""
+
+    def __init__(self, n_samples, dtype, chunk_samples):
+        self._n_samples = int(n_samples)
+        self._dtype = np.dtype(dtype)
+        self._chunk_samples = max(min(int(chunk_samples), self._n_samples), 1)
+        self._chunks = None
+
+    def __len__(self):
+        return self._n_samples
+
+    @property
+    def shape(self):
+        return (self._n_samples,)
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    @property
+    def maxshape(self):
+        return (self._n_samples,)
+
+    @property
+    def fill_value(self):
+        """The value of the samples of the chunks that are not written, or None if all chunks are written."""
+        return None
+
+    def __getitem__(self, item):
+        if isinstance(item, tuple):
+            if len(item) != 1:
+                raise IndexError("too many indices, the data has one dimension")
+            item = item[0]
+        if isinstance(item, slice):
+            return self._expand(np.arange(*item.indices(self._n_samples)))
+        positions = np.asarray(item)
+        if positions.dtype == bool:
+            positions = np.flatnonzero(positions)
+        positions = np.where(positions < 0, positions + self._n_samples, positions)
+        if np.any((positions < 0) | (positions >= self._n_samples)):
+            raise IndexError(f"index {item} is out of bounds for data of length {self._n_samples}")
+        return self._expand(positions)
+
+    def __array__(self, dtype=None, copy=None):
+        return self[:] if dtype is None else self[:].astype(dtype)
+
+    def _written_chunks(self):
+        return range(-(-self._n_samples // self._chunk_samples))
+
+    def __iter__(self):
+        self._chunks = iter(self._written_chunks())
+        return self
+
+    def __next__(self):
+        if self._chunks is None:
+            self._chunks = iter(self._written_chunks())
+        chunk = next(self._chunks)
+        start = chunk * self._chunk_samples
+        stop = min(start + self._chunk_samples, self._n_samples)
+        return DataChunk(data=self[start:stop], selection=(slice(start, stop),))
+
+    def recommended_chunk_shape(self):
+        return (self._chunk_samples,)
+
+    def recommended_data_shape(self):
+        # the dataset is created with its full shape, so that the chunks that are not written hold the fill value
+        return (self._n_samples,)
+
+    def io_settings(self):
+        """Return the H5DataIO arguments to write this data: chunked, compressed, with the fill value."""
+        settings = dict(chunks=(self._chunk_samples,), compression="gzip", compression_opts=4)
+        if self.fill_value is not None:
+            settings["fillvalue"] = self.fill_value
+        return settings
+
+
+class PeriodicData(_CompactData):
+    """`n_samples` samples of a waveform repeated from its first sample, stored as one period."""
+
+    @docval(
+        {"name": "period", "type": "array_data", "doc": "the samples of one period of the waveform"},
+        {"name": "n_samples", "type": int, "doc": "the number of samples of the data"},
+        {
+            "name": "chunk_samples",
+            "type": int,
+            "doc": "the number of samples of one chunk, rounded to whole periods",
+            "default": COMPACT_CHUNK_SAMPLES,
+        },
+    )
+    def __init__(self, **kwargs):
+        period, n_samples, chunk_samples = popargs("period", "n_samples", "chunk_samples", kwargs)
+        self.period = np.asarray(period)
+        if self.period.ndim != 1 or len(self.period) == 0:
+            raise ValueError("the period must be a non-empty 1D array")
+        n_periods = max(chunk_samples // len(self.period), 1)
+        self._tiled = None
+        super().__init__(n_samples, self.period.dtype, n_periods * len(self.period))
+
+    def _expand(self, positions):
+        return self.period[positions % len(self.period)]
+
+    def __getitem__(self, item):
+        if isinstance(item, slice) and item.step in (None, 1):
+            # a range of samples that starts at a whole period, as the chunks do, is a slice of the repeated period
+            start, stop, _ = item.indices(self._n_samples)
+            if start % len(self.period) == 0 and stop - start <= self._chunk_samples:
+                if self._tiled is None:
+                    # whole periods, one more than a chunk holds when the data is shorter than whole periods
+                    self._tiled = np.tile(self.period, -(-self._chunk_samples // len(self.period)))
+                return self._tiled[: max(stop - start, 0)]
+        return super().__getitem__(item)
+
+    @property
+    def fill_value(self):
+        if np.all(self.period == self.period[0]):
+            return self.period[0]
+        return None
+
+    def _written_chunks(self):
+        return range(0 if self.fill_value is not None else -(-self._n_samples // self._chunk_samples))
+
+    def _key(self):
+        return ("periodic", self._n_samples, self.period.dtype.str, self.period.tobytes())
+
+
+class RunLengthData(_CompactData):
+    """Data made of runs of constant values, stored as the value and the length of each run."""
+
+    @docval(
+        {"name": "values", "type": "array_data", "doc": "the value of each run"},
+        {"name": "lengths", "type": "array_data", "doc": "the number of samples of each run"},
+        {
+            "name": "chunk_samples",
+            "type": int,
+            "doc": "the number of samples of one chunk",
+            "default": COMPACT_CHUNK_SAMPLES,
+        },
+    )
+    def __init__(self, **kwargs):
+        values, lengths, chunk_samples = popargs("values", "lengths", "chunk_samples", kwargs)
+        values, lengths = np.asarray(values), np.asarray(lengths, dtype=np.int64)
+        if values.ndim != 1 or values.shape != lengths.shape or len(values) == 0:
+            raise ValueError("values and lengths must be non-empty 1D arrays of the same length")
+        if np.any(lengths < 0):
+            raise ValueError("the lengths of the runs must not be negative")
+        # merge consecutive runs of the same value, so that equal data has the same description
+        keep = lengths > 0
+        values, lengths = values[keep], lengths[keep]
+        starts = np.r_[True, values[1:] != values[:-1]]
+        self.values = values[starts]
+        self.lengths = np.add.reduceat(lengths, np.flatnonzero(starts)) if len(lengths) else lengths
+        self._ends = np.cumsum(self.lengths)
+        super().__init__(self._ends[-1] if len(self._ends) else 0, values.dtype, chunk_samples)
+
+    def _expand(self, positions):
+        return self.values[np.searchsorted(self._ends, positions, side="right")]
+
+    def __getitem__(self, item):
+        if isinstance(item, slice) and item.step in (None, 1):
+            # expand the runs of a range of samples without an index per sample
+            start, stop, _ = item.indices(self._n_samples)
+            if stop <= start:
+                return self.values[:0]
+            first, last = np.searchsorted(self._ends, [start, stop - 1], side="right")
+            lengths = self.lengths[first : last + 1].copy()
+            lengths[0] -= start - (self._ends[first] - self.lengths[first])
+            lengths[-1] -= self._ends[last] - stop
+            return np.repeat(self.values[first : last + 1], lengths)
+        return super().__getitem__(item)
+
+    @property
+    def fill_value(self):
+        if len(self.values) == 0:
+            return None
+        # the value with the most samples
+        unique, inverse = np.unique(self.values, return_inverse=True)
+        return unique[np.argmax(np.bincount(inverse, weights=self.lengths))]
+
+    def _written_chunks(self):
+        # the chunks that contain samples of the runs of another value than the fill value
+        other = self.values != self.fill_value
+        first = (self._ends[other] - self.lengths[other]) // self._chunk_samples
+        last = (self._ends[other] - 1) // self._chunk_samples
+        counts = last - first + 1
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return np.unique(np.repeat(first, counts) + offsets).tolist()
+
+    def _key(self):
+        return ("runs", self._n_samples, self.values.dtype.str, self.values.tobytes(), self.lengths.tobytes())
+
+
+def _repeats(data, period, atol):
+    """Return whether every sample of `data` is within `atol` of the sample of the first period at its phase."""
+    n_periods = len(data) // period
+    whole = data[: n_periods * period].reshape(n_periods, period)
+    rest = data[n_periods * period :]
+    if not np.allclose(whole, data[:period], rtol=0, atol=atol):
+        return False
+    return np.allclose(rest, data[: len(rest)], rtol=0, atol=atol)
+
+
+def _find_period(data, max_period, atol=0.0):
+    """Return the shortest period of `data`, or None if it does not repeat.
+
+    The samples are compared to the samples of the first period, a sample repeats if it differs from them by at
+    most `atol`.
+    """
+    n_samples = len(data)
+    head = data[1 : min(max_period, n_samples // 2) + 1]
+    candidates = np.flatnonzero(np.isclose(head, data[0], rtol=0, atol=atol)) + 1
+    # samples spread over the data, to reject most candidates without comparing all the samples
+    probes = np.linspace(0, n_samples - 1, _N_PERIOD_PROBES).astype(np.int64)
+    for period in candidates:
+        if not np.allclose(data[probes], data[probes % period], rtol=0, atol=atol):
+            continue
+        if _repeats(data, period, atol):
+            return int(period)
+    return None
+
+
+_ATOL_ARG = {
+    "name": "atol",
+    "type": float,
+    "doc": "the largest difference between a sample and the sample at the same phase of the first period for the "
+    "voltage to be periodic, 0 to store only exact repeats",
+    "default": 0.0,
+}
+
+
+@docval(
+    {
+        "name": "data",
+        "type": ("array_data", "data"),
+        "doc": "the samples of the voltage, or PeriodicData or RunLengthData",
+    },
+    {
+        "name": "max_period",
+        "type": int,
+        "doc": "the maximum number of samples of a period of the voltage",
+        "default": DEFAULT_MAX_PERIOD,
+    },
+    _ATOL_ARG,
+    {
+        "name": "chunk_samples",
+        "type": int,
+        "doc": "the number of samples of one chunk",
+        "default": COMPACT_CHUNK_SAMPLES,
+    },
+    is_method=False,
+)
+def compact_voltage(**kwargs):
+    """Return the samples of a voltage as compact data wrapped in H5DataIO, or as an array if it is not compact.
+
+    Constant and piecewise-constant voltages, with runs of at least 64 samples on average, are stored as
+    `RunLengthData`; other voltages that repeat with a period of at most `max_period` samples as `PeriodicData`.
+    By default only exact repeats are periodic. With `atol`, e.g. for a waveform computed in floating point, samples
+    that differ by at most `atol` from the first period are stored as that period, so the written data differs from
+    `data` by at most `atol`.
+    """
+    data, max_period, atol, chunk_samples = popargs("data", "max_period", "atol", "chunk_samples", kwargs)
+    if isinstance(data, _CompactData):
+        return H5DataIO(data=data, **data.io_settings())
+    data = np.asarray(data)
+    if data.ndim != 1 or len(data) == 0:
+        return data
+    changed = data[1:] != data[:-1]
+    n_runs = int(np.count_nonzero(changed)) + 1
+    compact = None
+    if len(data) >= _MIN_MEAN_RUN * n_runs:
+        starts = np.r_[0, np.flatnonzero(changed) + 1]
+        lengths = np.diff(np.r_[starts, len(data)])
+        compact = RunLengthData(values=data[starts], lengths=lengths, chunk_samples=chunk_samples)
+    else:
+        period = _find_period(data, max_period, atol)
+        if period is not None:
+            compact = PeriodicData(period=data[:period], n_samples=len(data), chunk_samples=chunk_samples)
+    if compact is None:
+        return data
+    return H5DataIO(data=compact, **compact.io_settings())
+
+
+def _content_key(data):
+    """Return a key that is equal for data with the same samples in the same representation."""
+    if isinstance(data, H5DataIO):
+        data = data.data
+    if isinstance(data, _CompactData):
+        return data._key()
+    data = np.ascontiguousarray(data)
+    return ("array", data.shape, data.dtype.str, hashlib.sha1(data.tobytes()).digest())
+
+
+@docval(
+    {"name": "name", "type": str, "doc": "the name of the series"},
+    {"name": "data", "type": ("array_data", "data"), "doc": "the voltages, an array, PeriodicData or RunLengthData"},
+    {"name": "power", "type": float, "doc": "the power of the voltage, in volts"},
+    {"name": "frequency", "type": float, "doc": "the frequency of the voltage, in Hz", "default": None},
+    {"name": "rate", "type": float, "doc": "the sampling rate, in Hz", "default": None},
+    {"name": "starting_time", "type": float, "doc": "the time of the first sample, in seconds", "default": None},
+    {"name": "timestamps", "type": "array_data", "doc": "the time of each sample, in seconds", "default": None},
+    {"name": "unit", "type": str, "doc": "the unit of the voltages", "default": "volts"},
+    {"name": "description", "type": str, "doc": "the description of the series", "default": "no description"},
+    {
+        "name": "max_period",
+        "type": int,
+        "doc": "the maximum number of samples of a period of the voltage",
+        "default": DEFAULT_MAX_PERIOD,
+    },
+    _ATOL_ARG,
+)
+def create_compact_commanded_voltage_series(self, **kwargs):
+    """Create a CommandedVoltageSeries with compact data, add it to this container and return it.
+
+    The voltages are stored as with `compact_voltage`. If a series of this container created with this method has
+    the same voltages, the data of the new series is a link to its data instead of a copy.
+    """
+    data, max_period, atol = popargs("data", "max_period", "atol", kwargs)
+    data = compact_voltage(data=data, max_period=max_period, atol=atol)
+    key = _content_key(data)
+    series_names = self.__dict__.setdefault("_series_by_content", dict())
+    if key in series_names and series_names[key] in self.commanded_voltage_series:
+        data = self.commanded_voltage_series[series_names[key]]
+    else:
+        series_names[key] = kwargs["name"]
+    kwargs = {name: value for name, value in kwargs.items() if value is not None}
+    return self.create_commanded_voltage_series(data=data, **kwargs)
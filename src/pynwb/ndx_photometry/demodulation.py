@@ -0,0 +1,225 @@
+"""Separate the channels of frequency-multiplexed excitation with a lock-in demodulator.
+
+When each excitation source is modulated at its own carrier frequency, the photodetector signal is the sum of the
+responses to all the sources, each one shifted to the frequency of its carrier. The response to one source is
+recovered by multiplying the signal with a cosine and a sine at its carrier frequency (one complex exponential) and
+low-pass filtering both products: the amplitude of the filtered pair is the amplitude of the response.
+
+The demodulated series are computed while the file is written, one buffer at a time and for all the fibers at once.
+When the series of all the sources are written in step, each block of the signal is read once for all of them.
+"""
+
+import numpy as np
+from hdmf.data_utils import AbstractDataChunkIterator, GenericDataChunkIterator
+from hdmf.utils import docval, popargs
+from pynwb import TimeSeries
+
+from .photometry import _sampling_rate, get_chunk_shape, get_photometry_class
+from .processing import _copy_regions, _fir_decimate, lowpass_filter_taps
+
+
+class _BlockCache:
+    """Read blocks of samples from a dataset, keeping the last block for the other sources that need it."""
+
+    def __init__(self, series):
+        self.data = series.data
+        self.timestamps = series.timestamps
+        self.n_samples = len(series.data)
+        self._key = None
+        self._block = None
+
+    def read(self, first, last):
+        """Return the samples and the timestamps (or None) from `first` to `last`, as float64 arrays."""
+        if self._key != (first, last):
+            data = np.asarray(self.data[first:last], dtype=np.float64)
+            timestamps = None if self.timestamps is None else np.asarray(self.timestamps[first:last], dtype=np.float64)
+            self._key, self._block = (first, last), (data, timestamps)
+        return self._block
+
+
+class _DemodulateIterator(GenericDataChunkIterator):
+    """Demodulate, filter and decimate the buffers of samples requested by the HDF5 writer."""
+
+    def __init__(self, cache, frequency, rate, starting_time, factor, taps, **kwargs):
+        self._cache = cache
+        self._frequency = frequency
+        self._rate = rate
+        self._starting_time = starting_time
+        self._factor = factor
+        self._taps = taps
+        self._dtype = np.promote_types(np.dtype(cache.data.dtype), np.float32)
+        super().__init__(**kwargs)
+
+    def _get_data(self, selection):
+        first, last = selection[0].start, selection[0].stop
+        half = (len(self._taps) - 1) // 2
+        n_input = self._cache.n_samples
+        lo, hi = first * self._factor - half, (last - 1) * self._factor + half + 1
+        block, timestamps = self._cache.read(max(lo, 0), min(hi, n_input))
+        if timestamps is None:
+            timestamps = self._starting_time + np.arange(max(lo, 0), min(hi, n_input)) / self._rate
+        carrier = np.exp(-2j * np.pi * self._frequency * timestamps)
+        shape = (-1,) + (1,) * (block.ndim - 1)
+        # the product with the carrier, and the samples that exist, with zeros past the ends of the recording
+        padding = [(max(-lo, 0), max(hi - n_input, 0))] + [(0, 0)] * (block.ndim - 1)
+        mixed = np.pad(block * carrier.reshape(shape), padding)
+        n_out = last - first
+        out = 2 * np.abs(_fir_decimate(mixed, self._taps, self._factor, n_out))
+        if lo < 0 or hi > n_input:
+            # near the ends, scale by the part of the filter over samples that exist
+            valid = np.pad(np.ones(len(block)), padding[0])
+            out /= _fir_decimate(valid, self._taps, self._factor, n_out).reshape(shape)
+        return out[(slice(None),) + tuple(selection[1:])].astype(self._dtype)
+
+    def _get_maxshape(self):
+        return (-(-self._cache.n_samples // self._factor),) + tuple(self._cache.data.shape[1:])
+
+    def _get_dtype(self):
+        return self._dtype
+
+
+def _carrier_frequencies(table, rows):
+    """Return the frequency of the commanded voltage of each row of an ExcitationSourcesTable."""
+    if "commanded_voltage" not in table.colnames:
+        raise ValueError(f"the table '{table.name}' has no commanded_voltage column")
+    frequencies = []
+    for row in rows:
+        commanded_voltage = table["commanded_voltage"][row]
+        if commanded_voltage is None or commanded_voltage.frequency is None:
+            raise ValueError(f"the commanded voltage of excitation source {row} has no frequency")
+        frequencies.append(float(commanded_voltage.frequency))
+    return np.array(frequencies)
+
+
+@docval(
+    {"name": "series", "type": TimeSeries, "doc": "the photodetector signal to demodulate"},
+    {
+        "name": "excitation_sources",
+        "type": "ExcitationSourcesTable",
+        "doc": "the table of the excitation sources, by default the table referenced by the series",
+        "default": None,
+    },
+    {
+        "name": "rows",
+        "type": (list, tuple, np.ndarray),
+        "doc": "the rows of the excitation sources to demodulate, by default the rows referenced by the series",
+        "default": None,
+    },
+    {
+        "name": "bandwidth",
+        "type": (int, float),
+        "doc": "the cutoff frequency of the low-pass filter, in Hz, by default half of the smallest distance between "
+        "two carriers or between a carrier and 0 Hz",
+        "default": None,
+    },
+    {
+        "name": "factor",
+        "type": int,
+        "doc": "the downsampling factor of the demodulated series, one sample is kept out of `factor`",
+        "default": 1,
+    },
+    {
+        "name": "n_taps",
+        "type": int,
+        "doc": "the number of taps of the low-pass filter, odd, by default enough for a transition band as wide as "
+        "the bandwidth",
+        "default": None,
+    },
+    {"name": "names", "type": (list, tuple), "doc": "the names of the demodulated series", "default": None},
+    {
+        "name": "buffer_gb",
+        "type": float,
+        "doc": "the maximum size of the samples held in memory for each series while writing, in GB",
+        "default": 0.05,
+    },
+    is_method=False,
+)
+def demodulate(**kwargs):
+    """Return the response to each excitation source of a frequency-multiplexed signal, one series per source.
+
+    The carrier frequency of each source is the `frequency` of its `commanded_voltage`. Each returned
+    FiberPhotometryResponseSeries holds the amplitude of the signal at the carrier frequency of one source, low-pass
+    filtered at `bandwidth` and decimated by `factor`, for all the fibers (columns) of `series`. Its
+    `excitation_sources` region references the row of its source, and the other regions are copied from `series`.
+    By default the series are named ``<series name>_<frequency>Hz``.
+
+    The data is computed while the file is written, so the data of `series` must be readable, e.g. read from a file.
+    Write the file with ``io.write(nwbfile, exhaust_dci=False)`` so that the series are written in step and each block
+    of `series` is read once for all of them.
+    """
+    series, table, rows, bandwidth, factor, n_taps, names, buffer_gb = popargs(
+        "series", "excitation_sources", "rows", "bandwidth", "factor", "n_taps", "names", "buffer_gb", kwargs
+    )
+    if isinstance(series.data, AbstractDataChunkIterator):
+        raise ValueError("the data of the series must be readable, write the series to a file and read it first")
+    if factor < 1:
+        raise ValueError("the downsampling factor must be positive")
+    region = getattr(series, "excitation_sources", None)
+    if table is None:
+        if region is None:
+            raise ValueError("the series does not reference excitation sources, pass the excitation_sources table")
+        table = region.table
+    if rows is None:
+        rows = list(region.data[:]) if region is not None and region.table is table else list(range(len(table)))
+    rows = [int(row) for row in rows]
+    if names is not None and len(names) != len(rows):
+        raise ValueError("there must be one name per excitation source")
+
+    rate = _sampling_rate(series)
+    frequencies = _carrier_frequencies(table, rows)
+    if np.any(frequencies <= 0) or np.any(frequencies >= rate / 2):
+        raise ValueError(f"the carrier frequencies must be between 0 Hz and the Nyquist frequency, {rate / 2:g} Hz")
+    if len(np.unique(frequencies)) != len(frequencies):
+        raise ValueError("the excitation sources must have different carrier frequencies")
+    if bandwidth is None:
+        bandwidth = np.diff(np.unique(np.r_[0.0, frequencies])).min() / 2
+    if bandwidth > rate / (2 * factor):
+        raise ValueError(
+            f"the bandwidth must be at most the Nyquist frequency after downsampling, {rate / factor / 2:g}"
+        )
+    if n_taps is None:
+        # the transition band of a Hamming window is about 3.3 / n_taps of the sampling rate wide
+        n_taps = int(np.ceil(3.3 * rate / bandwidth)) // 2 * 2 + 1
+    taps = lowpass_filter_taps(rate / (2 * bandwidth), n_taps)
+
+    shape = tuple(np.shape(series.data))
+    n_fibers = int(np.prod(shape[1:], dtype=np.int64))
+    n_output = -(-shape[0] // factor)
+    chunk_shape = get_chunk_shape(rate=rate / factor, n_fibers=max(n_fibers, 1), n_samples=max(n_output, 1))
+    if series.rate is not None:
+        timing = dict(rate=rate / factor, starting_time=series.starting_time)
+    elif factor == 1:
+        timing = dict(timestamps=series)
+    else:
+        timing = dict(timestamps=np.asarray(series.timestamps[::factor]))
+
+    series_cls = get_photometry_class("FiberPhotometryResponseSeries")
+    cache = _BlockCache(series)
+    demodulated = []
+    for i, (row, frequency) in enumerate(zip(rows, frequencies)):
+        data = _DemodulateIterator(
+            cache,
+            frequency,
+            rate,
+            float(series.starting_time or 0.0),
+            factor,
+            taps,
+            buffer_gb=buffer_gb,
+            chunk_shape=chunk_shape[: len(shape)],
+        )
+        regions = _copy_regions(series)
+        regions["excitation_sources"] = table.create_excitation_source_region(
+            region=[row], description=f"the excitation source modulated at {frequency:g} Hz"
+        )
+        demodulated.append(
+            series_cls(
+                name=f"{series.name}_{frequency:g}Hz" if names is None else names[i],
+                data=data,
+                unit=series.unit,
+                description=f"{series.name} demodulated at {frequency:g} Hz, low-pass filtered at {bandwidth:g} Hz "
+                f"({n_taps} taps)" + (f" and downsampled by {factor}" if factor > 1 else ""),
+                **regions,
+                **timing,
+            )
+        )
+    return demodulated
@@ -0,0 +1,180 @@
+"""Export the FiberPhotometry metadata as a single fiber-level table.
+
+The columns of the fibers table that reference rows of the other tables (regions such as `fluorophores`,
+`excitation_source` or `photodetector`) are resolved by indexing numpy arrays of the referenced columns, which are
+each read once. A ragged region column is exploded into one row per (fiber, referenced row) pair from the offsets
+of its index, without a loop over the rows.
+"""
+
+import numpy as np
+import pandas as pd
+from hdmf.common import DynamicTableRegion, VectorIndex
+from hdmf.container import AbstractContainer
+from hdmf.utils import docval, popargs
+
+# attributes of the referenced series added next to their names, when the series have them
+_SERIES_FIELDS = ("frequency", "power")
+
+
+def _column_values(column):
+    """Read all the values of a column into a numpy array, with references to other objects replaced by names."""
+    values = column.data[:] if hasattr(column.data, "shape") else column.data
+    if len(values) and isinstance(values[0], AbstractContainer):
+        return np.array([value.name for value in values], dtype=object), list(values)
+    values = np.asarray(values)
+    if values.dtype.kind == "S":
+        values = values.astype(str).astype(object)
+    return values, None
+
+
+def _take(values, rows):
+    """Return values[rows], with missing values where rows is -1."""
+    missing = rows < 0
+    taken = values[np.where(missing, 0, rows)] if len(values) else np.empty((len(rows),) + values.shape[1:])
+    if missing.any():
+        if taken.dtype.kind in "iub":
+            taken = taken.astype(np.float64)
+        elif taken.dtype.kind not in "fc":
+            taken = taken.astype(object)
+        taken[missing] = np.nan if taken.dtype.kind in "fc" else None
+    return taken
+
+
+def _split_columns(table):
+    """Return the plain columns, the single-valued regions and the ragged columns (with their index) of a table."""
+    plain, regions, ragged = dict(), dict(), dict()
+    indices = {id(column.target): column for column in table.columns if isinstance(column, VectorIndex)}
+    for column in table.columns:
+        if isinstance(column, VectorIndex):
+            continue
+        index = indices.get(id(column))
+        if index is not None:
+            ragged[column.name] = (column, index)
+        elif isinstance(column, DynamicTableRegion):
+            regions[column.name] = column
+        else:
+            plain[column.name] = column
+    return plain, regions, ragged
+
+
+def _ragged_lists(column, index):
+    """Return the values of a ragged column as an object array with one array per row."""
+    ends = np.asarray(index.data[:], dtype=np.int64)
+    lists = np.empty(len(ends), dtype=object)
+    lists[:] = np.split(np.asarray(column.data[:]), ends[:-1])
+    return lists
+
+
+def _add_table_columns(out, prefix, table, rows):
+    """Add the columns of `table` at `rows` (-1 for none) to `out`, with names starting with `prefix`."""
+    out[f"{prefix}id"] = _take(np.asarray(table.id.data[:]), rows)
+    plain, regions, ragged = _split_columns(table)
+    for name, column in plain.items():
+        values, objects = _column_values(column)
+        out[f"{prefix}{name}"] = _take(values, rows)
+        if objects is not None:
+            for field in _SERIES_FIELDS:
+                if all(hasattr(obj, field) for obj in objects):
+                    field_values = np.array(
+                        [np.nan if getattr(obj, field) is None else getattr(obj, field) for obj in objects]
+                    )
+                    out[f"{prefix}{name}_{field}"] = _take(field_values, rows)
+    for name, column in regions.items():
+        out[f"{prefix}{name}"] = _take(np.asarray(column.data[:]), rows)
+    for name, (column, index) in ragged.items():
+        # ragged columns of the referenced tables are not exploded, keep the values of each row as an array
+        out[f"{prefix}{name}"] = _take(_ragged_lists(column, index), rows)
+
+
+def _explode(index, n_rows):
+    """Return, for each row of the exploded table, the fiber row and the position in the flattened column.
+
+    Fibers that reference no rows are kept, with a position of -1.
+    """
+    ends = np.asarray(index.data[:], dtype=np.int64)
+    counts = np.diff(ends, prepend=0)
+    fiber_rows = np.repeat(np.arange(n_rows), np.maximum(counts, 1))
+    positions = np.full(len(fiber_rows), -1, dtype=np.int64)
+    positions[counts[fiber_rows] > 0] = np.arange(ends[-1] if len(ends) else 0)
+    return fiber_rows, positions
+
+
+def _fibers_columns(fiber_photometry, explode=None):
+    """Return the columns of the denormalized fibers table, as a dict of numpy arrays.
+
+    See `to_dataframe` for the layout of the table.
+    """
+    fibers = fiber_photometry.fibers
+    n_fibers = len(fibers)
+    _, regions, ragged = _split_columns(fibers)
+    ragged_regions = {name: value for name, value in ragged.items() if isinstance(value[0], DynamicTableRegion)}
+    if explode is None and ragged_regions:
+        explode = "fluorophores" if "fluorophores" in ragged_regions else next(iter(ragged_regions))
+    if explode is not None and explode not in ragged_regions:
+        raise ValueError(f"'{explode}' is not a ragged region column of the fibers table")
+
+    if explode is None:
+        fiber_rows, positions = np.arange(n_fibers), None
+    else:
+        fiber_rows, positions = _explode(ragged_regions[explode][1], n_fibers)
+
+    out = dict()
+    _add_table_columns(out, "fiber_", fibers, fiber_rows)
+    # the regions of the fibers table are replaced by the columns of the rows they reference
+    for name in list(regions) + list(ragged_regions):
+        out.pop(f"fiber_{name}")
+    for name, column in regions.items():
+        _add_table_columns(out, f"{name}_", column.table, _take(np.asarray(column.data[:]), fiber_rows))
+    if explode is not None:
+        column = ragged_regions[explode][0]
+        rows = np.asarray(column.data[:], dtype=np.int64)[np.maximum(positions, 0)]
+        rows[positions < 0] = -1
+        _add_table_columns(out, f"{explode}_", column.table, rows)
+    for name, (column, index) in ragged_regions.items():
+        if name != explode:
+            out[f"{name}_id"] = _ragged_lists(column, index)[fiber_rows]
+    return out
+
+
+_EXPLODE_ARG = {
+    "name": "explode",
+    "type": str,
+    "doc": "the ragged region column of the fibers table to explode, by default `fluorophores`",
+    "default": None,
+}
+
+
+@docval(_EXPLODE_ARG)
+def to_dataframe(self, **kwargs):
+    """Return the fibers with the rows of the tables they reference as one pandas DataFrame.
+
+    There is one row per fiber, or per (fiber, referenced row) pair for the ragged region column `explode` (by
+    default `fluorophores` if it is a ragged region, or the only ragged region column). The columns of the fibers
+    table are prefixed with ``fiber_``; each region column `name` of the fibers table is replaced by the columns of
+    the rows it references, prefixed with ``name_``. References to series hold their names. Values of the rows that do
+    not exist, e.g. for a fiber without fluorophores, are missing.
+    """
+    explode = popargs("explode", kwargs)
+    columns = _fibers_columns(self, explode=explode)
+    return pd.DataFrame({name: list(values) if values.ndim > 1 else values for name, values in columns.items()})
+
+
+@docval(_EXPLODE_ARG)
+def to_arrow(self, **kwargs):
+    """Return the table of `to_dataframe` as a pyarrow Table. Requires pyarrow."""
+    explode = popargs("explode", kwargs)
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError("to_arrow requires pyarrow, install it with `pip install ndx-photometry[arrow]`") from None
+
+    arrays = dict()
+    for name, values in _fibers_columns(self, explode=explode).items():
+        if values.ndim > 1:
+            flat = pa.array(values.reshape(-1), from_pandas=True)
+            arrays[name] = pa.FixedSizeListArray.from_arrays(flat, int(np.prod(values.shape[1:])))
+        elif values.dtype == object:
+            arrays[name] = pa.array([v.tolist() if isinstance(v, np.ndarray) else v for v in values])
+        else:
+            arrays[name] = pa.array(values, from_pandas=True)
+    return pa.table(arrays)
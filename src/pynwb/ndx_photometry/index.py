@@ -0,0 +1,123 @@
+"""Find the response series that reference given rows of the FiberPhotometry metadata tables.
+
+The regions of all the response series of a file are read once and inverted into a dict from (table, row) to the
+series that reference that row, which is cached on the FiberPhotometry container. A series that references a fiber
+also references the rows that the fibers table references for that fiber, e.g. its fluorophores.
+"""
+
+from collections import defaultdict
+
+import numpy as np
+from hdmf.common import DynamicTableRegion
+from hdmf.utils import docval, popargs
+
+from .export import _ragged_lists, _split_columns
+
+_REGIONS = ("fibers", "fluorophores", "photodetectors", "excitation_sources")
+
+
+def _fiber_references(fibers):
+    """Return, for each region column of a fibers table, its table and the rows referenced by each fiber."""
+    _, regions, ragged = _split_columns(fibers)
+    references = []
+    for column in regions.values():
+        references.append((column.table, [[row] for row in np.asarray(column.data[:]).tolist()]))
+    for column, index in ragged.values():
+        if isinstance(column, DynamicTableRegion):
+            references.append((column.table, [rows.tolist() for rows in _ragged_lists(column, index)]))
+    return references
+
+
+class _SeriesIndex:
+    """The series of a file that reference each row of the tables."""
+
+    def __init__(self, root):
+        # imported here, the module is imported by the module that generates the classes
+        from .photometry import get_photometry_class
+
+        series_cls = get_photometry_class("FiberPhotometryResponseSeries")
+        self.series = [obj for obj in root.all_children() if isinstance(obj, series_cls)]
+        rows_to_series = defaultdict(set)
+        fiber_references = dict()
+        for position, series in enumerate(self.series):
+            for name in _REGIONS:
+                region = getattr(series, name, None)
+                if region is None:
+                    continue
+                rows = np.unique(np.asarray(region.data[:])).tolist()
+                for row in rows:
+                    rows_to_series[id(region.table), row].add(position)
+                if name != "fibers":
+                    continue
+                # the rows referenced by the fibers of the series
+                if id(region.table) not in fiber_references:
+                    fiber_references[id(region.table)] = _fiber_references(region.table)
+                for table, referenced in fiber_references[id(region.table)]:
+                    for row in rows:
+                        for referenced_row in referenced[row]:
+                            rows_to_series[id(table), referenced_row].add(position)
+        self.rows_to_series = {key: frozenset(positions) for key, positions in rows_to_series.items()}
+
+    def find(self, table, rows):
+        """Return the positions of the series that reference any of `rows` of `table`."""
+        found = set()
+        for row in rows:
+            found.update(self.rows_to_series.get((id(table), row), ()))
+        return found
+
+
+def _root(container):
+    while container.parent is not None:
+        container = container.parent
+    return container
+
+
+_ROWS_TYPES = (int, np.integer, list, tuple, np.ndarray)
+
+
+@docval(
+    {"name": "fibers", "type": _ROWS_TYPES, "doc": "the row or rows of the fibers table", "default": None},
+    {"name": "fluorophores", "type": _ROWS_TYPES, "doc": "the row or rows of the fluorophores table", "default": None},
+    {
+        "name": "photodetectors",
+        "type": _ROWS_TYPES,
+        "doc": "the row or rows of the photodetectors table",
+        "default": None,
+    },
+    {
+        "name": "excitation_sources",
+        "type": _ROWS_TYPES,
+        "doc": "the row or rows of the excitation sources table",
+        "default": None,
+    },
+    {"name": "rebuild", "type": bool, "doc": "rebuild the index of the series of the file", "default": False},
+)
+def get_response_series(self, **kwargs):
+    """Return the response series of the file that reference the given rows of the tables of this container.
+
+    A series matches when it references at least one of the given rows of each given table, through its own regions
+    or through the fibers that it references. For example, the dLight traces in VTA are
+    ``get_response_series(fluorophores=dlight_rows, fibers=vta_rows)``. With no rows, all the response series of the
+    file are returned.
+
+    The index of the series of the file is built on the first call and cached. Pass ``rebuild=True`` after adding
+    series to the file.
+    """
+    rebuild = popargs("rebuild", kwargs)
+    if self.parent is None:
+        raise ValueError(f"'{self.name}' is not in an NWB file, add it to the file before looking up series")
+    root = _root(self)
+    index = self.__dict__.get("_series_index")
+    if rebuild or index is None:
+        index = self.__dict__["_series_index"] = _SeriesIndex(root)
+
+    found = None
+    for name, rows in kwargs.items():
+        if rows is None:
+            continue
+        rows = [int(rows)] if isinstance(rows, (int, np.integer)) else np.asarray(rows, dtype=np.int64).tolist()
+        positions = index.find(getattr(self, name), rows)
+        found = positions if found is None else found & positions
+    if found is None:
+        found = range(len(index.series))
+    return [index.series[position] for position in sorted(found)]
@@ -0,0 +1,372 @@
+"""Opt-in timing of the operations of ndx-photometry: where the time goes when building, writing and reading files.
+
+Inside ``with instrument(sink):`` each of these operations is reported to the sink as a `TimingEvent`, with the
+neurodata type it applies to:
+
+- ``load_namespaces``: loading namespaces from spec files or from a file being read (and, with ``startup=True``,
+  loading the ndx-photometry namespace when the package was imported)
+- ``generate_class``: generating the class of a neurodata type
+- ``add_row`` and ``add_rows``: adding rows to a table
+- ``create_region``: creating the regions of a table
+- ``construct``: constructing a table, series or container, in memory or when a file is read
+- ``write`` and ``read``: writing data to and reading data from the HDF5 datasets of a neurodata type, with the
+  number of (uncompressed) bytes
+
+Only the outermost operation is reported when operations are nested, e.g. `add_rows` does not also report the rows
+it adds. An instrumentation reports the operations of the thread, or asyncio task, that entered it, and of the tasks
+created inside it, not those of other threads.
+
+The timed methods are replaced on their classes while an instrumentation is active, so there is no cost otherwise,
+but the replacement is process-global: ``NamespaceCatalog.load_namespaces``, ``DynamicTable.add_row``,
+``HDF5IO.write_dataset``, ``h5py.Dataset.__getitem__`` and ``__setitem__``, and the ``__init__`` of the ndx-photometry
+classes go through a wrapper in every thread, which only times them in the instrumented contexts.
+"""
+
+import contextlib
+import contextvars
+import functools
+import inspect
+import logging
+import threading
+import time
+from collections import namedtuple
+from collections.abc import Callable, MutableMapping
+
+import h5py
+import numpy as np
+from hdmf.backends.hdf5 import HDF5IO
+from hdmf.common import DynamicTable
+from hdmf.spec.namespace import NamespaceCatalog
+from hdmf.utils import docval, get_docval, popargs
+
+TimingEvent = namedtuple("TimingEvent", ["operation", "neurodata_type", "seconds", "nbytes"])
+TimingEvent.__doc__ = "The wall time and number of bytes of one operation on a neurodata type (or None)."
+
+_lock = threading.Lock()
+_local = threading.local()
+# the active instrumentations of all threads, replaced (not mutated) so that it can be read without the lock
+_active = ()
+# the instrumentations that the operations of the current thread or task are reported to
+_context = contextvars.ContextVar("ndx_photometry_instrumentations", default=())
+# the operations of the import of the package, replayed to the instrumentations entered with startup=True
+_startup = []
+_importing = False
+_NO_TIMER = contextlib.nullcontext()
+
+
+def _emit(event):
+    if _importing:
+        _startup.append(event)
+    for instrumentation in _context.get():
+        instrumentation._emit(event)
+
+
+class _Timer:
+    """Time an operation, unless it runs inside another timed operation of the same thread."""
+
+    __slots__ = ("operation", "neurodata_type", "nbytes", "_start")
+
+    def __init__(self, operation, neurodata_type, nbytes=0):
+        self.operation = operation
+        self.neurodata_type = neurodata_type
+        self.nbytes = nbytes
+
+    def __enter__(self):
+        depth = getattr(_local, "depth", 0)
+        _local.depth = depth + 1
+        self._start = time.perf_counter() if depth == 0 else None
+        return self
+
+    def __exit__(self, *exc_info):
+        _local.depth -= 1
+        if self._start is not None:
+            seconds = time.perf_counter() - self._start
+            _emit(TimingEvent(self.operation, self.neurodata_type, seconds, self.nbytes))
+
+
+def _timed(operation, neurodata_type=None):
+    """Return a context manager that reports the operation to the active instrumentations, if any."""
+    if not _active and not _importing:
+        return _NO_TIMER
+    return _Timer(operation, neurodata_type)
+
+
+def _timed_method(operation):
+    """Decorate a function to report it as the operation, on the neurodata type of its first argument."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(obj, *args, **kwargs):
+            if not _active and not _importing:
+                return func(obj, *args, **kwargs)
+            with _Timer(operation, type(obj).__name__):
+                return func(obj, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _neurodata_type(obj):
+    """Return the ndx-photometry neurodata type of a container, or None for the types of other namespaces."""
+    from .photometry import _classes
+
+    name = type(obj).__name__
+    return name if _classes.get(name) is type(obj) else None
+
+
+# the methods of hdmf and h5py replaced while an instrumentation is active, as (owner, name, wrapper factory)
+_PATCHES = []
+
+
+def _patch(owner, name):
+    def decorator(factory):
+        _PATCHES.append((owner, name, factory))
+        return factory
+
+    return decorator
+
+
+@_patch(NamespaceCatalog, "load_namespaces")
+def _load_namespaces(original):
+    def load_namespaces(self, *args, **kwargs):
+        with _timed("load_namespaces"):
+            return original(self, *args, **kwargs)
+
+    return load_namespaces
+
+
+@_patch(DynamicTable, "add_row")
+def _add_row(original):
+    def add_row(self, *args, **kwargs):
+        neurodata_type = _neurodata_type(self)
+        if neurodata_type is None:
+            return original(self, *args, **kwargs)
+        with _timed("add_row", neurodata_type):
+            return original(self, *args, **kwargs)
+
+    return add_row
+
+
+# the neurodata type of the datasets accessed while instrumented, by h5py object id
+_dataset_types = dict()
+
+
+def _dataset_type(dataset):
+    """Return the ndx-photometry neurodata type that a dataset belongs to, or None."""
+    from .photometry import NEURODATA_TYPES
+
+    key = dataset.id
+    if key not in _dataset_types:
+        neurodata_type, obj = None, dataset
+        while True:
+            value = obj.attrs.get("neurodata_type")
+            if isinstance(value, bytes):
+                value = value.decode()
+            if value in NEURODATA_TYPES:
+                neurodata_type = value
+                break
+            if obj.name in ("/", None):
+                break
+            obj = obj.parent
+        _dataset_types[key] = neurodata_type
+    return _dataset_types[key]
+
+
+def _builder_type(builder):
+    """Return the ndx-photometry neurodata type that a builder belongs to, or None."""
+    from .photometry import NEURODATA_TYPES
+
+    while builder is not None:
+        if builder.attributes.get("neurodata_type") in NEURODATA_TYPES:
+            return builder.attributes["neurodata_type"]
+        builder = builder.parent
+    return None
+
+
+def _signature(func):
+    """Return the signature of a method, with the arguments of its docval if it has one."""
+    arguments = get_docval(func)
+    if not arguments:
+        return inspect.signature(func)
+    parameters = [inspect.Parameter("self", inspect.Parameter.POSITIONAL_OR_KEYWORD)]
+    for argument in arguments:
+        default = argument.get("default", inspect.Parameter.empty)
+        parameters.append(inspect.Parameter(argument["name"], inspect.Parameter.POSITIONAL_OR_KEYWORD, default=default))
+    return inspect.Signature(parameters)
+
+
+@_patch(HDF5IO, "write_dataset")
+def _write_dataset(original):
+    signature = _signature(original)
+
+    def write_dataset(self, *args, **kwargs):
+        # the attributes of the groups are written after their datasets, take the neurodata type from the builders
+        previous = getattr(_local, "writing", None)
+        _local.writing = _builder_type(signature.bind_partial(self, *args, **kwargs).arguments.get("builder"))
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            _local.writing = previous
+
+    return write_dataset
+
+
+@_patch(h5py.Dataset, "__getitem__")
+def _read(original):
+    def __getitem__(self, args, *more):
+        neurodata_type = _dataset_type(self)
+        if neurodata_type is None:
+            return original(self, args, *more)
+        with _timed("read", neurodata_type) as timer:
+            values = original(self, args, *more)
+            if timer is not None:
+                timer.nbytes = getattr(values, "nbytes", 0)
+        return values
+
+    return __getitem__
+
+
+@_patch(h5py.Dataset, "__setitem__")
+def _write(original):
+    def __setitem__(self, args, values):
+        neurodata_type = getattr(_local, "writing", None) or _dataset_type(self)
+        if neurodata_type is None:
+            return original(self, args, values)
+        with _timed("write", neurodata_type) as timer:
+            if timer is not None:
+                timer.nbytes = values.nbytes if hasattr(values, "nbytes") else np.asarray(values).nbytes
+            return original(self, args, values)
+
+    return __setitem__
+
+
+def _construct(original):
+    def __init__(self, *args, **kwargs):
+        with _timed("construct", type(self).__name__):
+            return original(self, *args, **kwargs)
+
+    return __init__
+
+
+# the replaced methods, by (owner, name)
+_originals = dict()
+
+
+def _replace(owner, name, factory):
+    original = owner.__dict__[name]
+    wrapper = factory(original)
+    # keep the docval arguments, hdmf reads them e.g. to map the fields of a class
+    wrapper.__dict__.update(original.__dict__)
+    wrapper.__doc__ = original.__doc__
+    _originals[owner, name] = original
+    setattr(owner, name, wrapper)
+
+
+def _patch_class(cls):
+    """Time the construction of the instances of a generated class, while an instrumentation is active."""
+    with _lock:
+        if _active and "__init__" in cls.__dict__ and (cls, "__init__") not in _originals:
+            _replace(cls, "__init__", _construct)
+
+
+def _install():
+    from .photometry import _classes
+
+    for owner, name, factory in _PATCHES:
+        _replace(owner, name, factory)
+    for cls in list(_classes.values()):
+        if "__init__" in cls.__dict__:
+            _replace(cls, "__init__", _construct)
+
+
+def _uninstall():
+    for (owner, name), original in _originals.items():
+        setattr(owner, name, original)
+    _originals.clear()
+    _dataset_types.clear()
+
+
+class Instrumentation:
+    """Report the timed operations of ndx-photometry to a sink while this context manager is active."""
+
+    @docval(
+        {
+            "name": "sink",
+            "type": (MutableMapping, logging.Logger, Callable),
+            "doc": "where to report each TimingEvent: a dict that totals the calls, seconds and bytes of each "
+            "(operation, neurodata_type), a logger, or a function called with each event",
+        },
+        {"name": "level", "type": int, "doc": "the level of the messages logged to a logger", "default": logging.INFO},
+        {
+            "name": "startup",
+            "type": bool,
+            "doc": "also report the operations of the import of the package, on entering",
+            "default": False,
+        },
+    )
+    def __init__(self, **kwargs):
+        self.sink, self.level, self.startup = popargs("sink", "level", "startup", kwargs)
+        self._sink_lock = threading.Lock()
+
+    def _emit(self, event):
+        sink = self.sink
+        if isinstance(sink, MutableMapping):
+            with self._sink_lock:
+                totals = sink.get((event.operation, event.neurodata_type))
+                if totals is None:
+                    totals = sink[event.operation, event.neurodata_type] = dict(calls=0, seconds=0.0, bytes=0)
+                totals["calls"] += 1
+                totals["seconds"] += event.seconds
+                totals["bytes"] += event.nbytes
+        elif isinstance(sink, logging.Logger):
+            sink.log(
+                self.level,
+                "%s %s: %.6f s, %d bytes",
+                event.operation,
+                event.neurodata_type or "-",
+                event.seconds,
+                event.nbytes,
+            )
+        else:
+            sink(event)
+
+    def __enter__(self):
+        global _active
+        with _lock:
+            if self in _active:
+                raise RuntimeError("this instrumentation is already active")
+            _active = _active + (self,)
+            if len(_active) == 1:
+                _install()
+        _context.set(_context.get() + (self,))
+        if self.startup:
+            for event in _startup:
+                self._emit(event)
+        return self
+
+    def __exit__(self, *exc_info):
+        global _active
+        _context.set(tuple(instrumentation for instrumentation in _context.get() if instrumentation is not self))
+        with _lock:
+            _active = tuple(instrumentation for instrumentation in _active if instrumentation is not self)
+            if not _active:
+                _uninstall()
+
+
+@docval(*Instrumentation.__init__.__docval__["args"], is_method=False)
+def instrument(**kwargs):
+    """Return a context manager that reports the timed operations of ndx-photometry to a sink.
+
+    For example, to total the time and bytes of each operation of a script::
+
+        metrics = dict()
+        with instrument(metrics):
+            ...
+        metrics["write", "FiberPhotometryResponseSeries"]  # {"calls": ..., "seconds": ..., "bytes": ...}
+
+    Only the operations of the thread or asyncio task that enters it, and of the tasks it creates, are reported,
+    e.g. not those of a thread pool. The timed methods of hdmf and h5py are replaced for the whole process while it is
+    active. Data read with `read_data` or `as_memmap` bypasses h5py and is not reported.
+    """
+    return Instrumentation(**kwargs)
@@ -0,0 +1,192 @@
+"""Read the rows of a table without resolving the rows that its region columns reference.
+
+`DynamicTable.__getitem__` and `to_dataframe` replace each reference to another table by a DataFrame of the
+referenced rows, one row at a time. `read_rows` reads each column with one read per run of nearby requested rows,
+and keeps the references as row indices, or as `RowReference` objects that read the referenced rows on access: the
+first access reads the rows referenced by all the requested rows of the column at once.
+"""
+
+import numpy as np
+import pandas as pd
+from hdmf.common import DynamicTableRegion
+from hdmf.container import AbstractContainer
+from hdmf.utils import docval, popargs
+
+from .export import _split_columns
+
+_REFERENCES = ("index", "proxy")
+
+
+class _Resolver:
+    """Read the rows of a table referenced by a region column, all at once on first access."""
+
+    def __init__(self, table, rows):
+        self.table = table
+        self.rows = rows
+        self._resolved = None
+
+    def get(self, rows):
+        if self._resolved is None:
+            # one read of all the referenced rows, instead of one read per reference
+            self._unique = np.unique(self.rows)
+            if len(self._unique):
+                self._resolved = self.table[self._unique.tolist()]
+            else:
+                self._resolved = pd.DataFrame(columns=self.table.colnames, index=pd.Index([], name="id"))
+        return self._resolved.iloc[np.searchsorted(self._unique, np.atleast_1d(rows))]
+
+
+class RowReference:
+    """The rows of a table referenced by one row of a region column, read when `resolve` is called."""
+
+    __slots__ = ("index", "_resolver")
+
+    def __init__(self, index, resolver):
+        self.index = index
+        self._resolver = resolver
+
+    @property
+    def table(self):
+        """The referenced table."""
+        return self._resolver.table
+
+    def resolve(self):
+        """Return the referenced rows as a DataFrame."""
+        return self._resolver.get(self.index)
+
+    def __repr__(self):
+        index = self.index.tolist() if isinstance(self.index, np.ndarray) else self.index
+        return f"RowReference({self._resolver.table.name!r}, {index})"
+
+
+def _positions(key, n_rows):
+    if key is None:
+        return np.arange(n_rows)
+    if isinstance(key, slice):
+        return np.arange(*key.indices(n_rows))
+    positions = np.atleast_1d(np.asarray(key, dtype=np.int64))
+    positions = np.where(positions < 0, positions + n_rows, positions)
+    if positions.ndim != 1 or np.any((positions < 0) | (positions >= n_rows)):
+        raise IndexError(f"rows {key} are out of range for this table of length {n_rows}")
+    return positions
+
+
+# rows separated by less than this many bytes are read together, reading the gap is cheaper than another read
+_MAX_GAP_BYTES = 64 * 1024
+
+
+def _as_array(values):
+    """Return the values read from a dataset as a numpy array, with containers and bytes as objects."""
+    if len(values) and isinstance(values[0], AbstractContainer):
+        objects = np.empty(len(values), dtype=object)
+        objects[:] = list(values)
+        values = objects
+    values = np.asarray(values)
+    if values.dtype.kind == "S":
+        values = values.astype(str).astype(object)
+    return values
+
+
+def _runs(positions, row_bytes):
+    """Split sorted unique positions into (first, last) ranges, merging the ones separated by a small gap."""
+    max_gap = _MAX_GAP_BYTES // max(row_bytes, 1)
+    breaks = np.flatnonzero(np.diff(positions) - 1 > max_gap) + 1
+    starts, stops = np.r_[0, breaks], np.r_[breaks, len(positions)]
+    return positions[starts], positions[stops - 1] + 1
+
+
+def _read(data, positions):
+    """Read the values of `data` at `positions`, with one read per run of close positions."""
+    if len(positions) == 0:
+        return _as_array(data[:0])
+    unique = np.unique(positions)
+    shape = getattr(data, "shape", None)
+    row_bytes = np.dtype(getattr(data, "dtype", np.float64)).itemsize
+    if shape is not None:
+        row_bytes *= int(np.prod(shape[1:], dtype=np.int64))
+    firsts, lasts = _runs(unique, row_bytes)
+    blocks = [_as_array(data[int(first) : int(last)]) for first, last in zip(firsts, lasts)]
+    values = blocks[0] if len(blocks) == 1 else np.concatenate(blocks)
+    # the position of each run in the values read
+    offsets = np.r_[0, np.cumsum(lasts - firsts)[:-1]]
+    runs = np.searchsorted(firsts, positions, side="right") - 1
+    return values[offsets[runs] + positions - firsts[runs]]
+
+
+def _read_ragged(column, index, positions):
+    """Read the values of a ragged column at `positions`, as an object array with one array per row."""
+    lists = np.empty(len(positions), dtype=object)
+    if len(positions) == 0:
+        return lists
+    # the end of each row, and of the row before it
+    previous = positions[positions > 0] - 1
+    ends = _read(index.data, np.r_[positions, previous]).astype(np.int64)
+    stops = ends[: len(positions)]
+    starts = np.zeros(len(positions), dtype=np.int64)
+    starts[positions > 0] = ends[len(positions) :]
+    lengths = stops - starts
+    total = int(lengths.sum())
+    values = None
+    if total:
+        offsets = np.r_[0, np.cumsum(lengths)[:-1]]
+        values = _read(column.data, np.repeat(starts - offsets, lengths) + np.arange(total))
+    offset = 0
+    for i, length in enumerate(lengths):
+        lists[i] = values[offset : offset + length] if values is not None else np.empty(0, dtype=np.int64)
+        offset += length
+    return lists
+
+
+@docval(
+    {
+        "name": "key",
+        "type": (int, np.integer, slice, list, tuple, np.ndarray),
+        "doc": "the rows to read, all of them by default",
+        "default": None,
+    },
+    {
+        "name": "references",
+        "type": str,
+        "doc": "how to return the values of the region columns: 'index' for the referenced row indices, 'proxy' for "
+        "RowReference objects that read the referenced rows on access",
+        "default": "proxy",
+    },
+)
+def read_rows(self, **kwargs):
+    """Return rows of this table as a DataFrame indexed by id, without resolving the rows its regions reference.
+
+    Each column is read once. The values of a region column are the indices of the referenced rows (an array per
+    row for a ragged column) or, with ``references="proxy"``, RowReference objects whose `resolve` method returns the
+    referenced rows as a DataFrame. Resolving one reference of a column reads the rows referenced by all the rows
+    that were read, in one batch.
+    """
+    key, references = popargs("key", "references", kwargs)
+    if references not in _REFERENCES:
+        raise ValueError(f"references must be one of {_REFERENCES}, not '{references}'")
+    positions = _positions(key, len(self))
+    plain, regions, ragged = _split_columns(self)
+    columns = dict()
+    for name in self.colnames:
+        if name in plain:
+            values = _read(plain[name].data, positions)
+            columns[name] = list(values) if values.ndim > 1 else values
+            continue
+        if name in regions:
+            rows = _read(regions[name].data, positions).astype(np.int64)
+            all_rows, table = rows, regions[name].table
+        else:
+            column, index = ragged[name]
+            rows = _read_ragged(column, index, positions)
+            if not isinstance(column, DynamicTableRegion):
+                columns[name] = rows
+                continue
+            all_rows = np.concatenate(list(rows)).astype(np.int64) if len(rows) else np.empty(0, dtype=np.int64)
+            table = column.table
+        if references == "proxy":
+            resolver = _Resolver(table, all_rows)
+            proxies = np.empty(len(rows), dtype=object)
+            proxies[:] = [RowReference(row, resolver) for row in rows]
+            rows = proxies
+        columns[name] = rows
+    ids = _read(self.id.data, positions)
+    return pd.DataFrame(columns, index=pd.Index(ids, name="id"))
@@ -0,0 +1,69 @@
+"""Read uncompressed, contiguous HDF5 datasets as memory maps of the file instead of copies.
+
+The data of a contiguous dataset without filters is stored as one block of raw values at a known offset in the
+file, so numpy can map it directly: pages are only read when they are accessed, shared between the processes that
+map the same file, and repeated scans over the array do not allocate new copies.
+"""
+
+import h5py
+import numpy as np
+from hdmf.utils import docval, popargs
+
+# drivers that read the file from a local path, which numpy can map
+_MAPPABLE_DRIVERS = ("sec2", "stdio")
+
+
+def as_memmap(dataset):
+    """Return a read-only numpy.memmap over an HDF5 dataset, or None if its layout does not allow it.
+
+    The dataset must be an h5py.Dataset with a contiguous, allocated layout, no filters and a numeric dtype, in a file
+    opened from a local path.
+    """
+    if not isinstance(dataset, h5py.Dataset) or dataset.file.driver not in _MAPPABLE_DRIVERS:
+        return None
+    if dataset.dtype.kind not in "biufc" or dataset.size == 0 or dataset.external:
+        return None
+    create_plist = dataset.id.get_create_plist()
+    if create_plist.get_layout() != h5py.h5d.CONTIGUOUS or create_plist.get_nfilters() != 0:
+        return None
+    offset = dataset.id.get_offset()
+    if offset is None:
+        # no storage was allocated for the dataset
+        return None
+    return np.memmap(dataset.file.filename, dtype=dataset.dtype, mode="r", offset=offset, shape=dataset.shape)
+
+
+def _memmap_or_read(data, memmap):
+    if data is None:
+        return None
+    mapped = as_memmap(data) if memmap else None
+    return np.asarray(data[:]) if mapped is None else mapped
+
+
+_MEMMAP_ARG = {
+    "name": "memmap",
+    "type": bool,
+    "doc": "map the dataset from the file when its layout allows it instead of reading a copy",
+    "default": True,
+}
+
+
+@docval(_MEMMAP_ARG)
+def read_data(self, **kwargs):
+    """Return all the data of this series as a numpy array.
+
+    If the data is stored contiguously and uncompressed in a local HDF5 file, a read-only numpy.memmap of the file is
+    returned. Otherwise the data is read into memory.
+    """
+    memmap = popargs("memmap", kwargs)
+    return _memmap_or_read(self.data, memmap)
+
+
+@docval(_MEMMAP_ARG)
+def read_timestamps(self, **kwargs):
+    """Return the timestamps of this series as a numpy array, or None if the series has a sampling rate.
+
+    As for `read_data`, the timestamps are mapped from the file when their layout allows it.
+    """
+    memmap = popargs("memmap", kwargs)
+    return _memmap_or_read(self.timestamps, memmap)
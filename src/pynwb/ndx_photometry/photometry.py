@@ -1,52 +1,641 @@
-from hdmf.utils import docval, popargs
-from pynwb import get_class
+import os
 
-FibersTable = get_class("FibersTable", "ndx-photometry")
-FluorophoresTable = get_class("FluorophoresTable", "ndx-photometry")
-PhotodetectorsTable = get_class("PhotodetectorsTable", "ndx-photometry")
-ExcitationSourcesTable = get_class("ExcitationSourcesTable", "ndx-photometry")
-FiberPhotometryResponseSeries = get_class("FiberPhotometryResponseSeries", "ndx-photometry")
+import hdmf
+import numpy as np
+import pandas as pd
+import pynwb
+from hdmf.backends.hdf5 import H5DataIO
+from hdmf.build.classgenerator import CustomClassGenerator
+from hdmf.common import DynamicTableRegion, VectorData, VectorIndex
+from hdmf.container import Data
+from hdmf.data_utils import AbstractDataChunkIterator, DataIO
+from hdmf.utils import ExtenderMeta, docval, get_data_shape, get_docval, popargs
+from pynwb import get_class, register_class
+
+from ._spec_cache import get_global_type_map, get_spec_hash
+from .compact import create_compact_commanded_voltage_series
+from .export import to_arrow, to_dataframe
+from .index import get_response_series
+from .instrumentation import _patch_class, _timed, _timed_method
+from .lazy import read_rows
+from .memmap import read_data, read_timestamps
+from .rowcache import clear_row_cache, get_referenced_rows, get_region_rows, get_row, row_cache_info
+
+NEURODATA_TYPES = (
+    "FibersTable",
+    "FluorophoresTable",
+    "PhotodetectorsTable",
+    "ExcitationSourcesTable",
+    "FiberPhotometryResponseSeries",
+    "CommandedVoltageSeries",
+    "DeconvolvedFiberPhotometryResponseSeries",
+    "MultiCommandedVoltage",
+    "FiberPhotometry",
+)
+
+
+# DynamicTableRegion only accepts validate_data in recent versions of hdmf
+_REGION_HAS_VALIDATE_DATA = "validate_data" in {arg["name"] for arg in get_docval(DynamicTableRegion.__init__)}
+_MAX_CACHED_REGIONS = 4096
+
+
+def _region_indices(table, region):
+    """Return the rows of `table` selected by `region` as a new list, checking that they are in the table.
+
+    Rows are never removed from a table, so a region that was in bounds stays in bounds and the check is cached
+    on the table.
+    """
+    n_rows = len(table)
+    if isinstance(region, slice):
+        if any(bound is not None and not 0 <= bound <= n_rows for bound in (region.start, region.stop)):
+            raise IndexError(f"region slice {region} is out of range for this DynamicTable of length {n_rows}")
+        return list(range(*region.indices(n_rows)))
+    indices = np.asarray(region)
+    if indices.size == 0:
+        return []
+    if indices.ndim != 1 or indices.dtype.kind not in "iu":
+        raise TypeError("region must be a slice or a 1D sequence of integer row indices")
+    indices = indices.astype(np.int64, copy=False)
+    cache = table.__dict__.setdefault("_validated_regions", dict())
+    key = indices.tobytes()
+    validated = cache.get(key)
+    if validated is None:
+        if indices.min() < 0 or indices.max() >= n_rows:
+            bad = indices[(indices < 0) | (indices >= n_rows)]
+            raise IndexError(f"indices {bad.tolist()} are out of range for this DynamicTable of length {n_rows}")
+        if len(cache) >= _MAX_CACHED_REGIONS:
+            cache.clear()
+        validated = cache[key] = indices.tolist()
+    return list(validated)
+
+
+@_timed_method("create_region")
+def _new_region(table, name, indices, description):
+    """Create a DynamicTableRegion from indices that were already checked against the table."""
+    if not _REGION_HAS_VALIDATE_DATA:
+        return DynamicTableRegion(name=name, data=indices, description=description, table=table)
+    region = DynamicTableRegion(name=name, data=indices, description=description, table=table, validate_data=False)
+    # keep validating indices appended to the region later on
+    region.validate_data = True
+    return region
+
+
+@_timed_method("create_region")
+def _create_regions(table, name, regions, description):
+    if isinstance(description, str):
+        descriptions = [description] * len(regions)
+    else:
+        descriptions = list(description)
+        if len(descriptions) != len(regions):
+            raise ValueError(f"got {len(descriptions)} descriptions for {len(regions)} regions")
+    if isinstance(regions, np.ndarray) and regions.ndim == 2:
+        # equal-length regions given as one array are checked in a single pass
+        if regions.dtype.kind not in "iu":
+            raise TypeError("regions must contain integer row indices")
+        if regions.size and (regions.min() < 0 or regions.max() >= len(table)):
+            raise IndexError(f"regions contain indices out of range for this DynamicTable of length {len(table)}")
+        all_indices = regions.tolist()
+    else:
+        all_indices = [_region_indices(table, region) for region in regions]
+    return [_new_region(table, name, indices, desc) for indices, desc in zip(all_indices, descriptions)]
+
+
+_REGION_TYPES = (list, tuple, slice, np.ndarray)
 
 
 @docval(
-    {"name": "region", "type": list, "doc": "the indices of the fibers table"},
+    {"name": "region", "type": _REGION_TYPES, "doc": "the indices of the fibers table"},
     {"name": "description", "type": str, "doc": "a brief description of what these fibers are"},
 )
 def create_fiber_region(self, **kwargs):
     region, description = popargs("region", "description", kwargs)
-    return super(FibersTable, self).create_region(name="fibers", region=region, description=description)
+    return _new_region(self, "fibers", _region_indices(self, region), description)
+
+
+@docval(
+    {"name": "regions", "type": (list, tuple, np.ndarray), "doc": "the indices of the fibers table for each region"},
+    {"name": "description", "type": (str, list, tuple), "doc": "one description for all regions, or one per region"},
+)
+def create_fiber_regions(self, **kwargs):
+    regions, description = popargs("regions", "description", kwargs)
+    return _create_regions(self, "fibers", regions, description)
 
 
 @docval(
-    {"name": "region", "type": list, "doc": "the indices of the fluorophores table"},
+    {"name": "region", "type": _REGION_TYPES, "doc": "the indices of the fluorophores table"},
     {"name": "description", "type": str, "doc": "a brief description of what these fluorophores are"},
 )
 def create_fluorophore_region(self, **kwargs):
     region, description = popargs("region", "description", kwargs)
-    return super(FluorophoresTable, self).create_region(name="fluorophores", region=region, description=description)
+    return _new_region(self, "fluorophores", _region_indices(self, region), description)
 
 
 @docval(
-    {"name": "region", "type": list, "doc": "the indices of the photodetectors table"},
+    {
+        "name": "regions",
+        "type": (list, tuple, np.ndarray),
+        "doc": "the indices of the fluorophores table for each region",
+    },
+    {"name": "description", "type": (str, list, tuple), "doc": "one description for all regions, or one per region"},
+)
+def create_fluorophore_regions(self, **kwargs):
+    regions, description = popargs("regions", "description", kwargs)
+    return _create_regions(self, "fluorophores", regions, description)
+
+
+@docval(
+    {"name": "region", "type": _REGION_TYPES, "doc": "the indices of the photodetectors table"},
     {"name": "description", "type": str, "doc": "a brief description of what these photodetectors are"},
 )
 def create_photodetector_region(self, **kwargs):
     region, description = popargs("region", "description", kwargs)
-    return super(PhotodetectorsTable, self).create_region(name="photodetectors", region=region, description=description)
+    return _new_region(self, "photodetectors", _region_indices(self, region), description)
+
+
+@docval(
+    {
+        "name": "regions",
+        "type": (list, tuple, np.ndarray),
+        "doc": "the indices of the photodetectors table for each region",
+    },
+    {"name": "description", "type": (str, list, tuple), "doc": "one description for all regions, or one per region"},
+)
+def create_photodetector_regions(self, **kwargs):
+    regions, description = popargs("regions", "description", kwargs)
+    return _create_regions(self, "photodetectors", regions, description)
 
 
 @docval(
-    {"name": "region", "type": list, "doc": "the indices of the excitation sources table"},
+    {"name": "region", "type": _REGION_TYPES, "doc": "the indices of the excitation sources table"},
     {"name": "description", "type": str, "doc": "a brief description of what these excitation sources are"},
 )
 def create_excitation_source_region(self, **kwargs):
     region, description = popargs("region", "description", kwargs)
-    return super(ExcitationSourcesTable, self).create_region(
-        name="excitation_sources", region=region, description=description
+    return _new_region(self, "excitation_sources", _region_indices(self, region), description)
+
+
+@docval(
+    {
+        "name": "regions",
+        "type": (list, tuple, np.ndarray),
+        "doc": "the indices of the excitation sources table for each region",
+    },
+    {"name": "description", "type": (str, list, tuple), "doc": "one description for all regions, or one per region"},
+)
+def create_excitation_source_regions(self, **kwargs):
+    regions, description = popargs("regions", "description", kwargs)
+    return _create_regions(self, "excitation_sources", regions, description)
+
+
+def _as_column_values(name, values):
+    """Return the values of one column as a list (ragged or object columns) or an array."""
+    if isinstance(values, (np.ndarray, list, tuple)):
+        return values
+    if isinstance(values, pd.Series):
+        return values.to_numpy()
+    raise TypeError(f"values for column '{name}' must be a list, tuple, numpy.ndarray or pandas.Series")
+
+
+def _extend_index(index, offsets):
+    """Append the end offsets of new rows to a VectorIndex, keeping its unsigned integer precision."""
+    # VectorIndex starts with uint8 offsets and widens them as the target grows
+    uint = np.min_scalar_type(max(int(offsets[-1]), np.iinfo(np.uint8).max)).type
+    data = index.data
+    if isinstance(data, list) and len(data):
+        first = data[0]
+        if isinstance(first, np.unsignedinteger) and first.dtype.itemsize < np.dtype(uint).itemsize:
+            data[:] = [uint(x) for x in data]
+    Data.extend(index, offsets.astype(uint))
+
+
+@docval(
+    {
+        "name": "data",
+        "type": (dict, pd.DataFrame),
+        "doc": "the columns to add, as a dict or DataFrame mapping column names to one value per row",
+        "default": None,
+    },
+    {
+        "name": "id",
+        "type": ("array_data", "data"),
+        "doc": "the IDs of the new rows, by default they continue from the number of rows in the table",
+        "default": None,
+    },
+    allow_extra=True,
+)
+@_timed_method("add_rows")
+def add_rows(self, **kwargs):
+    """Add many rows to the table at once.
+
+    Each column is given as an array or list with one value per row, either as keyword arguments or through
+    `data`. Values of ragged columns (e.g. a `fluorophores` column added with ``index=True``) are sequences with
+    one entry per row. Columns are validated and appended once each instead of once per row as with `add_row`.
+    """
+    data, ids = popargs("data", "id", kwargs)
+    if data is None:
+        data = kwargs
+    elif isinstance(data, pd.DataFrame):
+        if ids is None and data.index.name == "id":
+            ids = data.index.to_numpy()
+        data = {name: data[name] for name in data.columns}
+    data = dict(data)
+    if ids is None:
+        ids = data.pop("id", None)
+
+    columns = {name: _as_column_values(name, values) for name, values in data.items()}
+    n_rows = {len(values) for values in columns.values()}
+    if len(n_rows) > 1:
+        raise ValueError(f"all columns must have the same number of rows, got {sorted(n_rows)}")
+    n_rows = n_rows.pop() if n_rows else 0
+    if n_rows == 0:
+        return
+
+    missing = set(self.colnames) - set(columns)
+    if missing:
+        raise ValueError(f"column(s) {sorted(missing)} missing")
+    extra = set(columns) - set(self.colnames)
+    for col in self.__columns__:
+        if col["name"] in extra:
+            # add the predefined optional columns from the spec, as add_row does
+            self.add_column(
+                col["name"], col["description"], index=col.get("index", False), table=col.get("table", False)
+            )
+            extra.remove(col["name"])
+    if extra:
+        raise ValueError(f"row data keys don't match available columns, you supplied extra keys: {sorted(extra)}")
+
+    if ids is None:
+        ids = np.arange(len(self), len(self) + n_rows)
+    elif len(ids) != n_rows:
+        raise ValueError(f"expected {n_rows} ids, got {len(ids)}")
+
+    # validate every column before modifying any of them
+    prepared = dict()
+    for name, values in columns.items():
+        col = self[name]
+        if isinstance(col, VectorIndex):
+            lengths = np.fromiter((len(v) for v in values), dtype=np.uint64, count=n_rows)
+            flat = [x for v in values for x in v] if not isinstance(values, np.ndarray) or values.ndim < 2 else values
+            if isinstance(flat, np.ndarray):
+                flat = flat.reshape((-1,) + flat.shape[2:])
+            target = col.target
+            offsets = np.cumsum(lengths) + len(target)
+            region = target if isinstance(target, DynamicTableRegion) else None
+            prepared[name] = (col, flat, offsets, region)
+        else:
+            region = col if isinstance(col, DynamicTableRegion) else None
+            prepared[name] = (col, values, None, region)
+        if region is not None:
+            indices = np.asarray(prepared[name][1], dtype=np.int64)
+            if indices.size and (indices.min() < 0 or indices.max() >= len(region.table)):
+                raise IndexError(
+                    f"column '{name}' references rows outside of '{region.table.name}', which has "
+                    f"{len(region.table)} rows"
+                )
+
+    Data.extend(self.id, np.asarray(ids).tolist())
+    for name, (col, values, offsets, region) in prepared.items():
+        target = col.target if offsets is not None else col
+        if isinstance(target.data, list) and isinstance(values, np.ndarray):
+            values = values.tolist()
+        if type(target) in (VectorData, DynamicTableRegion):
+            Data.extend(target, values)
+        else:
+            target.extend(values)
+        if offsets is not None:
+            _extend_index(col, offsets)
+
+
+# HDF5 caches up to 1 MiB of chunks per dataset by default, larger chunks are read from disk on every access
+DEFAULT_CHUNK_BYTES = 1024**2
+# above this many values per second, favour write speed over compression ratio
+_FAST_COMPRESSION_VALUES_PER_SECOND = 1_000
+
+
+@docval(
+    {"name": "rate", "type": (int, float), "doc": "the sampling rate, in Hz"},
+    {"name": "n_fibers", "type": int, "doc": "the number of fibers, i.e. the size of the second dimension of the data"},
+    {"name": "n_samples", "type": int, "doc": "the number of samples, if known", "default": None},
+    {"name": "itemsize", "type": int, "doc": "the size of one value, in bytes", "default": 8},
+    {
+        "name": "chunk_bytes",
+        "type": int,
+        "doc": "the target size of one chunk, in bytes",
+        "default": DEFAULT_CHUNK_BYTES,
+    },
+    is_method=False,
+)
+def get_chunk_shape(**kwargs):
+    """Return a time-major chunk shape for response data: all fibers in each chunk, as many samples as fit.
+
+    Every chunk holds the same span of time for all the fibers, so reading a time window touches as few chunks as
+    possible. When a chunk holds more than a second of data, its length is rounded down to whole seconds.
+    """
+    rate, n_fibers, n_samples, itemsize, chunk_bytes = popargs(
+        "rate", "n_fibers", "n_samples", "itemsize", "chunk_bytes", kwargs
+    )
+    if rate <= 0 or n_fibers < 1 or itemsize < 1 or chunk_bytes < 1:
+        raise ValueError("rate, n_fibers, itemsize and chunk_bytes must be positive")
+    n_chunk_samples = max(chunk_bytes // (n_fibers * itemsize), 1)
+    samples_per_second = int(rate)
+    if samples_per_second >= 1 and n_chunk_samples > samples_per_second:
+        n_chunk_samples -= n_chunk_samples % samples_per_second
+    if n_samples is not None:
+        n_chunk_samples = max(min(n_chunk_samples, n_samples), 1)
+    return (n_chunk_samples, n_fibers)
+
+
+@docval(
+    {"name": "rate", "type": (int, float), "doc": "the sampling rate, in Hz"},
+    {"name": "n_fibers", "type": int, "doc": "the number of fibers, i.e. the size of the second dimension of the data"},
+    is_method=False,
+)
+def get_compression_options(**kwargs):
+    """Return the HDF5 compression options for response data.
+
+    gzip is used in all cases because every HDF5 reader supports it. Recordings producing many values per second use
+    the fastest level so that compression keeps up with acquisition; slower ones use a higher level.
+    """
+    rate, n_fibers = popargs("rate", "n_fibers", kwargs)
+    level = 1 if rate * n_fibers >= _FAST_COMPRESSION_VALUES_PER_SECOND else 4
+    return dict(compression="gzip", compression_opts=level, shuffle=True)
+
+
+def _sampling_rate(series):
+    if series.rate is not None:
+        return float(series.rate)
+    if isinstance(series.timestamps, AbstractDataChunkIterator):
+        raise ValueError(f"the timestamps of '{series.name}' are not available yet, pass the sampling rate")
+    # only the first and last timestamps are needed, do not read all of them
+    timestamps = series.timestamps
+    n_timestamps = len(timestamps)
+    if n_timestamps < 2 or timestamps[n_timestamps - 1] <= timestamps[0]:
+        raise ValueError(f"cannot determine the sampling rate of '{series.name}' from its timestamps")
+    return (n_timestamps - 1) / float(timestamps[n_timestamps - 1] - timestamps[0])
+
+
+@docval(
+    {
+        "name": "chunk_bytes",
+        "type": int,
+        "doc": "the target size of one chunk, in bytes",
+        "default": DEFAULT_CHUNK_BYTES,
+    },
+    {
+        "name": "compression",
+        "type": (str, bool),
+        "doc": "the compression filter, False to only chunk the data. By default picked from the rate and fiber count",
+        "default": None,
+    },
+    {"name": "compression_opts", "type": int, "doc": "the options of the compression filter", "default": None},
+    {"name": "shuffle", "type": bool, "doc": "whether to apply the shuffle filter", "default": None},
+    {
+        "name": "rate",
+        "type": (int, float),
+        "doc": "the sampling rate, by default the rate of the series or the one of its timestamps",
+        "default": None,
+    },
+)
+def set_chunked_compression(self, **kwargs):
+    """Write the data of this series chunked along time and compressed.
+
+    The chunk shape and the compression filter are picked from the sampling rate and the number of fibers, see
+    `get_chunk_shape` and `get_compression_options`. This must be called before the file is written.
+    """
+    chunk_bytes, compression, compression_opts, shuffle, rate = popargs(
+        "chunk_bytes", "compression", "compression_opts", "shuffle", "rate", kwargs
+    )
+    data = self.fields.get("data")
+    if isinstance(data, DataIO):
+        raise ValueError(f"the data of '{self.name}' is already wrapped in a {type(data).__name__}")
+    if isinstance(data, AbstractDataChunkIterator):
+        shape, dtype = data.maxshape, np.dtype(data.dtype)
+    else:
+        shape, dtype = get_data_shape(data), np.asarray(data[:1]).dtype
+    n_samples = shape[0]
+    n_fibers = 1 if len(shape) < 2 else shape[1]
+    rate = _sampling_rate(self) if rate is None else float(rate)
+
+    chunks = get_chunk_shape(
+        rate=rate, n_fibers=n_fibers, n_samples=n_samples, itemsize=dtype.itemsize, chunk_bytes=chunk_bytes
     )
+    options = get_compression_options(rate=rate, n_fibers=n_fibers)
+    if compression is not None:
+        options["compression"] = compression
+        options["compression_opts"] = None
+    if compression_opts is not None:
+        options["compression_opts"] = compression_opts
+    if shuffle is not None:
+        options["shuffle"] = shuffle
+    if not options["compression"]:
+        options = dict()
+    self.fields["data"] = H5DataIO(data=data, chunks=chunks[: len(shape)], **options)
+    return self.fields["data"]
+
+
+# below this many timestamps, read them all at once instead of one at a time
+_SEARCH_BLOCK_SIZE = 4096
+
+
+def _search_sorted(timestamps, value):
+    """Return the index of the first timestamp that is not less than `value`.
+
+    Timestamps that are not in memory, e.g. an HDF5 dataset, are searched by reading single values until the range
+    left is small, so only a few chunks are read instead of the whole dataset.
+    """
+    if isinstance(timestamps, np.ndarray):
+        return int(np.searchsorted(timestamps, value, side="left"))
+    lo, hi = 0, len(timestamps)
+    while hi - lo > _SEARCH_BLOCK_SIZE:
+        mid = (lo + hi) // 2
+        if timestamps[mid] < value:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo + int(np.searchsorted(np.asarray(timestamps[lo:hi]), value, side="left"))
+
+
+@docval(
+    {"name": "start", "type": (int, float), "doc": "the start of the window, in seconds (inclusive)"},
+    {"name": "stop", "type": (int, float), "doc": "the end of the window, in seconds (exclusive)"},
+    {
+        "name": "fibers",
+        "type": (int, slice, list, tuple, np.ndarray),
+        "doc": "the fibers (columns of the data) to read, all of them by default",
+        "default": None,
+    },
+)
+def get_window(self, **kwargs):
+    """Return the data and the timestamps of the samples recorded from `start` up to `stop`.
+
+    The sample range is computed from `starting_time` and `rate`, or found by binary search on `timestamps`, and only
+    that range of the data is read from the file. Returns a tuple (data, timestamps) of numpy arrays.
+    """
+    start, stop, fibers = popargs("start", "stop", "fibers", kwargs)
+    data = self.data
+    if isinstance(data, AbstractDataChunkIterator):
+        raise TypeError(f"the data of '{self.name}' is written from an iterator and cannot be read")
+    if stop < start:
+        raise ValueError(f"the window ends ({stop}) before it starts ({start})")
+
+    n_samples = len(data)
+    if self.timestamps is None:
+        rate, starting_time = float(self.rate), float(self.starting_time or 0.0)
+        # samples at starting_time + i / rate, allow for rounding errors on the window edges
+        first = int(np.ceil((start - starting_time) * rate - 1e-9))
+        last = int(np.ceil((stop - starting_time) * rate - 1e-9))
+        first, last = min(max(first, 0), n_samples), min(max(last, 0), n_samples)
+        timestamps = starting_time + np.arange(first, last) / rate
+    else:
+        first = min(_search_sorted(self.timestamps, start), n_samples)
+        last = min(max(_search_sorted(self.timestamps, stop), first), n_samples)
+        timestamps = np.asarray(self.timestamps[first:last])
+
+    if fibers is None:
+        window = data[first:last]
+    elif isinstance(fibers, (int, slice)):
+        window = data[first:last, fibers]
+    else:
+        # arbitrary lists of columns are not supported by every backend, read all of them and select in memory
+        window = np.asarray(data[first:last])[:, np.asarray(fibers, dtype=np.int64)]
+    return np.asarray(window), timestamps
+
+
+# Methods added to the classes that PyNWB generates from the spec, by neurodata type
+_EXTRA_METHODS = {
+    "FibersTable": dict(
+        create_fiber_region=create_fiber_region,
+        create_fiber_regions=create_fiber_regions,
+        add_rows=add_rows,
+        read_rows=read_rows,
+    ),
+    "FluorophoresTable": dict(
+        create_fluorophore_region=create_fluorophore_region,
+        create_fluorophore_regions=create_fluorophore_regions,
+        add_rows=add_rows,
+    ),
+    "PhotodetectorsTable": dict(
+        create_photodetector_region=create_photodetector_region,
+        create_photodetector_regions=create_photodetector_regions,
+        add_rows=add_rows,
+    ),
+    "ExcitationSourcesTable": dict(
+        create_excitation_source_region=create_excitation_source_region,
+        create_excitation_source_regions=create_excitation_source_regions,
+        add_rows=add_rows,
+    ),
+    "FiberPhotometryResponseSeries": dict(
+        set_chunked_compression=set_chunked_compression,
+        get_window=get_window,
+        read_data=read_data,
+        read_timestamps=read_timestamps,
+    ),
+    "CommandedVoltageSeries": dict(read_data=read_data, read_timestamps=read_timestamps),
+    "MultiCommandedVoltage": dict(create_compact_commanded_voltage_series=create_compact_commanded_voltage_series),
+    "FiberPhotometry": dict(
+        to_dataframe=to_dataframe,
+        to_arrow=to_arrow,
+        get_response_series=get_response_series,
+        get_row=get_row,
+        get_referenced_rows=get_referenced_rows,
+        get_region_rows=get_region_rows,
+        row_cache_info=row_cache_info,
+        clear_row_cache=clear_row_cache,
+    ),
+}
+
+# Classes are generated the first time they are requested, so that importing the package does not pay for
+# generating every class up front. Whichever type map generates a class first (the global one through
+# `get_photometry_class`, or the copy made by `NWBHDF5IO` when a file is read) registers it here and in the global
+# type map, so that later lookups and later reads all use the same class.
+_classes = dict()
+_type_map = get_global_type_map()
+
+
+class PhotometryClassGenerator(CustomClassGenerator):
+    """Add the extra methods and the class registration hook to the classes generated for ndx-photometry types."""
+
+    @classmethod
+    def apply_generator_to_field(cls, field_spec, bases, type_map):
+        return False
+
+    @classmethod
+    def post_process(cls, classdict, bases, docval_args, spec):
+        neurodata_type = spec.data_type_def
+        if neurodata_type not in NEURODATA_TYPES:
+            return
+        # other extensions may define types with the same names, only extend the ones from this namespace
+        if spec is not _type_map.namespace_catalog.get_spec("ndx-photometry", neurodata_type):
+            return
+        classdict.update(_EXTRA_METHODS.get(neurodata_type, dict()))
+        classdict["_photometry_type"] = neurodata_type
+        classdict["_register_photometry_class"] = _register_photometry_class
+
+    @classmethod
+    def set_init(cls, classdict, bases, docval_args, not_inherited_fields, name):
+        pass
+
+
+@ExtenderMeta.post_init
+def _register_photometry_class(cls, name, bases, classdict):
+    # post-init hooks are inherited, only register the generated class itself and not its subclasses
+    neurodata_type = classdict.get("_photometry_type")
+    if neurodata_type is None or _classes.setdefault(neurodata_type, cls) is not cls:
+        return
+    _type_map.register_container_type("ndx-photometry", neurodata_type, cls)
+    _patch_class(cls)
+
+
+if _type_map is not None:
+    _type_map.register_generator(PhotometryClassGenerator)
+
+
+def _use_generated_classes(namespace_path):
+    """Use the classes generated ahead of time from the spec files by ``src/spec/generate_classes.py``.
+
+    Return False, so that the classes are generated at runtime instead, if the spec files changed since the classes
+    were generated, if they were generated with other versions of hdmf or pynwb, or if
+    ``NDX_PHOTOMETRY_RUNTIME_CLASSES=1``.
+    """
+    if os.environ.get("NDX_PHOTOMETRY_RUNTIME_CLASSES", "0") == "1" or _classes:
+        return False
+    try:
+        from . import _generated
+    except ImportError:
+        # the classes use names of the version of hdmf they were generated with
+        return False
+
+    versions = (_generated.HDMF_VERSION, _generated.PYNWB_VERSION)
+    if versions != (hdmf.__version__, pynwb.__version__) or _generated.SPEC_HASH != get_spec_hash(namespace_path):
+        return False
+    # register all the classes at once, the generated classes reference each other
+    for neurodata_type in NEURODATA_TYPES:
+        cls = getattr(_generated, neurodata_type)
+        for name, method in _EXTRA_METHODS.get(neurodata_type, dict()).items():
+            setattr(cls, name, method)
+        _classes[neurodata_type] = cls
+        register_class(neurodata_type, "ndx-photometry", cls)
+        _patch_class(cls)
+    return True
+
+
+def get_photometry_class(neurodata_type):
+    """Generate (on first use) and return the class for a ndx-photometry neurodata type."""
+    cls = _classes.get(neurodata_type)
+    if cls is None:
+        if neurodata_type not in NEURODATA_TYPES:
+            raise ValueError(f"'{neurodata_type}' is not a ndx-photometry neurodata type")
+        with _timed("generate_class", neurodata_type):
+            cls = get_class(neurodata_type, "ndx-photometry")
+            # without access to the global type map, the generator is not registered and the methods are added here
+            for name, method in _EXTRA_METHODS.get(neurodata_type, dict()).items():
+                setattr(cls, name, method)
+        cls = _classes.setdefault(neurodata_type, cls)
+        _patch_class(cls)
+    return cls
 
 
-FibersTable.create_fiber_region = create_fiber_region
-FluorophoresTable.create_fluorophore_region = create_fluorophore_region
-PhotodetectorsTable.create_photodetector_region = create_photodetector_region
-ExcitationSourcesTable.create_excitation_source_region = create_excitation_source_region
+def __getattr__(name):
+    if name in NEURODATA_TYPES:
+        return get_photometry_class(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,349 @@
+"""Processing stages that read photometry series block by block and produce a DeconvolvedFiberPhotometryResponseSeries.
+
+The data of the new series is computed from the source series while the file is written, one buffer of samples at
+a time, so memory use does not depend on the length of the recording.
+
+dF/F: the isosbestic control is fit to the signal of each fiber by least squares, ``fit = slope * control + intercept``,
+and ``dF/F = (signal - fit) / fit``. The fit needs one pass over both series, accumulating centered sums block by
+block, and dF/F is then computed block by block.
+
+Downsampling: the series is low-pass filtered with a windowed-sinc FIR filter and decimated. Only the samples that
+are kept are computed (polyphase form), and each block is read with the samples around it that the filter needs, so
+the result does not depend on where the blocks start and end.
+"""
+
+import numpy as np
+from hdmf.common import DynamicTableRegion, VectorData
+from hdmf.data_utils import AbstractDataChunkIterator, GenericDataChunkIterator
+from hdmf.utils import docval, popargs
+from pynwb import TimeSeries
+
+from .photometry import _sampling_rate, get_chunk_shape, get_photometry_class
+
+# number of samples read at once when fitting the control
+DEFAULT_BLOCK_SIZE = 2**16
+# filters with more taps than this are applied with FFTs, which are faster from about 17 to 33 taps on large blocks of
+# several fibers, but only from about 65 taps for a factor of 100 (benchmarks/processing.py)
+_MAX_DIRECT_TAPS = 64
+_MIN_FFT_SIZE = 4096
+_REGIONS = ("fibers", "excitation_sources", "photodetectors", "fluorophores")
+
+
+def _check_series(signal, isosbestic):
+    signal_shape, isosbestic_shape = tuple(signal.data.shape), tuple(isosbestic.data.shape)
+    if signal_shape != isosbestic_shape:
+        raise ValueError(
+            f"the signal {signal_shape} and the isosbestic control {isosbestic_shape} must have the same shape"
+        )
+    if signal.timestamps is None and isosbestic.timestamps is None and signal.rate != isosbestic.rate:
+        raise ValueError("the signal and the isosbestic control must have the same sampling rate")
+
+
+@docval(
+    {"name": "signal", "type": TimeSeries, "doc": "the series with the signal"},
+    {"name": "isosbestic", "type": TimeSeries, "doc": "the series with the isosbestic control, of the same shape"},
+    {"name": "block_size", "type": int, "doc": "the number of samples read at once", "default": DEFAULT_BLOCK_SIZE},
+    is_method=False,
+)
+def fit_isosbestic(**kwargs):
+    """Fit the isosbestic control to the signal of each fiber by least squares.
+
+    Returns the arrays (slopes, intercepts), with one value per fiber, such that ``slope * control + intercept`` is
+    the closest fit to the signal. The series are read `block_size` samples at a time.
+    """
+    signal, isosbestic, block_size = popargs("signal", "isosbestic", "block_size", kwargs)
+    _check_series(signal, isosbestic)
+    shape = tuple(signal.data.shape[1:])
+    n = 0
+    mean_x, mean_y = np.zeros(shape), np.zeros(shape)
+    cov_xx, cov_xy = np.zeros(shape), np.zeros(shape)
+    for start in range(0, len(signal.data), block_size):
+        x = np.asarray(isosbestic.data[start : start + block_size], dtype=np.float64)
+        y = np.asarray(signal.data[start : start + block_size], dtype=np.float64)
+        n_block = len(x)
+        block_mean_x, block_mean_y = x.mean(axis=0), y.mean(axis=0)
+        dx, dy = x - block_mean_x, y - block_mean_y
+        # merge the centered sums of the block with the ones of the previous blocks
+        delta_x, delta_y = block_mean_x - mean_x, block_mean_y - mean_y
+        weight = n * n_block / (n + n_block)
+        cov_xx += (dx * dx).sum(axis=0) + delta_x * delta_x * weight
+        cov_xy += (dx * dy).sum(axis=0) + delta_x * delta_y * weight
+        mean_x += delta_x * n_block / (n + n_block)
+        mean_y += delta_y * n_block / (n + n_block)
+        n += n_block
+    if n < 2:
+        raise ValueError("at least two samples are needed to fit the isosbestic control")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slopes = np.where(cov_xx > 0, cov_xy / cov_xx, 0.0)
+    intercepts = mean_y - slopes * mean_x
+    return slopes, intercepts
+
+
+class _DeltaFOverFIterator(GenericDataChunkIterator):
+    """Compute dF/F for the buffers of samples requested by the HDF5 writer."""
+
+    def __init__(self, signal, isosbestic, slopes, intercepts, **kwargs):
+        self._signal = signal.data
+        self._isosbestic = isosbestic.data
+        self._slopes = slopes
+        self._intercepts = intercepts
+        super().__init__(**kwargs)
+
+    def _get_data(self, selection):
+        time_selection = selection[0]
+        y = np.asarray(self._signal[time_selection], dtype=np.float64)
+        x = np.asarray(self._isosbestic[time_selection], dtype=np.float64)
+        fit = x * self._slopes + self._intercepts
+        dff = (y - fit) / fit
+        # the writer may request only some of the fibers
+        return dff[(slice(None),) + tuple(selection[1:])].astype(np.float32)
+
+    def _get_maxshape(self):
+        return tuple(self._signal.shape)
+
+    def _get_dtype(self):
+        return np.dtype(np.float32)
+
+
+def _copy_regions(series):
+    """Return copies of the regions of a series, to reference the same rows from a new series."""
+    regions = dict()
+    for name in _REGIONS:
+        region = getattr(series, name, None)
+        if region is not None:
+            regions[name] = DynamicTableRegion(
+                name=region.name, data=list(region.data[:]), description=region.description, table=region.table
+            )
+    return regions
+
+
+@docval(
+    {"name": "signal", "type": TimeSeries, "doc": "the series with the signal"},
+    {"name": "isosbestic", "type": TimeSeries, "doc": "the series with the isosbestic control, of the same shape"},
+    {"name": "name", "type": str, "doc": "the name of the dF/F series", "default": "DfOverF"},
+    {"name": "block_size", "type": int, "doc": "the number of samples read at once", "default": DEFAULT_BLOCK_SIZE},
+    {
+        "name": "buffer_gb",
+        "type": float,
+        "doc": "the maximum size of the samples held in memory while writing, in GB",
+        "default": 0.05,
+    },
+    is_method=False,
+)
+def compute_delta_f_over_f(**kwargs):
+    """Return the dF/F of `signal` corrected with its isosbestic control as a DeconvolvedFiberPhotometryResponseSeries.
+
+    The control is fit with `fit_isosbestic`. The series has `signal` as its `raw` series, the same timing and regions,
+    and its `deconvolution_filter` describes the fit. Its data is stored as float32 and computed while the file is
+    written, so the signal and the control must stay readable until then.
+    """
+    signal, isosbestic, name, block_size, buffer_gb = popargs(
+        "signal", "isosbestic", "name", "block_size", "buffer_gb", kwargs
+    )
+    slopes, intercepts = fit_isosbestic(signal=signal, isosbestic=isosbestic, block_size=block_size)
+
+    shape = tuple(signal.data.shape)
+    rate = _sampling_rate(signal)
+    n_fibers = int(np.prod(shape[1:], dtype=np.int64))
+    chunk_shape = get_chunk_shape(rate=float(rate), n_fibers=max(n_fibers, 1), n_samples=shape[0], itemsize=4)
+    data = _DeltaFOverFIterator(
+        signal,
+        isosbestic,
+        slopes,
+        intercepts,
+        buffer_gb=buffer_gb,
+        chunk_shape=chunk_shape[: len(shape)],
+    )
+
+    fit_description = "; ".join(
+        f"fiber {i}: slope {slope:.6g}, intercept {intercept:.6g}"
+        for i, (slope, intercept) in enumerate(zip(np.ravel(slopes), np.ravel(intercepts)))
+    )
+    deconvolution_filter = (
+        f"dF/F = (signal - fit) / fit, where fit = slope * control + intercept is the least-squares fit of the "
+        f"isosbestic control '{isosbestic.name}' to the signal '{signal.name}', per fiber ({fit_description})"
+    )
+    timing = dict(rate=signal.rate, starting_time=signal.starting_time)
+    if signal.timestamps is not None:
+        # link to the timestamps of the signal instead of copying them
+        timing = dict(timestamps=signal)
+    return get_photometry_class("DeconvolvedFiberPhotometryResponseSeries")(
+        name=name,
+        data=data,
+        unit="dF/F",
+        description=f"dF/F of {signal.name} corrected with the isosbestic control {isosbestic.name}",
+        raw=signal,
+        deconvolution_filter=VectorData(
+            name="deconvolution_filter", description="deconvolution filter", data=[deconvolution_filter]
+        ),
+        downsampling_filter=VectorData(name="downsampling_filter", description="downsampling filter", data=["none"]),
+        **_copy_regions(signal),
+        **timing,
+    )
+
+
+def lowpass_filter_taps(factor, n_taps):
+    """Return the taps of a Hamming-windowed sinc low-pass filter with a cutoff at the Nyquist rate divided by `factor`.
+
+    The taps sum to 1 so that the filter keeps the baseline of the signal.
+    """
+    if n_taps < 1 or n_taps % 2 == 0:
+        raise ValueError("the number of taps must be odd")
+    n = np.arange(n_taps) - (n_taps - 1) / 2
+    taps = np.sinc(n / factor) * np.hamming(n_taps)
+    return taps / taps.sum()
+
+
+def _fir_decimate(block, taps, factor, n_out):
+    """Filter `block` with `taps` and keep one sample out of `factor`, `n_out` samples from the first full window.
+
+    Only the kept samples are computed (polyphase form): short filters directly, long ones with FFTs of short
+    segments (overlap-save). The taps and the samples are split into `factor` phases at the output rate, the products
+    of the spectra of each phase are summed and one inverse FFT gives the kept samples. All the columns of `block`
+    are filtered at once.
+    """
+    if len(taps) <= _MAX_DIRECT_TAPS:
+        out = np.zeros((n_out,) + block.shape[1:], dtype=np.result_type(block, taps))
+        for k, tap in enumerate(taps):
+            out += tap * block[k : k + factor * (n_out - 1) + 1 : factor]
+        return out
+    # the phases of the taps, phase_taps[m, p] = taps[m * factor + p]
+    n_phase_taps = -(-len(taps) // factor)
+    phase_taps = np.zeros(n_phase_taps * factor, dtype=taps.dtype)
+    phase_taps[: len(taps)] = taps
+    phase_taps = phase_taps.reshape(n_phase_taps, factor)
+    # overlap-save at the output rate, with segments short enough to stay in cache
+    n_rows = n_out - 1 + n_phase_taps
+    n_fft = 1 << int(max(_MIN_FFT_SIZE // factor, 4 * n_phase_taps) - 1).bit_length()
+    n_fft = min(n_fft, 1 << int(n_rows - 1).bit_length())
+    step = n_fft - n_phase_taps + 1
+    fft, ifft = (np.fft.fft, np.fft.ifft) if np.iscomplexobj(block) else (np.fft.rfft, np.fft.irfft)
+    # the spectra of the phases of the taps, as row vectors that sum the phases of the samples with one product
+    response = fft(phase_taps[::-1], n_fft, axis=0)[:, None, :]
+    columns = block.reshape(len(block), -1)
+    out = np.empty((n_out, columns.shape[1]), dtype=np.result_type(block, taps))
+    for start in range(0, n_out, step):
+        stop = min(start + step, n_out)
+        # the phases of the samples of the segment, samples[m, p] = columns[m * factor + p], padded with zeros
+        samples = columns[start * factor : (stop + n_phase_taps - 1) * factor]
+        if len(samples) % factor:
+            samples = np.concatenate([samples, np.zeros((-len(samples) % factor, samples.shape[1]), samples.dtype)])
+        samples = samples.reshape(-1, factor, columns.shape[1])
+        spectrum = np.matmul(response, fft(samples, n_fft, axis=0))[:, 0]
+        segment = ifft(spectrum, n_fft, axis=0)
+        out[start:stop] = segment[n_phase_taps - 1 : n_phase_taps - 1 + stop - start]
+    return out.reshape((n_out,) + block.shape[1:])
+
+
+class _DecimateIterator(GenericDataChunkIterator):
+    """Filter and decimate the buffers of samples requested by the HDF5 writer."""
+
+    def __init__(self, series, factor, taps, **kwargs):
+        self._data = series.data
+        self._n_input = len(series.data)
+        self._factor = factor
+        self._taps = taps
+        self._dtype = np.promote_types(np.dtype(series.data.dtype), np.float32)
+        super().__init__(**kwargs)
+
+    def _get_data(self, selection):
+        first, last = selection[0].start, selection[0].stop
+        half = (len(self._taps) - 1) // 2
+        # the samples needed by the filter for the outputs of this buffer, with the ends of the recording padded with
+        # the first and last samples
+        lo, hi = first * self._factor - half, (last - 1) * self._factor + half + 1
+        block = np.asarray(self._data[max(lo, 0) : min(hi, self._n_input)], dtype=np.float64)
+        if lo < 0 or hi > self._n_input:
+            block = np.concatenate(
+                [
+                    np.repeat(block[:1], max(-lo, 0), axis=0),
+                    block,
+                    np.repeat(block[-1:], max(hi - self._n_input, 0), axis=0),
+                ]
+            )
+        out = _fir_decimate(block, self._taps, self._factor, last - first)
+        return out[(slice(None),) + tuple(selection[1:])].astype(self._dtype)
+
+    def _get_maxshape(self):
+        return (-(-self._n_input // self._factor),) + tuple(self._data.shape[1:])
+
+    def _get_dtype(self):
+        return self._dtype
+
+
+@docval(
+    {"name": "series", "type": TimeSeries, "doc": "the series to downsample"},
+    {"name": "factor", "type": int, "doc": "the downsampling factor, one sample is kept out of `factor`"},
+    {"name": "name", "type": str, "doc": "the name of the downsampled series", "default": None},
+    {
+        "name": "n_taps",
+        "type": int,
+        "doc": "the number of taps of the anti-aliasing filter, odd, by default 20 * factor + 1",
+        "default": None,
+    },
+    {
+        "name": "buffer_gb",
+        "type": float,
+        "doc": "the maximum size of the samples held in memory while writing, in GB",
+        "default": 0.05,
+    },
+    is_method=False,
+)
+def downsample(**kwargs):
+    """Return `series` low-pass filtered and decimated by `factor`, as a DeconvolvedFiberPhotometryResponseSeries.
+
+    The anti-aliasing filter is a zero-phase FIR filter, see `lowpass_filter_taps`, so sample ``i`` of the result is
+    aligned with sample ``i * factor`` of `series`. Its specification is recorded in `downsampling_filter`. The result
+    has `series` as its `raw` series, unless `series` is itself a deconvolved series: it then keeps its `raw` series
+    and `deconvolution_filter`. The result is computed while the file is written, so the data of
+    `series` must be readable, e.g. read from a file.
+    """
+    series, factor, name, n_taps, buffer_gb = popargs("series", "factor", "name", "n_taps", "buffer_gb", kwargs)
+    if factor < 1:
+        raise ValueError("the downsampling factor must be positive")
+    n_taps = 20 * factor + 1 if n_taps is None else n_taps
+    taps = lowpass_filter_taps(factor, n_taps)
+    if isinstance(series.data, AbstractDataChunkIterator):
+        raise ValueError("the data of the series must be readable, write the series to a file and read it first")
+    rate = _sampling_rate(series)
+
+    shape = tuple(np.shape(series.data))
+    n_output = -(-shape[0] // factor)
+    n_fibers = int(np.prod(shape[1:], dtype=np.int64))
+    chunk_shape = get_chunk_shape(rate=rate / factor, n_fibers=max(n_fibers, 1), n_samples=max(n_output, 1))
+    data = _DecimateIterator(series, factor, taps, buffer_gb=buffer_gb, chunk_shape=chunk_shape[: len(shape)])
+
+    downsampling_filter = (
+        f"decimation by {factor} from {rate:.6g} Hz to {rate / factor:.6g} Hz after a zero-phase low-pass FIR filter "
+        f"(Hamming-windowed sinc, {n_taps} taps, cutoff {rate / factor / 2:.6g} Hz), with the ends of the recording "
+        "padded with the first and last samples"
+    )
+    if series.rate is not None:
+        timing = dict(rate=rate / factor, starting_time=series.starting_time)
+    else:
+        timing = dict(timestamps=np.asarray(series.timestamps[::factor]))
+
+    deconvolved_cls = get_photometry_class("DeconvolvedFiberPhotometryResponseSeries")
+    extra = dict()
+    raw = series
+    if isinstance(series, deconvolved_cls):
+        raw = series.raw
+        if series.deconvolution_filter is not None:
+            extra["deconvolution_filter"] = VectorData(
+                name="deconvolution_filter",
+                description="deconvolution filter",
+                data=list(series.deconvolution_filter.data[:]),
+            )
+    return deconvolved_cls(
+        name=name or f"{series.name}_downsampled",
+        data=data,
+        unit=series.unit,
+        description=f"{series.name} downsampled by {factor}",
+        raw=raw,
+        downsampling_filter=VectorData(
+            name="downsampling_filter", description="downsampling filter", data=[downsampling_filter]
+        ),
+        **extra,
+        **_copy_regions(series),
+        **timing,
+    )
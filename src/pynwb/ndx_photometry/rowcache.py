@@ -0,0 +1,215 @@
+"""Look up the rows of the FiberPhotometry metadata tables, and the rows that regions reference, through an LRU cache.
+
+Each row read by `get_row` is kept as a dict, and each region lookup of `get_referenced_rows` and `get_region_rows`
+as the indices of the rows it references, in a cache of at most `DEFAULT_ROW_CACHE_SIZE` entries on the
+FiberPhotometry container, so repeated lookups during an analysis do not read the file again. The least recently
+used entries are dropped first. The entries of a table are dropped when rows or columns are added to it.
+"""
+
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+from hdmf.common import DynamicTable, DynamicTableRegion
+from hdmf.utils import docval, popargs
+
+from .export import _split_columns
+from .lazy import _read, _read_ragged
+
+DEFAULT_ROW_CACHE_SIZE = 4096
+_TABLES = ("fibers", "fluorophores", "photodetectors", "excitation_sources")
+
+RowCacheInfo = namedtuple("RowCacheInfo", ["hits", "misses", "invalidations", "maxsize", "currsize"])
+
+
+class _RowCache:
+    """An LRU cache of the rows and region lookups of tables, dropping the entries of a table when it grows."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        # the tables with entries, by id, with their number of rows and columns when the entries were read
+        self.tables = dict()
+        self.hits = self.misses = self.invalidations = 0
+
+    def _check(self, table):
+        """Drop the entries of a table if rows or columns were added to it since they were read."""
+        shape = (len(table), len(table.columns))
+        known = self.tables.get(id(table))
+        if known is not None and known[0] is table and known[1] == shape:
+            return
+        if known is not None:
+            for key in [key for key in self.entries if key[0] == id(table)]:
+                del self.entries[key]
+            self.invalidations += 1
+        self.tables[id(table)] = (table, shape)
+
+    def get(self, table, key, read):
+        """Return the entry of `key` in `table`, calling `read` to make it on a miss."""
+        self._check(table)
+        key = (id(table),) + key
+        try:
+            value = self.entries[key]
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return value
+        self.misses += 1
+        value = read()
+        if self.maxsize > 0:
+            self.entries[key] = value
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return value
+
+    def info(self):
+        return RowCacheInfo(self.hits, self.misses, self.invalidations, self.maxsize, len(self.entries))
+
+
+def _get_cache(container):
+    cache = container.__dict__.get("_row_cache")
+    if cache is None:
+        cache = container.__dict__["_row_cache"] = _RowCache(DEFAULT_ROW_CACHE_SIZE)
+    return cache
+
+
+def _get_table(container, table):
+    if isinstance(table, DynamicTable):
+        return table
+    if table not in _TABLES:
+        raise ValueError(f"table must be a table or one of {_TABLES}, not '{table}'")
+    return getattr(container, table)
+
+
+def _row_index(table, row):
+    row = int(row)
+    n_rows = len(table)
+    if not 0 <= row < n_rows:
+        raise IndexError(f"row {row} is out of range for table '{table.name}' of length {n_rows}")
+    return row
+
+
+def _read_row(table, row):
+    """Read one row of a table as a dict, with the values of region columns as row indices."""
+    positions = np.array([row])
+    plain, regions, ragged = _split_columns(table)
+    values = dict(id=_read(table.id.data, positions)[0].item())
+    for name in table.colnames:
+        if name in plain:
+            value = _read(plain[name].data, positions)[0]
+            values[name] = value.item() if isinstance(value, np.generic) else value
+        elif name in regions:
+            values[name] = int(_read(regions[name].data, positions)[0])
+        else:
+            column, index = ragged[name]
+            value = _read_ragged(column, index, positions)[0]
+            values[name] = value.astype(np.int64).tolist() if isinstance(column, DynamicTableRegion) else value
+    return values
+
+
+def _get_rows(cache, table, rows):
+    return [dict(cache.get(table, ("row", row), lambda row=row: _read_row(table, row))) for row in rows]
+
+
+_TABLE_ARG = {
+    "name": "table",
+    "type": (str, DynamicTable),
+    "doc": "the table, or the name of a table of this container: 'fibers', 'fluorophores', 'photodetectors' or "
+    "'excitation_sources'",
+    "default": "fibers",
+}
+
+
+@docval(
+    {"name": "row", "type": (int, np.integer), "doc": "the index of the row"},
+    _TABLE_ARG,
+)
+def get_row(self, **kwargs):
+    """Return a row of a table as a dict of its id and column values, from the row cache of this container.
+
+    The values of region columns are the indices of the referenced rows, a list for a ragged column.
+    """
+    row, table = popargs("row", "table", kwargs)
+    table = _get_table(self, table)
+    return _get_rows(_get_cache(self), table, [_row_index(table, row)])[0]
+
+
+@docval(
+    {"name": "row", "type": (int, np.integer), "doc": "the index of the row"},
+    {"name": "column", "type": str, "doc": "the region column of the table, e.g. 'fluorophores'"},
+    _TABLE_ARG,
+)
+def get_referenced_rows(self, **kwargs):
+    """Return the rows that a region column references for one row of a table, as a list of dicts.
+
+    For example, the label of the first fluorophore of fiber 3 is
+    ``get_referenced_rows(row=3, column="fluorophores")[0]["label"]``. The region lookup and the referenced rows
+    are cached.
+    """
+    row, column, table = popargs("row", "column", "table", kwargs)
+    table = _get_table(self, table)
+    row = _row_index(table, row)
+    if column not in table.colnames:
+        raise KeyError(f"no column '{column}' in table '{table.name}'")
+    _, regions, ragged = _split_columns(table)
+    region = regions[column] if column in regions else ragged[column][0] if column in ragged else None
+    if not isinstance(region, DynamicTableRegion):
+        raise ValueError(f"column '{column}' of table '{table.name}' is not a region")
+    cache = _get_cache(self)
+
+    def read():
+        positions = np.array([row])
+        if column in regions:
+            return [int(_read(region.data, positions)[0])]
+        return _read_ragged(region, ragged[column][1], positions)[0].astype(np.int64).tolist()
+
+    return _get_rows(cache, region.table, cache.get(table, ("region", column, row), read))
+
+
+@docval(
+    {
+        "name": "region",
+        "type": DynamicTableRegion,
+        "doc": "the region, e.g. the fluorophores of a response series",
+    },
+)
+def get_region_rows(self, **kwargs):
+    """Return the rows that a region references, e.g. the `fluorophores` of a response series, as a list of dicts.
+
+    The region lookup and the referenced rows are cached.
+    """
+    region = popargs("region", kwargs)
+    cache = _get_cache(self)
+
+    def read():
+        # the region is kept in the entry, so that its id is not reused by another region while it is cached
+        return region, np.asarray(region.data[:], dtype=np.int64).tolist()
+
+    _, rows = cache.get(region.table, ("series_region", id(region), len(region.data)), read)
+    return _get_rows(cache, region.table, rows)
+
+
+def row_cache_info(self):
+    """Return the hits, misses, invalidations, maximum size and current size of the row cache of this container.
+
+    Each row and each region lookup is one hit or one miss. An invalidation drops the entries of a table that grew.
+    """
+    return _get_cache(self).info()
+
+
+@docval(
+    {
+        "name": "maxsize",
+        "type": int,
+        "doc": "the new maximum number of entries of the cache, the current one by default",
+        "default": None,
+    },
+)
+def clear_row_cache(self, **kwargs):
+    """Drop all the entries and statistics of the row cache of this container, and optionally resize it."""
+    maxsize = popargs("maxsize", kwargs)
+    if maxsize is not None and maxsize < 0:
+        raise ValueError("maxsize must not be negative")
+    cache = _get_cache(self)
+    self.__dict__["_row_cache"] = _RowCache(cache.maxsize if maxsize is None else maxsize)
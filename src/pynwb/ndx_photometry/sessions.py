@@ -0,0 +1,240 @@
+"""Read the photometry metadata and response series of many NWB files in parallel.
+
+Each worker process imports ndx_photometry once, which loads the namespace, and then reads the files, so the files
+of a cohort are read on all cores and their results are returned as soon as each one is done.
+
+Only the groups that are needed are read: the `FiberPhotometry` group, the requested series and the objects they
+reference. The other objects of the file, e.g. all the other series, are neither read nor constructed.
+"""
+
+import glob
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+from hdmf.backends.hdf5 import HDF5IO
+from hdmf.container import AbstractContainer
+from hdmf.utils import docval, popargs
+from pynwb import NWBHDF5IO
+
+from .photometry import get_photometry_class
+
+_TABLES = ("fibers", "fluorophores", "excitation_sources", "photodetectors")
+
+# HDF5IO reads the builder of one object and the objects it references with a private method. The public
+# `read_builder` reads the builders of the whole file, which takes as long as `read` for files with many series, so
+# the private method is used when it works, and the whole file is read otherwise. test_sessions checks that it exists
+# in the supported versions of hdmf.
+_READ_REF = "_HDF5IO__read_ref"
+
+
+def _table_to_dataframe(table):
+    """Return a table as a DataFrame that can be sent to another process.
+
+    Region columns hold row indices of the referenced table, and references to other objects hold their names.
+    """
+    df = table.to_dataframe(index=True)
+    for name in df.columns:
+        column = df[name]
+        if column.dtype == object and len(column) and isinstance(column.iloc[0], AbstractContainer):
+            df[name] = [value.name for value in column]
+    return df
+
+
+def _find_series(nwbfile, name):
+    if name in nwbfile.acquisition:
+        return nwbfile.acquisition[name]
+    for module in nwbfile.processing.values():
+        if name in module.data_interfaces:
+            return module.data_interfaces[name]
+    raise KeyError(f"no series named '{name}' in acquisition or processing")
+
+
+def _find_series_group(file, name):
+    if name in file.get("acquisition", ()):
+        return file["acquisition"][name]
+    for module in file.get("processing", dict()).values():
+        if name in module:
+            return module[name]
+    raise KeyError(f"no series named '{name}' in acquisition or processing")
+
+
+def _find_fiber_photometry(nwbfile, name):
+    fiber_photometry_cls = get_photometry_class("FiberPhotometry")
+    for value in nwbfile.lab_meta_data.values():
+        if isinstance(value, fiber_photometry_cls) and name in (None, value.name):
+            return value
+    return None
+
+
+def _find_fiber_photometry_group(file, name):
+    for key, group in file.get("general", dict()).items():
+        attributes = group.attrs
+        if (
+            attributes.get("neurodata_type") == "FiberPhotometry"
+            and attributes.get("namespace") == "ndx-photometry"
+            and name in (None, key)
+        ):
+            return group
+    return None
+
+
+def _read_object(io, group):
+    """Construct the object of a group, reading only that group and the objects that it references.
+
+    Returns None if this version of hdmf cannot read a single group, in which case the whole file must be read.
+    """
+    try:
+        builder = getattr(io, _READ_REF)(group)
+    except (TypeError, AttributeError):
+        # the private method was removed or its signature changed
+        return None
+    return io.manager.construct(builder)
+
+
+def _series_to_dict(series):
+    return dict(
+        data=np.asarray(series.data[:]),
+        timestamps=None if series.timestamps is None else np.asarray(series.timestamps[:]),
+        rate=series.rate,
+        starting_time=series.starting_time,
+        unit=series.unit,
+    )
+
+
+@docval(
+    {"name": "io", "type": HDF5IO, "doc": "the NWBHDF5IO of the file, open for reading"},
+    {
+        "name": "name",
+        "type": str,
+        "doc": "the name of the FiberPhotometry metadata, by default the first one found",
+        "default": None,
+    },
+    is_method=False,
+)
+def read_fiber_photometry(**kwargs):
+    """Read the FiberPhotometry metadata of a file without reading the rest of the file.
+
+    Only the FiberPhotometry group is read, with its tables and the objects they reference (e.g. the commanded
+    voltage series), instead of building every object of the file as ``io.read()`` does. The returned container has
+    no parent and its datasets are read from the file, which must stay open while it is used. Returns None if the file
+    has no FiberPhotometry metadata.
+    """
+    io, name = popargs("io", "name", kwargs)
+    group = _find_fiber_photometry_group(io._file, name)
+    if group is None:
+        return None
+    fiber_photometry = _read_object(io, group)
+    return _find_fiber_photometry(io.read(), name) if fiber_photometry is None else fiber_photometry
+
+
+@docval(
+    {"name": "path", "type": (str, Path), "doc": "the path of the NWB file"},
+    {"name": "series", "type": (list, tuple), "doc": "the names of the response series to read", "default": ()},
+    is_method=False,
+)
+def read_session(**kwargs):
+    """Read the photometry metadata tables and the given response series of one NWB file.
+
+    Returns a dict with the path of the file, one DataFrame per metadata table ("fibers", "fluorophores",
+    "excitation_sources" and "photodetectors") and, under "series", a dict with the data, timestamps, rate,
+    starting time and unit of each requested series. Tables are None if the file has no `FiberPhotometry` metadata.
+    """
+    path, series_names = popargs("path", "series", kwargs)
+    result = dict(path=os.fspath(path), series=dict())
+    # the namespace is already loaded by the import of ndx_photometry, do not load it again from the file
+    with NWBHDF5IO(os.fspath(path), mode="r", load_namespaces=False) as io:
+        fiber_photometry = read_fiber_photometry(io=io)
+        for name in _TABLES:
+            table = None if fiber_photometry is None else getattr(fiber_photometry, name)
+            result[name] = None if table is None else _table_to_dataframe(table)
+        for name in series_names:
+            series = _read_object(io, _find_series_group(io._file, name))
+            if series is None:
+                series = _find_series(io.read(), name)
+            result["series"][name] = _series_to_dict(series)
+    return result
+
+
+def _read_session(path, series):
+    # functions decorated with docval cannot be pickled, submit this one to the worker processes instead
+    return read_session(path=path, series=series)
+
+
+def _init_worker():
+    # importing the package loads the namespace, once for the lifetime of the worker
+    import ndx_photometry  # noqa: F401
+
+
+def _session_paths(paths, pattern):
+    if isinstance(paths, (str, Path)):
+        if os.path.isdir(paths):
+            return sorted(glob.glob(os.path.join(os.fspath(paths), pattern)))
+        return [os.fspath(paths)]
+    return [os.fspath(path) for path in paths]
+
+
+@docval(
+    {
+        "name": "paths",
+        "type": (str, Path, list, tuple),
+        "doc": "a directory of NWB files, or the paths of the files",
+    },
+    {"name": "series", "type": (list, tuple), "doc": "the names of the response series to read", "default": ()},
+    {
+        "name": "max_workers",
+        "type": int,
+        "doc": "the number of worker processes, by default the number of CPUs. With 1, files are read in this process",
+        "default": None,
+    },
+    {"name": "pattern", "type": str, "doc": "the pattern of the files to read in a directory", "default": "*.nwb"},
+    {
+        "name": "skip_errors",
+        "type": bool,
+        "doc": "warn about files that cannot be read and skip them instead of raising an error",
+        "default": False,
+    },
+    is_method=False,
+)
+def iter_sessions(**kwargs):
+    """Read many NWB files in parallel with `read_session`, yielding each result as soon as it is read.
+
+    The results are yielded in the order in which the files finish, use their "path" to tell them apart.
+    """
+    paths, series, max_workers, pattern, skip_errors = popargs(
+        "paths", "series", "max_workers", "pattern", "skip_errors", kwargs
+    )
+    paths = _session_paths(paths, pattern)
+    if max_workers is not None and max_workers < 1:
+        raise ValueError("max_workers must be positive")
+
+    if max_workers == 1:
+        for path in paths:
+            try:
+                result = read_session(path=path, series=series)
+            except Exception as exc:
+                if not skip_errors:
+                    raise OSError(f"could not read '{path}'") from exc
+                warnings.warn(f"could not read '{path}': {exc!r}")
+                continue
+            yield result
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker) as executor:
+        futures = {executor.submit(_read_session, path, series): path for path in paths}
+        try:
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as exc:
+                    if not skip_errors:
+                        raise OSError(f"could not read '{futures[future]}'") from exc
+                    warnings.warn(f"could not read '{futures[future]}': {exc!r}")
+                    continue
+                yield result
+        finally:
+            # do not read the remaining files if the caller stops early or an error is raised
+            for future in futures:
+                future.cancel()
@@ -0,0 +1,219 @@
+"""Write a FiberPhotometryResponseSeries from blocks of samples produced while the recording is running.
+
+The blocks are pulled from a generator by HDF5 chunk iterators while ``NWBHDF5IO.write`` runs, so only one block
+is held in memory at a time. The data and the timestamps are written to separate datasets, one after the other.
+The stream that is behind keeps its blocks in a temporary file until it is written, so memory use does not grow
+with the length of the recording. Passing ``exhaust_dci=False`` to ``NWBHDF5IO.write`` writes both datasets
+chunk by chunk in turn, which keeps the temporary file small.
+"""
+
+import tempfile
+from collections import deque
+from collections.abc import Iterable
+
+import numpy as np
+from hdmf.data_utils import AbstractDataChunkIterator, DataChunk
+from hdmf.utils import docval, popargs
+
+from .photometry import get_chunk_shape, get_photometry_class
+
+
+class _Spill:
+    """First-in first-out queue of arrays kept in a temporary file."""
+
+    def __init__(self):
+        self._file = None
+        self._shapes = deque()
+        self._read_offset = 0
+
+    def __len__(self):
+        return len(self._shapes)
+
+    def put(self, array):
+        if self._file is None:
+            self._file = tempfile.TemporaryFile()
+        self._file.seek(0, 2)
+        self._file.write(np.ascontiguousarray(array).tobytes())
+        self._shapes.append((array.shape, array.dtype))
+
+    def get(self):
+        shape, dtype = self._shapes.popleft()
+        self._file.seek(self._read_offset)
+        array = np.fromfile(self._file, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+        self._read_offset += array.nbytes
+        if not self._shapes:
+            # everything was read, start over at the beginning of the file
+            self._file.seek(0)
+            self._file.truncate()
+            self._read_offset = 0
+        return array
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class _StreamIterator(AbstractDataChunkIterator):
+    """Chunk iterator over one of the streams (data or timestamps) of a ResponseSeriesStream."""
+
+    def __init__(self, stream, kind, dtype, shape, chunks):
+        self._stream = stream
+        self._kind = kind
+        self._dtype = dtype
+        self._shape = shape
+        self._chunks = chunks
+        self._n_written = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        block = self._stream._next_block(self._kind)
+        start = self._n_written
+        self._n_written += len(block)
+        selection = (slice(start, self._n_written),) + tuple(slice(0, n) for n in self._shape)
+        return DataChunk(data=block, selection=selection)
+
+    def recommended_chunk_shape(self):
+        return self._chunks
+
+    def recommended_data_shape(self):
+        return (0,) + self._shape
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    @property
+    def maxshape(self):
+        return (None,) + self._shape
+
+
+class ResponseSeriesStream:
+    """Stream blocks of photometry samples from a generator into a FiberPhotometryResponseSeries.
+
+    Each block produced by ``blocks`` holds the samples acquired since the previous one, as an array of shape
+    (n_samples,) or (n_samples, n_fibers). When ``rate`` is not given, each block must instead be a pair
+    (data, timestamps) with one timestamp per sample. The first block is read when the stream is created to find the
+    shape and data type of the samples; all blocks must have the same number of fibers.
+
+    Use ``data`` and ``timestamps`` as the data and timestamps of the series, or ``create_series`` to make it. The
+    blocks are consumed when the file is written, after which ``n_samples`` and ``last_timestamp`` are set.
+    """
+
+    @docval(
+        {"name": "blocks", "type": Iterable, "doc": "the blocks of samples, or of (samples, timestamps) pairs"},
+        {
+            "name": "rate",
+            "type": (int, float),
+            "doc": "the sampling rate, if the blocks have no timestamps",
+            "default": None,
+        },
+        {"name": "chunk_bytes", "type": int, "doc": "the target size of one chunk, in bytes", "default": 1024**2},
+    )
+    def __init__(self, **kwargs):
+        blocks, rate, chunk_bytes = popargs("blocks", "rate", "chunk_bytes", kwargs)
+        self._blocks = iter(blocks)
+        self.rate = None if rate is None else float(rate)
+        self.n_samples = 0
+        self.last_timestamp = None
+        self._pending = dict(data=_Spill(), timestamps=_Spill())
+        self._done = False
+        self._data_shape = None
+
+        first = next(self._blocks, None)
+        if first is None:
+            raise ValueError("the stream of blocks is empty")
+        data, timestamps = self._split(first)
+        self._data_shape = data.shape[1:]
+        self._data_dtype = data.dtype
+        self._first_block = (data, timestamps)
+
+        if self.rate is None:
+            rate = (len(timestamps) - 1) / (timestamps[-1] - timestamps[0]) if len(timestamps) > 1 else 1.0
+        n_fibers = 1 if len(self._data_shape) == 0 else int(np.prod(self._data_shape))
+        chunks = get_chunk_shape(
+            rate=float(rate), n_fibers=n_fibers, itemsize=self._data_dtype.itemsize, chunk_bytes=chunk_bytes
+        )
+        self.data = _StreamIterator(self, "data", self._data_dtype, self._data_shape, chunks[:1] + self._data_shape)
+        self.timestamps = None
+        if self.rate is None:
+            timestamp_chunks = get_chunk_shape(rate=float(rate), n_fibers=1, chunk_bytes=chunk_bytes)[:1]
+            self.timestamps = _StreamIterator(self, "timestamps", np.dtype(np.float64), (), timestamp_chunks)
+
+    def _split(self, block):
+        if self.rate is None:
+            try:
+                data, timestamps = block
+            except (TypeError, ValueError):
+                raise ValueError("blocks must be (data, timestamps) pairs when the rate is not given") from None
+            data = np.asarray(data)
+            timestamps = np.asarray(timestamps, dtype=np.float64)
+            if timestamps.shape != (len(data),):
+                raise ValueError(f"got {len(timestamps)} timestamps for a block of {len(data)} samples")
+            if np.any(np.diff(timestamps) <= 0) or (
+                self.last_timestamp is not None and len(timestamps) and timestamps[0] <= self.last_timestamp
+            ):
+                raise ValueError("timestamps must be strictly increasing")
+        else:
+            data, timestamps = np.asarray(block), None
+        if data.ndim not in (1, 2):
+            raise ValueError(f"blocks must have 1 or 2 dimensions, got {data.ndim}")
+        if self._data_shape is not None:
+            if data.shape[1:] != self._data_shape:
+                raise ValueError(f"block of shape {data.shape} does not match the first block, {self._data_shape}")
+            data = data.astype(self._data_dtype, copy=False)
+        if len(data):
+            self.n_samples += len(data)
+            if timestamps is not None:
+                self.last_timestamp = float(timestamps[-1])
+        return data, timestamps
+
+    def _next_block(self, kind):
+        """Return the next block of `kind`, keeping the other part of the block until it is requested."""
+        pending = self._pending[kind]
+        if len(pending):
+            return pending.get()
+        if self._first_block is not None:
+            block, self._first_block = self._first_block, None
+        else:
+            block = None if self._done else next(self._blocks, None)
+            while block is not None:
+                block = self._split(block)
+                if len(block[0]):
+                    break
+                block = next(self._blocks, None)
+            if block is None:
+                self._done = True
+                self.close()
+                raise StopIteration
+        data, timestamps = block
+        if self.timestamps is not None:
+            other = "timestamps" if kind == "data" else "data"
+            self._pending[other].put(timestamps if kind == "data" else data)
+        return data if kind == "data" else timestamps
+
+    def close(self):
+        """Remove the temporary files used to hold blocks that were not written yet."""
+        for pending in self._pending.values():
+            if not len(pending):
+                pending.close()
+
+    @docval(
+        {
+            "name": "series_type",
+            "type": str,
+            "doc": "the neurodata type of the series to create",
+            "default": "FiberPhotometryResponseSeries",
+        },
+        allow_extra=True,
+    )
+    def create_series(self, **kwargs):
+        """Create a series with the data (and timestamps or rate) of this stream and the other given arguments."""
+        series_type = popargs("series_type", kwargs)
+        if self.timestamps is None:
+            kwargs.setdefault("rate", self.rate)
+        else:
+            kwargs["timestamps"] = self.timestamps
+        return get_photometry_class(series_type)(data=self.data, **kwargs)
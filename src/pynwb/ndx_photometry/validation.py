@@ -0,0 +1,219 @@
+"""Check the references between the photometry tables and series of NWB files, without building their objects.
+
+The datasets of the files are read with h5py, block by block, and the row indices of each region are checked against
+the length of the referenced table with NumPy. All the violations of a file are reported, not only the first one:
+
+- the columns of the photometry tables have one value (or one index entry) per row, and the indices of ragged
+  columns increase and stay within their column
+- the region columns of the photometry tables, e.g. the excitation source of each fiber, reference rows of their table
+- the ``fibers``, ``excitation_sources``, ``fluorophores`` and ``photodetectors`` regions of the response series
+  reference rows of a table of the expected type, and the series have one column of data per referenced fiber
+"""
+
+import os
+from collections import namedtuple
+from pathlib import Path
+
+import h5py
+import numpy as np
+from hdmf.utils import docval, popargs
+
+from .sessions import _session_paths
+
+Violation = namedtuple("Violation", ["path", "location", "message"])
+Violation.__doc__ = "A reference or shape that is not consistent, at a location of the file at a path."
+
+DEFAULT_CHUNK_ROWS = 2**20
+# the number of offending rows given in a message
+_MAX_REPORTED = 10
+
+_TABLES = ("FibersTable", "FluorophoresTable", "PhotodetectorsTable", "ExcitationSourcesTable")
+_SERIES = ("FiberPhotometryResponseSeries", "DeconvolvedFiberPhotometryResponseSeries")
+_SERIES_REGIONS = dict(
+    fibers="FibersTable",
+    excitation_sources="ExcitationSourcesTable",
+    fluorophores="FluorophoresTable",
+    photodetectors="PhotodetectorsTable",
+)
+
+
+def _attribute(obj, name):
+    value = obj.attrs.get(name)
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _find_objects(file):
+    """Return the groups of the photometry tables and series of a file, by neurodata type."""
+    found = {neurodata_type: [] for neurodata_type in _TABLES + _SERIES}
+
+    def visit(name, obj):
+        if isinstance(obj, h5py.Group) and _attribute(obj, "namespace") == "ndx-photometry":
+            neurodata_type = _attribute(obj, "neurodata_type")
+            if neurodata_type in found:
+                found[neurodata_type].append(obj)
+
+    file.visititems(visit)
+    return found
+
+
+def _blocks(dataset, chunk_rows):
+    """Yield the offset and the values of consecutive blocks of rows of a dataset."""
+    for start in range(0, len(dataset), chunk_rows):
+        yield start, np.asarray(dataset[start : start + chunk_rows])
+
+
+def _out_of_bounds(dataset, n_rows, chunk_rows):
+    """Return the number of values of a dataset outside of [0, n_rows), and the positions of the first ones."""
+    count, positions = 0, []
+    for start, values in _blocks(dataset, chunk_rows):
+        bad = (values < 0) | (values >= n_rows)
+        if bad.ndim > 1:
+            bad = bad.reshape(len(bad), -1).any(axis=1)
+        n_bad = int(np.count_nonzero(bad))
+        if n_bad and len(positions) < _MAX_REPORTED:
+            positions.extend((np.flatnonzero(bad)[: _MAX_REPORTED - len(positions)] + start).tolist())
+        count += n_bad
+    return count, positions
+
+
+def _target_table(file, dataset):
+    """Return the table referenced by a DynamicTableRegion dataset, or None if the reference cannot be followed."""
+    reference = dataset.attrs.get("table")
+    if not isinstance(reference, h5py.Reference) or not reference:
+        return None
+    try:
+        target = file[reference]
+    except (KeyError, ValueError):
+        return None
+    return target if isinstance(target, h5py.Group) and "id" in target else None
+
+
+class _Checker:
+    """Check the photometry objects of one file, collecting the violations."""
+
+    def __init__(self, path, file, chunk_rows):
+        self.path = path
+        self.file = file
+        self.chunk_rows = chunk_rows
+        self.violations = []
+
+    def report(self, location, message):
+        self.violations.append(Violation(self.path, location, message))
+
+    def check_region(self, dataset, expected_type=None):
+        """Check that the rows of a region are in its table, of the expected type if given."""
+        table = _target_table(self.file, dataset)
+        if table is None:
+            self.report(dataset.name, "the referenced table cannot be found")
+            return
+        neurodata_type = _attribute(table, "neurodata_type")
+        if expected_type is not None and neurodata_type != expected_type:
+            self.report(
+                dataset.name, f"references {neurodata_type} '{table.name}' instead of a table of type {expected_type}"
+            )
+        n_rows = len(table["id"])
+        count, positions = _out_of_bounds(dataset, n_rows, self.chunk_rows)
+        if count:
+            self.report(
+                dataset.name,
+                f"{count} values are out of range for '{table.name}', which has {n_rows} rows, "
+                f"first at positions {positions}",
+            )
+
+    def check_index(self, index, n_values):
+        """Check that the end offsets of a ragged column increase and stay within its n_values values."""
+        count, positions, previous = 0, [], 0
+        for start, ends in _blocks(index, self.chunk_rows):
+            ends = ends.astype(np.int64)
+            bad = (np.diff(ends, prepend=previous) < 0) | (ends > n_values)
+            n_bad = int(np.count_nonzero(bad))
+            if n_bad and len(positions) < _MAX_REPORTED:
+                positions.extend((np.flatnonzero(bad)[: _MAX_REPORTED - len(positions)] + start).tolist())
+            count += n_bad
+            if len(ends):
+                previous = ends[-1]
+        if count:
+            self.report(
+                index.name,
+                f"{count} offsets decrease or are past the {n_values} values of the column, first at rows {positions}",
+            )
+
+    def check_table(self, table):
+        n_rows = len(table["id"])
+        for name in table.attrs.get("colnames", ()):
+            name = name.decode() if isinstance(name, bytes) else str(name)
+            column = table.get(name)
+            if not isinstance(column, h5py.Dataset):
+                self.report(f"{table.name}/{name}", "the column is missing")
+                continue
+            index = table.get(f"{name}_index")
+            if isinstance(index, h5py.Dataset):
+                if len(index) != n_rows:
+                    self.report(index.name, f"has {len(index)} rows, the table has {n_rows}")
+                self.check_index(index, len(column))
+            elif len(column) != n_rows:
+                self.report(column.name, f"has {len(column)} rows, the table has {n_rows}")
+            if _attribute(column, "neurodata_type") == "DynamicTableRegion":
+                self.check_region(column)
+
+    def check_series(self, series):
+        data = series.get("data")
+        for name, expected_type in _SERIES_REGIONS.items():
+            region = series.get(name)
+            if not isinstance(region, h5py.Dataset):
+                continue
+            self.check_region(region, expected_type)
+            if name == "fibers" and isinstance(data, h5py.Dataset):
+                n_columns = 1 if data.ndim < 2 else data.shape[1]
+                if len(region) != n_columns:
+                    self.report(
+                        region.name, f"references {len(region)} fibers, the data has {n_columns} columns of fibers"
+                    )
+
+    def check(self):
+        found = _find_objects(self.file)
+        for neurodata_type in _TABLES:
+            for table in found[neurodata_type]:
+                self.check_table(table)
+        for neurodata_type in _SERIES:
+            for series in found[neurodata_type]:
+                self.check_series(series)
+        return self.violations
+
+
+@docval(
+    {
+        "name": "paths",
+        "type": (str, Path, list, tuple),
+        "doc": "an NWB file, a directory of NWB files, or the paths of the files",
+    },
+    {"name": "pattern", "type": str, "doc": "the pattern of the files to check in a directory", "default": "*.nwb"},
+    {
+        "name": "chunk_rows",
+        "type": int,
+        "doc": "the number of rows of a dataset read at once",
+        "default": DEFAULT_CHUNK_ROWS,
+    },
+    is_method=False,
+)
+def validate_references(**kwargs):
+    """Check the references between the photometry tables and series of NWB files and return all the violations.
+
+    Each violation is a `Violation` with the path of the file, the location of the dataset in the file and a
+    message. A file that cannot be opened is reported as a violation at its root. The datasets are read block by
+    block, so the memory used does not grow with the size of the tables. An empty list means that no violation was
+    found.
+    """
+    paths, pattern, chunk_rows = popargs("paths", "pattern", "chunk_rows", kwargs)
+    if chunk_rows < 1:
+        raise ValueError("chunk_rows must be positive")
+    violations = []
+    for path in _session_paths(paths, pattern):
+        try:
+            file = h5py.File(path, mode="r")
+        except OSError as exc:
+            violations.append(Violation(os.fspath(path), "/", f"the file cannot be opened: {exc}"))
+            continue
+        with file:
+            violations.extend(_Checker(os.fspath(path), file, chunk_rows).check())
+    return violations
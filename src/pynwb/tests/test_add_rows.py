@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ndx_photometry import (
+    FibersTable,
+    PhotodetectorsTable,
+    ExcitationSourcesTable,
+    FluorophoresTable,
+)
+
+
+@pytest.fixture()
+def fluorophores_table():
+    fluorophores_table = FluorophoresTable(description="description")
+    fluorophores_table.add_rows(
+        label=["dlight", "gcamp", "rcamp"],
+        location=["VTA", "NAc", "DMS"],
+        coordinates=np.array([[3.0, 2.0, 1.0], [1.0, 2.0, 3.0], [0.0, 0.0, 0.0]]),
+        excitation_peak_wavelength=np.array([470.0, 470.0, 560.0]),
+        emission_peak_wavelength=np.array([516.0, 512.0, 600.0]),
+    )
+    return fluorophores_table
+
+
+def test_add_rows_matches_add_row(fluorophores_table):
+    expected = FluorophoresTable(description="description")
+    expected.add_row(
+        label="dlight",
+        location="VTA",
+        coordinates=(3.0, 2.0, 1.0),
+        excitation_peak_wavelength=470.0,
+        emission_peak_wavelength=516.0,
+    )
+    expected.add_row(
+        label="gcamp",
+        location="NAc",
+        coordinates=(1.0, 2.0, 3.0),
+        excitation_peak_wavelength=470.0,
+        emission_peak_wavelength=512.0,
+    )
+    expected.add_row(
+        label="rcamp",
+        location="DMS",
+        coordinates=(0.0, 0.0, 0.0),
+        excitation_peak_wavelength=560.0,
+        emission_peak_wavelength=600.0,
+    )
+    pd.testing.assert_frame_equal(fluorophores_table.to_dataframe(), expected.to_dataframe())
+
+
+def test_add_rows_after_add_row():
+    photodetectors_table = PhotodetectorsTable(description="description")
+    photodetectors_table.add_row(peak_wavelength=500.0, type="PMT", gain=100.0)
+    photodetectors_table.add_rows(peak_wavelength=[510.0, 520.0], type=["PMT", "photodiode"], gain=[1.0, 2.0])
+    assert list(photodetectors_table.id[:]) == [0, 1, 2]
+    assert list(photodetectors_table["type"][:]) == ["PMT", "PMT", "photodiode"]
+
+
+def test_add_rows_from_dataframe():
+    excitation_sources_table = ExcitationSourcesTable(description="description")
+    df = pd.DataFrame(
+        dict(peak_wavelength=[470.0, 405.0], source_type=["LED", "LED"]), index=pd.Index([10, 11], name="id")
+    )
+    excitation_sources_table.add_rows(df)
+    assert list(excitation_sources_table.id[:]) == [10, 11]
+    assert list(excitation_sources_table["peak_wavelength"][:]) == [470.0, 405.0]
+
+
+def test_add_rows_ragged_region(fluorophores_table):
+    fibers_table = FibersTable(description="description")
+    fibers_table.add_column("fluorophores", "fluorophores in each fiber", table=fluorophores_table, index=True)
+    fibers_table.add_row(location="VTA", fluorophores=[0])
+    n_fibers = 300  # more than 255 fluorophore references, so the index must widen past uint8
+    fibers_table.add_rows(
+        location=["NAc"] * n_fibers,
+        fluorophores=[[i % 3, (i + 1) % 3] for i in range(n_fibers)],
+    )
+    assert len(fibers_table) == n_fibers + 1
+    df = fibers_table.to_dataframe(index=True)
+    assert df["fluorophores"].iloc[0] == [0]
+    assert list(df["fluorophores"].iloc[-1]) == [2, 0]
+    assert fibers_table["fluorophores"].data[-1] == 2 * n_fibers + 1
+
+
+def test_add_rows_errors(fluorophores_table):
+    fibers_table = FibersTable(description="description")
+    fibers_table.add_column("fluorophores", "fluorophores in each fiber", table=fluorophores_table, index=True)
+    with pytest.raises(ValueError, match="same number of rows"):
+        fibers_table.add_rows(location=["a", "b"], fluorophores=[[0]])
+    with pytest.raises(ValueError, match="missing"):
+        fibers_table.add_rows(location=["a"])
+    with pytest.raises(ValueError, match="extra keys"):
+        fibers_table.add_rows(location=["a"], fluorophores=[[0]], color=["red"])
+    with pytest.raises(IndexError, match="outside of 'fluorophores'"):
+        fibers_table.add_rows(location=["a"], fluorophores=[[3]])
+    assert len(fibers_table) == 0
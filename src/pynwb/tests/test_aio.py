@@ -0,0 +1,153 @@
+import asyncio
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import h5py
+import numpy as np
+import pytest
+from pynwb import NWBHDF5IO, NWBFile
+
+from ndx_photometry import FibersTable
+from ndx_photometry.aio import AsyncResponseSeriesStream, async_iter_blocks, async_read_session, async_write
+
+
+def _nwbfile():
+    nwbfile = NWBFile(
+        session_description="session_description",
+        identifier="identifier",
+        session_start_time=datetime.datetime.now(datetime.timezone.utc),
+    )
+    fibers_table = FibersTable(description="fibers table")
+    fibers_table.add_rows(location=["site 0", "site 1"])
+    nwbfile.create_processing_module(name="fibers", description="fibers").add(fibers_table)
+    return nwbfile, fibers_table
+
+
+def _block(i, block_size=100):
+    return np.arange(i * block_size, (i + 1) * block_size, dtype=np.float32)[:, None].repeat(2, axis=1)
+
+
+async def _stream_session(path, n_blocks, executor=None):
+    nwbfile, fibers_table = _nwbfile()
+    async with AsyncResponseSeriesStream(max_pending=2) as stream:
+        await stream.append((_block(0), np.arange(100) / 100.0))
+        series = await stream.create_series(
+            name="MyFPRecording",
+            unit="F",
+            fibers=fibers_table.create_fiber_region(region=[0, 1], description="source fibers"),
+        )
+        nwbfile.add_acquisition(series)
+        write = asyncio.ensure_future(async_write(path=path, nwbfile=nwbfile, executor=executor))
+        for i in range(1, n_blocks):
+            await stream.append((_block(i), np.arange(i * 100, (i + 1) * 100) / 100.0))
+    await write
+    return stream
+
+
+def test_streamed_write_and_read(tmp_path):
+    path = tmp_path / "test.nwb"
+    stream = asyncio.run(_stream_session(path, 25))
+    assert stream.stream.n_samples == 2500
+    with NWBHDF5IO(path, mode="r") as io:
+        series = io.read().acquisition["MyFPRecording"]
+        np.testing.assert_array_equal(series.data[:, 0], np.arange(2500))
+        np.testing.assert_array_equal(series.timestamps[:], np.arange(2500) / 100.0)
+
+    async def read(**kwargs):
+        return [block async for block in async_iter_blocks(path=path, name="MyFPRecording", **kwargs)]
+
+    blocks = asyncio.run(read(block_samples=300, max_pending=3))
+    assert [len(block) for block in blocks] == [300] * 8 + [100]
+    np.testing.assert_array_equal(np.concatenate(blocks)[:, 1], np.arange(2500))
+    # by default, the blocks are whole chunks
+    with h5py.File(path, mode="r") as file:
+        chunk_samples = file["acquisition/MyFPRecording/data"].chunks[0]
+    assert all(len(block) % chunk_samples == 0 for block in asyncio.run(read())[:-1])
+
+    session = asyncio.run(async_read_session(path=path, series=["MyFPRecording"]))
+    assert list(session["series"]["MyFPRecording"]["data"][:, 0]) == list(range(2500))
+
+
+def test_append_waits_for_the_writer(tmp_path):
+    async def main():
+        nwbfile, _ = _nwbfile()
+        stream = AsyncResponseSeriesStream(rate=100.0, max_pending=2)
+        await stream.append(_block(0))
+        nwbfile.add_acquisition(await stream.create_series(name="MyFPRecording", unit="F"))
+        # the writer has not started, only max_pending blocks can be appended
+        await stream.append(_block(1))
+        await stream.append(_block(2))
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(stream.append(_block(3)), 0.2)
+        write = asyncio.ensure_future(async_write(path=tmp_path / "test.nwb", nwbfile=nwbfile))
+        await asyncio.wait_for(stream.append(_block(3)), 5)
+        await stream.close()
+        await write
+        with pytest.raises(ValueError, match="closed"):
+            await stream.append(_block(4))
+
+    asyncio.run(main())
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="r") as io:
+        np.testing.assert_array_equal(io.read().acquisition["MyFPRecording"].data[:, 0], np.arange(400))
+
+
+def test_append_fails_when_the_write_fails(tmp_path):
+    async def main():
+        nwbfile, _ = _nwbfile()
+        stream = AsyncResponseSeriesStream(rate=100.0, max_pending=1)
+        await stream.append(_block(0))
+        nwbfile.add_acquisition(await stream.create_series(name="MyFPRecording", unit="F"))
+        with pytest.raises(OSError):
+            await async_write(path=tmp_path / "missing" / "test.nwb", nwbfile=nwbfile)
+        with pytest.raises(RuntimeError, match="not being written"):
+            for i in range(1, 5):
+                await stream.append(_block(i))
+
+    asyncio.run(main())
+
+
+def test_iteration_stopped_early_closes_the_file(tmp_path):
+    path = tmp_path / "test.nwb"
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        asyncio.run(_stream_session(path, 10, executor=executor))
+
+        async def main():
+            blocks = async_iter_blocks(path=path, name="MyFPRecording", block_samples=100, executor=executor)
+            async for block in blocks:
+                np.testing.assert_array_equal(block[:, 0], np.arange(100))
+                break
+            await blocks.aclose()
+            with pytest.raises(KeyError, match="no series named"):
+                await async_iter_blocks(path=path, name="missing", executor=executor).__anext__()
+
+        asyncio.run(main())
+    with h5py.File(path, mode="a"):
+        pass
+
+
+def test_copy_series_with_one_thread(tmp_path):
+    """A streamed write does not take the thread of the executor that reads the blocks it waits for."""
+    source, copy = tmp_path / "source.nwb", tmp_path / "copy.nwb"
+    asyncio.run(_stream_session(source, 10))
+
+    async def main(executor):
+        nwbfile, _ = _nwbfile()
+        stream = AsyncResponseSeriesStream(rate=100.0, max_pending=1)
+        # the series is created from the first block, appended by the copy task
+        create = asyncio.ensure_future(stream.create_series(name="MyFPRecording", unit="F"))
+        write = None
+        async with stream:
+            async for block in async_iter_blocks(
+                path=source, name="MyFPRecording", block_samples=50, executor=executor
+            ):
+                await stream.append(block)
+                if write is None:
+                    nwbfile.add_acquisition(await create)
+                    write = asyncio.ensure_future(async_write(path=copy, nwbfile=nwbfile, executor=executor))
+        await write
+        session = await async_read_session(path=copy, series=["MyFPRecording"], executor=executor)
+        return session["series"]["MyFPRecording"]["data"]
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        data = asyncio.run(asyncio.wait_for(main(executor), 30))
+    np.testing.assert_array_equal(data[:, 0], np.arange(1000))
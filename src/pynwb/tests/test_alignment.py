@@ -0,0 +1,132 @@
+import datetime
+
+import h5py
+import numpy as np
+import pytest
+from pynwb import NWBHDF5IO, NWBFile
+
+from ndx_photometry import FiberPhotometryResponseSeries, get_peri_event_windows, iter_peri_event_windows
+from ndx_photometry import alignment
+
+
+def _expected(data, event_samples, n_before, n_samples):
+    expected = np.full((len(event_samples), n_samples) + data.shape[1:], np.nan)
+    for i, event_sample in enumerate(event_samples):
+        for j in range(n_samples):
+            if 0 <= event_sample - n_before + j < len(data):
+                expected[i, j] = data[event_sample - n_before + j]
+    return expected
+
+
+@pytest.fixture()
+def data():
+    return np.random.default_rng(0).standard_normal((2000, 3))
+
+
+def test_get_peri_event_windows_rate(data):
+    series = FiberPhotometryResponseSeries(name="MyFPRecording", data=data, unit="F", rate=100.0, starting_time=1.0)
+    # unsorted, overlapping, and past both ends of the recording
+    event_times = np.array([5.0, 1.0, 5.03, 20.995, 12.0, 5.0])
+    windows = get_peri_event_windows(series=series, event_times=event_times, before=0.5, after=1.0)
+    expected = _expected(data, [400, 0, 403, 2000, 1100, 400], 50, 150)
+    np.testing.assert_array_equal(windows, expected)
+
+    windows = get_peri_event_windows(series=series, event_times=event_times, before=0.5, after=1.0, fibers=1)
+    np.testing.assert_array_equal(windows, expected[:, :, 1])
+
+
+def test_get_peri_event_windows_small_reads(data, monkeypatch):
+    series = FiberPhotometryResponseSeries(name="MyFPRecording", data=data, unit="F", rate=100.0)
+    event_times = np.random.default_rng(1).uniform(0, 20, size=200)
+    reads = []
+    read = alignment._WindowReader._read
+    monkeypatch.setattr(
+        alignment._WindowReader,
+        "_read",
+        lambda self, first, last: reads.append(last - first) or read(self, first, last),
+    )
+    windows = get_peri_event_windows(
+        series=series, event_times=event_times, before=0.1, after=0.2, fibers=[2, 0], max_read_bytes=3 * 8 * 100
+    )
+    assert max(reads) <= 100
+    expected = _expected(data, np.ceil(event_times * 100 - 1e-9).astype(int), 10, 30)[:, :, [2, 0]]
+    np.testing.assert_array_equal(windows, expected)
+
+
+def test_peri_event_windows_from_file(tmp_path, data):
+    timestamps = np.cumsum(np.random.default_rng(2).uniform(0.005, 0.015, size=len(data)))
+    nwbfile = NWBFile(
+        session_description="session_description",
+        identifier="identifier",
+        session_start_time=datetime.datetime.now(datetime.timezone.utc),
+    )
+    nwbfile.add_acquisition(
+        FiberPhotometryResponseSeries(name="MyFPRecording", data=data, unit="F", timestamps=timestamps)
+    )
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="w") as io:
+        io.write(nwbfile)
+
+    event_times = np.random.default_rng(3).uniform(0, timestamps[-1], size=100)
+    event_samples = np.searchsorted(timestamps, event_times)
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="r") as io:
+        series = io.read().acquisition["MyFPRecording"]
+        expected = _expected(data, event_samples, 20, 40)
+        for n_events in [10, 100]:
+            windows = get_peri_event_windows(series=series, event_times=event_times[:n_events], before=0.2, after=0.2)
+            np.testing.assert_array_equal(windows, expected[:n_events])
+
+        n_events = 0
+        for event_indices, windows in iter_peri_event_windows(
+            series=series, event_times=event_times, before=0.2, after=0.2, batch_size=30
+        ):
+            assert len(event_indices) <= 30
+            np.testing.assert_array_equal(windows, expected[event_indices])
+            n_events += len(event_indices)
+        assert n_events == 100
+
+
+def test_timestamps_are_read_in_bounded_blocks(tmp_path, monkeypatch):
+    n_samples = 2_000_000
+    timestamps = np.cumsum(np.random.default_rng(4).uniform(0.0005, 0.0015, size=n_samples))
+    nwbfile = NWBFile(
+        session_description="session_description",
+        identifier="identifier",
+        session_start_time=datetime.datetime.now(datetime.timezone.utc),
+    )
+    data = np.arange(n_samples, dtype=np.float32)
+    nwbfile.add_acquisition(
+        FiberPhotometryResponseSeries(name="MyFPRecording", data=data, unit="F", timestamps=timestamps)
+    )
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="w") as io:
+        io.write(nwbfile)
+
+    # sorted and unsorted, clustered, and past both ends of the recording
+    rng = np.random.default_rng(5)
+    event_times = np.r_[-1.0, rng.uniform(0, timestamps[-1], size=500), rng.uniform(100, 101, size=50), 1e9]
+    rng.shuffle(event_times)
+    reads = []
+    getitem = h5py.Dataset.__getitem__
+    monkeypatch.setattr(
+        h5py.Dataset,
+        "__getitem__",
+        lambda self, key: reads.append(np.asarray(getitem(self, key)).nbytes) or getitem(self, key),
+    )
+    max_read_bytes = 1024**2
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="r") as io:
+        series = io.read().acquisition["MyFPRecording"]
+        windows = get_peri_event_windows(
+            series=series, event_times=event_times, before=0.0, after=0.001, max_read_bytes=max_read_bytes
+        )
+    # the whole timestamps dataset is 16 MB
+    assert max(reads) <= max_read_bytes
+    event_samples = np.searchsorted(timestamps, event_times)
+    expected = np.where(event_samples < n_samples, event_samples, np.nan)
+    np.testing.assert_array_equal(windows[:, 0], expected)
+
+
+def test_peri_event_windows_errors(data):
+    series = FiberPhotometryResponseSeries(name="MyFPRecording", data=data, unit="F", rate=100.0)
+    with pytest.raises(ValueError, match="at least one sample"):
+        get_peri_event_windows(series=series, event_times=[1.0], before=0.0, after=0.0)
+    with pytest.raises(ValueError, match="batch_size"):
+        next(iter_peri_event_windows(series=series, event_times=[1.0], before=0.1, after=0.1, batch_size=0))
@@ -0,0 +1,141 @@
+import datetime
+import sys
+import threading
+
+import numpy as np
+import pytest
+from pynwb import NWBHDF5IO, NWBFile
+from pynwb.file import LabMetaData
+
+from ndx_photometry import (
+    ExcitationSourcesTable,
+    FiberPhotometry,
+    FiberPhotometryBuilder,
+    FiberPhotometryResponseSeries,
+    FibersTable,
+    FluorophoresTable,
+    PhotodetectorsTable,
+    StagedRow,
+)
+
+
+def _fiber_photometry():
+    return FiberPhotometry(
+        fibers=FibersTable(description="fibers"),
+        excitation_sources=ExcitationSourcesTable(description="excitation sources"),
+        photodetectors=PhotodetectorsTable(description="photodetectors"),
+        fluorophores=FluorophoresTable(description="fluorophores"),
+    )
+
+
+def _stage_session(builder, thread, n_fibers, barrier):
+    barrier.wait()
+    source = builder.add_row(table="excitation_sources", peak_wavelength=470.0, source_type=f"laser {thread}")
+    detector = builder.add_row(table="photodetectors", type=f"PMT {thread}")
+    fluorophore = builder.add_row(
+        table="fluorophores", label=f"dLight {thread}", emission_peak_wavelength=516.0, excitation_peak_wavelength=490.0
+    )
+    for i in range(n_fibers):
+        fiber = builder.add_row(table="fibers", location=f"{thread}-{i}")
+        series = FiberPhotometryResponseSeries(
+            name=f"response-{thread}-{i}", data=np.zeros((10, 1)), unit="F", rate=1.0
+        )
+        builder.add_series(
+            series=series,
+            fibers=[fiber],
+            excitation_sources=[source],
+            photodetectors=[detector],
+            fluorophores=[fluorophore],
+        )
+
+
+def test_concurrent_staging_and_commits():
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        fiber_photometry = _fiber_photometry()
+        builder = FiberPhotometryBuilder(fiber_photometry=fiber_photometry)
+        nwbfile = NWBFile(
+            session_description="session_description",
+            identifier="identifier",
+            session_start_time=datetime.datetime.now(datetime.timezone.utc),
+        )
+        n_threads, n_fibers = 8, 50
+        barrier = threading.Barrier(n_threads)
+        threads = [
+            threading.Thread(target=_stage_session, args=(builder, thread, n_fibers, barrier))
+            for thread in range(n_threads)
+        ]
+        for thread in threads:
+            thread.start()
+        # commit while the threads are still staging
+        committed = []
+        while any(thread.is_alive() for thread in threads):
+            committed += builder.commit(nwbfile=nwbfile)
+        for thread in threads:
+            thread.join()
+        committed += builder.commit(nwbfile=nwbfile)
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    assert len(committed) == len(set(map(id, committed))) == n_threads * n_fibers
+    assert len(fiber_photometry.fibers) == n_threads * n_fibers
+    assert len(fiber_photometry.excitation_sources) == len(fiber_photometry.photodetectors) == n_threads
+    assert len(fiber_photometry.fluorophores) == n_threads
+    assert sorted(fiber_photometry.fibers["location"][:]) == sorted(
+        f"{thread}-{i}" for thread in range(n_threads) for i in range(n_fibers)
+    )
+    assert list(fiber_photometry.fibers.id[:]) == list(range(n_threads * n_fibers))
+    assert nwbfile.lab_meta_data["fiber_photometry"] is fiber_photometry
+    for series in committed:
+        thread, i = series.name.split("-")[1:]
+        assert nwbfile.acquisition[series.name] is series
+        assert fiber_photometry.fibers["location"][series.fibers.data[0]] == f"{thread}-{i}"
+        assert (
+            fiber_photometry.excitation_sources["source_type"][series.excitation_sources.data[0]] == f"laser {thread}"
+        )
+        assert fiber_photometry.photodetectors["type"][series.photodetectors.data[0]] == f"PMT {thread}"
+        assert fiber_photometry.fluorophores["label"][series.fluorophores.data[0]] == f"dLight {thread}"
+    assert builder.commit() == []
+
+
+def test_commit_order_and_write(tmp_path):
+    fiber_photometry = _fiber_photometry()
+    fiber_photometry.fibers.add_row(location="VTA")
+    builder = FiberPhotometryBuilder(fiber_photometry=fiber_photometry)
+    first = builder.add_row(table="fibers", location="NAc")
+    second = builder.add_row(table="fibers", location="DMS")
+    assert isinstance(first, StagedRow) and first.index is None
+    series = FiberPhotometryResponseSeries(name="response", data=np.zeros((10, 3)), unit="F", rate=1.0)
+    builder.add_series(series=series, fibers=[0, first, second])
+    nwbfile = NWBFile(
+        session_description="session_description",
+        identifier="identifier",
+        session_start_time=datetime.datetime.now(datetime.timezone.utc),
+    )
+    assert builder.commit(nwbfile=nwbfile) == [series]
+    assert (first.index, second.index) == (1, 2)
+    assert list(series.fibers.data) == [0, 1, 2]
+
+    path = tmp_path / "test.nwb"
+    with NWBHDF5IO(path, mode="w") as io:
+        io.write(nwbfile)
+    with NWBHDF5IO(path, mode="r") as io:
+        read = io.read().acquisition["response"]
+        assert list(read.fibers.data[:]) == [0, 1, 2]
+        assert list(read.fibers.table["location"][:]) == ["VTA", "NAc", "DMS"]
+
+
+def test_failed_commit_keeps_staged_items():
+    fiber_photometry = _fiber_photometry()
+    builder = FiberPhotometryBuilder(fiber_photometry=fiber_photometry)
+    builder.add_row(table="fibers", notes="no location")
+    with pytest.raises(ValueError, match="missing"):
+        builder.commit()
+    assert len(fiber_photometry.fibers) == 0
+    with pytest.raises(ValueError, match="missing"):
+        builder.commit()
+    with pytest.raises(ValueError, match="table must be one of"):
+        builder.add_row(table="series")
+    with pytest.raises(TypeError, match="expected a FiberPhotometry container"):
+        FiberPhotometryBuilder(fiber_photometry=LabMetaData(name="other"))
@@ -0,0 +1,82 @@
+import datetime
+
+import h5py
+import numpy as np
+import pytest
+from hdmf.backends.hdf5 import H5DataIO
+from pynwb import NWBHDF5IO, NWBFile
+
+from ndx_photometry import (
+    DeconvolvedFiberPhotometryResponseSeries,
+    FiberPhotometryResponseSeries,
+    FibersTable,
+    get_chunk_shape,
+    get_compression_options,
+)
+
+
+def test_get_chunk_shape():
+    # whole seconds of samples for all fibers, close to 1 MiB
+    assert get_chunk_shape(rate=10000.0, n_fibers=8) == (10000, 8)
+    assert get_chunk_shape(rate=30.0, n_fibers=1, n_samples=100) == (100, 1)
+    assert get_chunk_shape(rate=1000.0, n_fibers=2, itemsize=4, chunk_bytes=4096) == (512, 2)
+    with pytest.raises(ValueError):
+        get_chunk_shape(rate=0.0, n_fibers=1)
+
+
+def test_get_compression_options():
+    assert get_compression_options(rate=30.0, n_fibers=2)["compression_opts"] == 4
+    assert get_compression_options(rate=1000.0, n_fibers=2)["compression_opts"] == 1
+    assert get_compression_options(rate=10000.0, n_fibers=2)["compression_opts"] == 1
+
+
+def _series(data, **kwargs):
+    fibers_table = FibersTable(description="fibers table")
+    fibers_table.add_rows(location=[f"site {i}" for i in range(data.shape[1])])
+    fiber_ref = fibers_table.create_fiber_region(region=slice(0, data.shape[1]), description="source fibers")
+    series = FiberPhotometryResponseSeries(name="MyFPRecording", data=data, unit="F", fibers=fiber_ref, **kwargs)
+    return fibers_table, series
+
+
+def test_set_chunked_compression_roundtrip(tmp_path):
+    data = np.random.randn(5000, 3)
+    fibers_table, series = _series(data, rate=1000.0)
+    data_io = series.set_chunked_compression(chunk_bytes=3 * 8 * 1000)
+    assert isinstance(data_io, H5DataIO)
+    assert series.data is data_io
+
+    nwbfile = NWBFile(
+        session_description="session_description",
+        identifier="identifier",
+        session_start_time=datetime.datetime.now(datetime.timezone.utc),
+    )
+    nwbfile.create_processing_module(name="fibers", description="fibers").add(fibers_table)
+    nwbfile.add_acquisition(series)
+    path = tmp_path / "test.nwb"
+    with NWBHDF5IO(path, mode="w") as io:
+        io.write(nwbfile)
+
+    with h5py.File(path, "r") as f:
+        dataset = f["acquisition/MyFPRecording/data"]
+        assert dataset.chunks == (1000, 3)
+        assert dataset.compression == "gzip"
+        assert dataset.shuffle
+        np.testing.assert_array_equal(dataset[:], data)
+
+
+def test_set_chunked_compression_from_timestamps():
+    data = np.random.randn(100, 2).astype(np.float32)
+    _, series = _series(data, timestamps=np.arange(100) / 20.0)
+    data_io = series.set_chunked_compression(compression=False)
+    assert data_io.io_settings == dict(chunks=(100, 2))
+
+
+def test_deconvolved_series_has_set_chunked_compression():
+    assert DeconvolvedFiberPhotometryResponseSeries.set_chunked_compression is not None
+
+
+def test_set_chunked_compression_twice():
+    _, series = _series(np.random.randn(10, 1), rate=30.0)
+    series.set_chunked_compression()
+    with pytest.raises(ValueError, match="already wrapped"):
+        series.set_chunked_compression()
@@ -0,0 +1,122 @@
+import datetime
+
+import h5py
+import numpy as np
+import pytest
+from pynwb import NWBHDF5IO, NWBFile
+
+from ndx_photometry import MultiCommandedVoltage, PeriodicData, RunLengthData, compact_voltage
+
+N_SAMPLES = 300_000
+
+
+@pytest.fixture()
+def voltages():
+    pulses = np.zeros(N_SAMPLES)
+    pulses[20_000:20_500] = 5.0
+    pulses[70_000:70_100] = 2.5
+    sine = np.round(np.sin(2 * np.pi * np.arange(N_SAMPLES) / 50), 6)
+    return dict(
+        constant=np.full(N_SAMPLES, 1.5),
+        pulses=pulses,
+        sine=sine,
+        sine_copy=sine.copy(),
+        noise=np.random.default_rng(0).standard_normal(N_SAMPLES),
+    )
+
+
+def test_compact_voltage(voltages):
+    assert isinstance(compact_voltage(data=voltages["constant"]).data, RunLengthData)
+    assert isinstance(compact_voltage(data=voltages["pulses"]).data, RunLengthData)
+    sine = compact_voltage(data=voltages["sine"]).data
+    assert isinstance(sine, PeriodicData)
+    assert len(sine.period) == 50
+    assert isinstance(compact_voltage(data=voltages["noise"]), np.ndarray)
+
+
+def test_compact_voltage_tolerance():
+    # the samples of a sine computed in floating point differ slightly from one period to the next
+    sine = np.sin(2 * np.pi * np.arange(N_SAMPLES) / 50)
+    assert isinstance(compact_voltage(data=sine), np.ndarray)
+    compact = compact_voltage(data=sine, atol=1e-9).data
+    assert isinstance(compact, PeriodicData)
+    assert len(compact.period) == 50
+    assert np.max(np.abs(compact[:] - sine)) <= 1e-9
+    assert isinstance(compact_voltage(data=sine + np.linspace(0, 1e-6, N_SAMPLES), atol=1e-9), np.ndarray)
+
+
+@pytest.mark.parametrize("name", ["constant", "pulses", "sine"])
+def test_compact_indexing(voltages, name):
+    data = voltages[name]
+    compact = compact_voltage(data=data, chunk_samples=1000).data
+    assert len(compact) == N_SAMPLES
+    np.testing.assert_array_equal(compact[:], data)
+    for item in [slice(19_990, 20_010), slice(100, 5000, 7), slice(-30, None), 5, -1, [3, 20_100, 99_999]]:
+        np.testing.assert_array_equal(compact[item], data[item])
+    np.testing.assert_array_equal(np.asarray(compact), data)
+    with pytest.raises(IndexError):
+        compact[N_SAMPLES]
+
+
+def test_short_periodic_data(tmp_path):
+    # fewer samples than a chunk and not a whole number of periods, the chunk is the whole data
+    period = np.arange(50, dtype=np.float64)
+    data = PeriodicData(period=period, n_samples=120)
+    expected = np.tile(period, 3)[:120]
+    np.testing.assert_array_equal(data[:], expected)
+    np.testing.assert_array_equal(data[100:120], expected[100:])
+    nwbfile = NWBFile(
+        session_description="session_description",
+        identifier="identifier",
+        session_start_time=datetime.datetime.now(datetime.timezone.utc),
+    )
+    commanded_voltages = MultiCommandedVoltage()
+    nwbfile.add_acquisition(commanded_voltages)
+    commanded_voltages.create_compact_commanded_voltage_series(name="voltage", data=data, power=1.0, rate=1000.0)
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="w") as io:
+        io.write(nwbfile)
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="r") as io:
+        series = io.read().acquisition["commanded_voltages"].commanded_voltage_series["voltage"]
+        np.testing.assert_array_equal(series.data[:], expected)
+
+
+def test_run_length_data_merges_runs():
+    data = RunLengthData(values=[1.0, 1.0, 0.0, 2.0, 2.0], lengths=[3, 2, 0, 4, 1])
+    assert data.values.tolist() == [1.0, 2.0]
+    assert data.lengths.tolist() == [5, 5]
+    assert data[:].tolist() == [1.0] * 5 + [2.0] * 5
+
+
+def test_compact_commanded_voltages(voltages, tmp_path):
+    nwbfile = NWBFile(
+        session_description="session_description",
+        identifier="identifier",
+        session_start_time=datetime.datetime.now(datetime.timezone.utc),
+    )
+    commanded_voltages = MultiCommandedVoltage()
+    for name, data in voltages.items():
+        commanded_voltages.create_compact_commanded_voltage_series(
+            name=name, data=data, power=1.0, frequency=200.0, rate=10000.0
+        )
+    nwbfile.add_acquisition(commanded_voltages)
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="w") as io:
+        io.write(nwbfile)
+
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="r") as io:
+        series = io.read().acquisition["commanded_voltages"].commanded_voltage_series
+        for name, data in voltages.items():
+            np.testing.assert_array_equal(series[name].data[:], data)
+            assert series[name].rate == 10000.0
+            assert series[name].frequency == 200.0
+
+    with h5py.File(tmp_path / "test.nwb", mode="r") as f:
+        group = f["acquisition/commanded_voltages"]
+        # a constant voltage is only the fill value of the dataset, no chunk is written
+        assert group["constant/data"].id.get_storage_size() == 0
+        # only the chunks with pulses are written, out of 5
+        assert group["pulses/data"].id.get_num_chunks() == 2
+        assert group["sine/data"].id.get_storage_size() < N_SAMPLES * 8 / 50
+        # identical voltages are stored once
+        assert isinstance(group["sine_copy"].get("data", getlink=True), (h5py.SoftLink, h5py.HardLink))
+        assert group["sine_copy/data"] == group["sine/data"]
+        assert group["noise/data"].shape == (N_SAMPLES,)
@@ -0,0 +1,129 @@
+import datetime
+
+import numpy as np
+import pytest
+from pynwb import NWBHDF5IO, NWBFile
+
+from ndx_photometry import (
+    CommandedVoltageSeries,
+    ExcitationSourcesTable,
+    FiberPhotometryResponseSeries,
+    FibersTable,
+    demodulate,
+)
+
+RATE = 5000.0
+FREQUENCIES = [211.0, 531.0]
+
+
+@pytest.fixture()
+def multiplexed(tmp_path):
+    """Write a signal of 2 fibers with 2 sources modulated at different frequencies, return the path and envelopes."""
+    n_samples = 40000
+    times = np.arange(n_samples) / RATE
+    rng = np.random.default_rng(0)
+    envelopes = [
+        1.0 + 0.5 * np.sin(2 * np.pi * 0.5 * times)[:, None] * [1.0, 0.5],
+        0.5 + 0.2 * np.cos(2 * np.pi * 1.5 * times)[:, None] * [0.5, 1.0],
+    ]
+    signal = sum(
+        envelope * np.cos(2 * np.pi * frequency * times + phase)[:, None]
+        for envelope, frequency, phase in zip(envelopes, FREQUENCIES, [0.3, 2.0])
+    )
+    signal += 0.01 * rng.standard_normal(signal.shape)
+
+    nwbfile = NWBFile(
+        session_description="session_description",
+        identifier="identifier",
+        session_start_time=datetime.datetime.now(datetime.timezone.utc),
+    )
+    commanded_voltages = [
+        CommandedVoltageSeries(
+            name=f"commanded_voltage_{i}",
+            data=np.cos(2 * np.pi * frequency * times[:1000]),
+            frequency=frequency,
+            power=1.0,
+            rate=RATE,
+            unit="volts",
+        )
+        for i, frequency in enumerate(FREQUENCIES)
+    ]
+    for commanded_voltage in commanded_voltages:
+        nwbfile.add_acquisition(commanded_voltage)
+    excitation_sources_table = ExcitationSourcesTable(description="excitation sources table")
+    excitation_sources_table.add_rows(
+        peak_wavelength=[470.0, 405.0, 560.0],
+        source_type=["LED", "LED", "LED"],
+        commanded_voltage=commanded_voltages + [commanded_voltages[0]],
+    )
+    fibers_table = FibersTable(description="fibers table")
+    fibers_table.add_rows(location=["VTA", "NAc"])
+    module = nwbfile.create_processing_module(name="ophys", description="fiber photometry")
+    module.add(excitation_sources_table)
+    module.add(fibers_table)
+    nwbfile.add_acquisition(
+        FiberPhotometryResponseSeries(
+            name="raw",
+            data=signal,
+            unit="V",
+            rate=RATE,
+            fibers=fibers_table.create_fiber_region(region=[0, 1], description="fibers"),
+            excitation_sources=excitation_sources_table.create_excitation_source_region(
+                region=[0, 1], description="sources"
+            ),
+        )
+    )
+    with NWBHDF5IO(tmp_path / "raw.nwb", mode="w") as io:
+        io.write(nwbfile)
+    return tmp_path / "raw.nwb", envelopes
+
+
+def _demodulate(path, **kwargs):
+    with NWBHDF5IO(path, mode="a") as io:
+        nwbfile = io.read()
+        for series in demodulate(series=nwbfile.acquisition["raw"], **kwargs):
+            nwbfile.processing["ophys"].add(series)
+        io.write(nwbfile, exhaust_dci=False)
+
+
+def test_demodulate(multiplexed):
+    path, envelopes = multiplexed
+    _demodulate(path, factor=10)
+    with NWBHDF5IO(path, mode="r") as io:
+        ophys = io.read().processing["ophys"]
+        for row, (frequency, envelope) in enumerate(zip(FREQUENCIES, envelopes)):
+            series = ophys[f"raw_{frequency:g}Hz"]
+            assert isinstance(series, FiberPhotometryResponseSeries)
+            assert series.rate == RATE / 10
+            assert series.excitation_sources.data[:].tolist() == [row]
+            assert series.fibers.data[:].tolist() == [0, 1]
+            assert series.data.shape == (4000, 2)
+            # the envelopes are recovered, away from the ends of the recording where the filter is truncated
+            np.testing.assert_allclose(series.data[10:-10], envelope[::10][10:-10], atol=0.02)
+            assert np.isfinite(series.data[:]).all()
+
+
+def test_demodulate_buffers(multiplexed):
+    """The result does not depend on how the writer splits the series into buffers."""
+    path, _ = multiplexed
+    with NWBHDF5IO(path, mode="r") as io:
+        raw = io.read().acquisition["raw"]
+        small, large = (
+            [series.data for series in demodulate(series=raw, factor=3, buffer_gb=buffer_gb)]
+            for buffer_gb in (1e-5, 1.0)
+        )
+        for small_data, large_data in zip(small, large):
+            np.testing.assert_allclose(np.concatenate(list(small_data)), np.concatenate(list(large_data)), atol=1e-12)
+
+
+def test_demodulate_errors(multiplexed):
+    path, _ = multiplexed
+    with NWBHDF5IO(path, mode="r") as io:
+        nwbfile = io.read()
+        raw = nwbfile.acquisition["raw"]
+        with pytest.raises(ValueError, match="different carrier frequencies"):
+            demodulate(series=raw, rows=[0, 1, 2])
+        with pytest.raises(ValueError, match="Nyquist"):
+            demodulate(series=raw, factor=100)
+        with pytest.raises(ValueError, match="one name per"):
+            demodulate(series=raw, names=["a"])
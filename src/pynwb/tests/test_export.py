@@ -0,0 +1,103 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from pynwb import NWBHDF5IO, NWBFile
+
+from ndx_photometry import (
+    ExcitationSourcesTable,
+    FiberPhotometry,
+    FibersTable,
+    FluorophoresTable,
+    MultiCommandedVoltage,
+    PhotodetectorsTable,
+)
+
+
+@pytest.fixture()
+def nwbfile():
+    nwbfile = NWBFile(
+        session_description="session_description",
+        identifier="identifier",
+        session_start_time=datetime.datetime.now(datetime.timezone.utc),
+    )
+    multi_commanded_voltage = MultiCommandedVoltage()
+    commanded_voltages = [
+        multi_commanded_voltage.create_commanded_voltage_series(
+            name=f"commanded_voltage{i}", data=[1.0, 2.0], frequency=211.0 + i, power=500.0, rate=30.0, unit="volts"
+        )
+        for i in range(2)
+    ]
+    excitation_sources_table = ExcitationSourcesTable(description="excitation sources table")
+    excitation_sources_table.add_rows(
+        peak_wavelength=[470.0, 405.0], source_type=["LED", "LED"], commanded_voltage=commanded_voltages
+    )
+    photodetectors_table = PhotodetectorsTable(description="photodetectors table")
+    photodetectors_table.add_rows(peak_wavelength=[500.0], type=["PMT"], gain=[100.0])
+    fluorophores_table = FluorophoresTable(description="fluorophores")
+    fluorophores_table.add_rows(
+        label=["dlight", "gcamp", "rcamp"],
+        excitation_peak_wavelength=[470.0, 470.0, 560.0],
+        emission_peak_wavelength=[516.0, 512.0, 600.0],
+    )
+    fibers_table = FibersTable(description="fibers table")
+    fibers_table.add_column("excitation_source", "excitation source", table=excitation_sources_table)
+    fibers_table.add_column("photodetector", "photodetector", table=photodetectors_table)
+    fibers_table.add_column("fluorophores", "fluorophores", table=fluorophores_table, index=True)
+    fibers_table.add_rows(
+        location=["VTA", "NAc", "DMS"],
+        coordinates=np.arange(9.0).reshape(3, 3),
+        excitation_source=[1, 0, 1],
+        photodetector=[0, 0, 0],
+        fluorophores=[[0, 2], [], [1]],
+    )
+    nwbfile.add_lab_meta_data(
+        FiberPhotometry(
+            fibers=fibers_table,
+            excitation_sources=excitation_sources_table,
+            photodetectors=photodetectors_table,
+            fluorophores=fluorophores_table,
+            commanded_voltages=multi_commanded_voltage,
+        )
+    )
+    return nwbfile
+
+
+def _check_dataframe(df):
+    assert list(df["fiber_id"]) == [0, 0, 1, 2]
+    assert list(df["fiber_location"]) == ["VTA", "VTA", "NAc", "DMS"]
+    np.testing.assert_array_equal(df["fiber_coordinates"][2], [3.0, 4.0, 5.0])
+    assert list(df["excitation_source_peak_wavelength"]) == [405.0, 405.0, 470.0, 405.0]
+    assert list(df["excitation_source_commanded_voltage"]) == ["commanded_voltage1"] * 2 + [
+        "commanded_voltage0",
+        "commanded_voltage1",
+    ]
+    assert list(df["excitation_source_commanded_voltage_frequency"]) == [212.0, 212.0, 211.0, 212.0]
+    assert list(df["photodetector_type"]) == ["PMT"] * 4
+    # the fiber without fluorophores is kept, with missing fluorophore values
+    assert list(df["fluorophores_label"][[0, 1, 3]]) == ["dlight", "rcamp", "gcamp"]
+    assert pd.isna(df["fluorophores_label"][2])
+    np.testing.assert_array_equal(df["fluorophores_id"], [0.0, 2.0, np.nan, 1.0])
+    assert "fiber_fluorophores" not in df
+
+
+def test_to_dataframe(nwbfile, tmp_path):
+    _check_dataframe(nwbfile.lab_meta_data["fiber_photometry"].to_dataframe())
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="w") as io:
+        io.write(nwbfile)
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="r") as io:
+        _check_dataframe(io.read().lab_meta_data["fiber_photometry"].to_dataframe())
+
+
+def test_to_dataframe_explode_error(nwbfile):
+    with pytest.raises(ValueError, match="not a ragged region column"):
+        nwbfile.lab_meta_data["fiber_photometry"].to_dataframe(explode="location")
+
+
+def test_to_arrow(nwbfile):
+    pytest.importorskip("pyarrow")
+    table = nwbfile.lab_meta_data["fiber_photometry"].to_arrow()
+    assert table.num_rows == 4
+    assert table.column("fluorophores_label").null_count == 1
+    assert table.column("fiber_coordinates").to_pylist()[2] == [3.0, 4.0, 5.0]
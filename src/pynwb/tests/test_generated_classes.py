@@ -0,0 +1,153 @@
+import importlib.util
+import json
+import os
+import re
+import subprocess
+import sys
+import textwrap
+
+import hdmf
+import pynwb
+import pytest
+
+import ndx_photometry
+from ndx_photometry import _spec_cache, photometry
+
+SPEC_DIR = os.path.join(os.path.dirname(_spec_cache.__file__), "..", "..", "..", "spec")
+SCRIPT = os.path.join(os.path.dirname(_spec_cache.__file__), "..", "..", "spec", "generate_classes.py")
+GENERATED = os.path.join(os.path.dirname(_spec_cache.__file__), "_generated.py")
+
+
+def _constant(name):
+    # the generated module cannot be imported with other versions of hdmf than the one it was generated with
+    with open(GENERATED, encoding="utf-8") as f:
+        return re.search(rf'^{name} = "(.*)"$', f.read(), flags=re.MULTILINE).group(1)
+
+
+# the generated classes are only used with the versions of hdmf and pynwb they were generated with
+same_versions = pytest.mark.skipif(
+    (_constant("HDMF_VERSION"), _constant("PYNWB_VERSION")) != (hdmf.__version__, pynwb.__version__),
+    reason="the classes were generated with other versions of hdmf and pynwb",
+)
+needs_script = pytest.mark.skipif(
+    not os.path.exists(SCRIPT), reason="the spec tooling is not installed with the package"
+)
+
+
+@needs_script
+def test_generated_classes_are_up_to_date():
+    result = subprocess.run([sys.executable, SCRIPT, "--check"], capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout + result.stderr
+
+
+@needs_script
+def test_check_with_other_versions():
+    spec = importlib.util.spec_from_file_location("generate_classes", SCRIPT)
+    script = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(script)
+    source = script.generate()
+    assert script.is_up_to_date(source)
+    assert not script.is_up_to_date(source + "# edited\n")
+    assert not script.is_up_to_date(None)
+    # a file generated with another version of hdmf has other classes, only the hash of the spec files is compared
+    other = source.replace(f'HDMF_VERSION = "{hdmf.__version__}"', 'HDMF_VERSION = "0.0.0"') + "# other classes\n"
+    assert script.is_up_to_date(other)
+    assert not script.is_up_to_date(other.replace(_constant("SPEC_HASH"), "0" * 32))
+
+
+@pytest.mark.parametrize(
+    "setup",
+    [
+        # the classes were generated with another version of hdmf
+        "import hdmf; hdmf.__version__ = '0.0.0'",
+        # the classes use names that the installed hdmf does not have
+        "import sys; sys.modules['ndx_photometry._generated'] = None",
+    ],
+)
+def test_runtime_classes_with_other_versions(setup):
+    code = f"{setup}\nimport ndx_photometry\nprint(ndx_photometry.FibersTable.__module__)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() != "ndx_photometry._generated"
+
+
+@same_versions
+def test_generated_classes_are_used():
+    from ndx_photometry import _generated
+
+    for neurodata_type in photometry.NEURODATA_TYPES:
+        cls = getattr(ndx_photometry, neurodata_type)
+        assert cls is getattr(_generated, neurodata_type)
+        assert cls.namespace == "ndx-photometry" and cls.neurodata_type == neurodata_type
+    assert ndx_photometry.FibersTable.create_fiber_region is photometry.create_fiber_region
+
+
+def test_spec_hash(tmp_path):
+    namespace_path = os.path.join(SPEC_DIR, "ndx-photometry.namespace.yaml")
+    assert _spec_cache.get_spec_hash(namespace_path) == _constant("SPEC_HASH")
+    for name in ("ndx-photometry.namespace.yaml", "ndx-photometry.extensions.yaml"):
+        with open(os.path.join(SPEC_DIR, name)) as src, open(tmp_path / name, "w") as dst:
+            dst.write(src.read())
+    with open(tmp_path / "ndx-photometry.extensions.yaml", "a") as f:
+        f.write("# edited\n")
+    assert _spec_cache.get_spec_hash(str(tmp_path / "ndx-photometry.namespace.yaml")) != _constant("SPEC_HASH")
+
+
+@same_versions
+def test_same_classes_as_runtime_generation():
+    code = textwrap.dedent(
+        """
+        import json
+        from hdmf.utils import get_docval
+        import ndx_photometry
+
+        def type_name(value):
+            if isinstance(value, (list, tuple)):
+                return [type_name(item) for item in value]
+            if isinstance(value, str):
+                return value
+            # the generated classes and the runtime classes of the same type are different classes
+            return f"{value.__module__.replace('ndx_photometry._generated', 'abc')}.{value.__name__}"
+
+        classes = dict()
+        for neurodata_type in ndx_photometry.photometry.NEURODATA_TYPES:
+            cls = getattr(ndx_photometry, neurodata_type)
+            args = [
+                [arg["name"], type_name(arg["type"]), repr(arg.get("default", "required")), arg.get("shape")]
+                for arg in get_docval(cls.__init__)
+            ]
+            columns = [[column["name"], column["required"]] for column in getattr(cls, "__columns__", ())]
+            fields = [field if isinstance(field, str) else field["name"] for field in cls.get_fields_conf()]
+            bases = [type_name(base) for base in cls.__bases__]
+            clsconf = [conf["attr"] for conf in getattr(cls, "__clsconf__", ())]
+            classes[neurodata_type] = dict(
+                args=args, columns=columns, fields=fields, bases=bases, clsconf=clsconf, module=cls.__module__
+            )
+        print(json.dumps(classes))
+        """
+    )
+    outputs = []
+    for runtime_classes in ("0", "1"):
+        env = dict(os.environ, NDX_PHOTOMETRY_RUNTIME_CLASSES=runtime_classes)
+        result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+        outputs.append(json.loads(result.stdout))
+    generated, runtime = outputs
+    for neurodata_type in photometry.NEURODATA_TYPES:
+        assert generated[neurodata_type].pop("module") == "ndx_photometry._generated"
+        assert runtime[neurodata_type].pop("module") != "ndx_photometry._generated"
+        assert generated[neurodata_type] == runtime[neurodata_type], neurodata_type
+
+
+@same_versions
+@pytest.mark.parametrize("neurodata_type", ["FibersTable", "FiberPhotometryResponseSeries"])
+def test_generated_classes_take_the_runtime_arguments(neurodata_type):
+    from ndx_photometry import _generated
+
+    kwargs = dict(description="fibers") if neurodata_type == "FibersTable" else dict(name="response", data=[1.0])
+    if neurodata_type == "FibersTable":
+        kwargs["meanings_tables__meanings_tables"] = None
+    else:
+        kwargs.update(unit="F", rate=1.0)
+    obj = getattr(ndx_photometry, neurodata_type)(skip_post_init=True, **kwargs)
+    assert type(obj) is getattr(_generated, neurodata_type)
@@ -0,0 +1,63 @@
+import datetime
+
+import numpy as np
+import pytest
+from pynwb import NWBHDF5IO, NWBFile
+
+from ndx_photometry import FiberPhotometryResponseSeries
+from ndx_photometry import photometry
+
+
+def _series(**kwargs):
+    return FiberPhotometryResponseSeries(
+        name="MyFPRecording", data=np.arange(3000, dtype=float).reshape(1000, 3), unit="F", **kwargs
+    )
+
+
+def test_get_window_rate():
+    series = _series(rate=10.0, starting_time=2.0)
+    data, timestamps = series.get_window(start=3.0, stop=4.0)
+    np.testing.assert_array_equal(data, np.arange(10, 20)[:, None] * 3 + np.arange(3))
+    np.testing.assert_allclose(timestamps, 3.0 + np.arange(10) / 10.0)
+
+    data, timestamps = series.get_window(start=0.0, stop=2.15)
+    assert data.shape == (2, 3)
+    data, timestamps = series.get_window(start=200.0, stop=300.0)
+    assert data.shape == (0, 3) and len(timestamps) == 0
+
+
+def test_get_window_fibers():
+    series = _series(rate=10.0)
+    data, _ = series.get_window(start=0.0, stop=0.5, fibers=1)
+    np.testing.assert_array_equal(data, np.arange(5) * 3 + 1)
+    data, _ = series.get_window(start=0.0, stop=0.5, fibers=[2, 0])
+    np.testing.assert_array_equal(data[:, 0], np.arange(5) * 3 + 2)
+    np.testing.assert_array_equal(data[:, 1], np.arange(5) * 3)
+
+
+def test_get_window_errors():
+    series = _series(rate=10.0)
+    with pytest.raises(ValueError, match="before it starts"):
+        series.get_window(start=1.0, stop=0.0)
+
+
+def test_get_window_timestamps_from_file(tmp_path, monkeypatch):
+    # irregular timestamps, searched by reading single values down to blocks of 64
+    monkeypatch.setattr(photometry, "_SEARCH_BLOCK_SIZE", 64)
+    timestamps = np.cumsum(np.random.default_rng(0).uniform(0.05, 0.15, size=1000))
+    nwbfile = NWBFile(
+        session_description="session_description",
+        identifier="identifier",
+        session_start_time=datetime.datetime.now(datetime.timezone.utc),
+    )
+    nwbfile.add_acquisition(_series(timestamps=timestamps))
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="w") as io:
+        io.write(nwbfile)
+
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="r") as io:
+        series = io.read().acquisition["MyFPRecording"]
+        for start, stop in [(10.0, 20.0), (0.0, 1.0), (timestamps[500], timestamps[600]), (90.0, 1000.0)]:
+            mask = (timestamps >= start) & (timestamps < stop)
+            data, window_timestamps = series.get_window(start=start, stop=stop)
+            np.testing.assert_array_equal(window_timestamps, timestamps[mask])
+            np.testing.assert_array_equal(data, np.arange(3000, dtype=float).reshape(1000, 3)[mask])
@@ -0,0 +1,122 @@
+import datetime
+
+import numpy as np
+import pytest
+from pynwb import NWBHDF5IO, NWBFile
+
+from ndx_photometry import (
+    DeconvolvedFiberPhotometryResponseSeries,
+    ExcitationSourcesTable,
+    FiberPhotometry,
+    FiberPhotometryResponseSeries,
+    FibersTable,
+    FluorophoresTable,
+    PhotodetectorsTable,
+)
+
+
+@pytest.fixture()
+def path(tmp_path):
+    nwbfile = NWBFile(
+        session_description="session_description",
+        identifier="identifier",
+        session_start_time=datetime.datetime.now(datetime.timezone.utc),
+    )
+    excitation_sources_table = ExcitationSourcesTable(description="excitation sources table")
+    excitation_sources_table.add_rows(peak_wavelength=[470.0, 405.0], source_type=["LED", "LED"])
+    photodetectors_table = PhotodetectorsTable(description="photodetectors table")
+    photodetectors_table.add_rows(peak_wavelength=[500.0, 600.0], type=["PMT", "PMT"], gain=[100.0, 100.0])
+    fluorophores_table = FluorophoresTable(description="fluorophores")
+    fluorophores_table.add_rows(
+        label=["dlight", "gcamp", "rcamp"],
+        excitation_peak_wavelength=[470.0, 470.0, 560.0],
+        emission_peak_wavelength=[516.0, 512.0, 600.0],
+    )
+    fibers_table = FibersTable(description="fibers table")
+    fibers_table.add_column("fluorophores", "fluorophores", table=fluorophores_table, index=True)
+    fibers_table.add_rows(location=["VTA", "NAc", "VTA"], fluorophores=[[0, 2], [0], [1]])
+    nwbfile.add_lab_meta_data(
+        FiberPhotometry(
+            fibers=fibers_table,
+            excitation_sources=excitation_sources_table,
+            photodetectors=photodetectors_table,
+            fluorophores=fluorophores_table,
+        )
+    )
+
+    def series(name, fibers, photodetectors, cls=FiberPhotometryResponseSeries, **kwargs):
+        return cls(
+            name=name,
+            data=np.zeros((10, len(fibers))),
+            unit="F",
+            rate=10.0,
+            fibers=fibers_table.create_fiber_region(region=fibers, description="fibers"),
+            photodetectors=photodetectors_table.create_photodetector_region(
+                region=photodetectors, description="photodetectors"
+            ),
+            **kwargs,
+        )
+
+    vta = series("vta", [0], [0])
+    nwbfile.add_acquisition(vta)
+    nwbfile.add_acquisition(series("nac_and_vta", [1, 2], [1]))
+    nwbfile.add_acquisition(
+        series(
+            "vta_470",
+            [0],
+            [0],
+            excitation_sources=excitation_sources_table.create_excitation_source_region(region=[0], description="470"),
+        )
+    )
+    module = nwbfile.create_processing_module(name="ophys", description="fiber photometry")
+    module.add(series("vta_dff", [0], [0], cls=DeconvolvedFiberPhotometryResponseSeries, raw=vta))
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="w") as io:
+        io.write(nwbfile)
+    return tmp_path / "test.nwb"
+
+
+def _names(series):
+    return sorted(s.name for s in series)
+
+
+def test_get_response_series(path):
+    with NWBHDF5IO(path, mode="r") as io:
+        fiber_photometry = io.read().lab_meta_data["fiber_photometry"]
+        assert _names(fiber_photometry.get_response_series()) == ["nac_and_vta", "vta", "vta_470", "vta_dff"]
+        assert _names(fiber_photometry.get_response_series(fibers=1)) == ["nac_and_vta"]
+        assert _names(fiber_photometry.get_response_series(fibers=[0, 2])) == [
+            "nac_and_vta",
+            "vta",
+            "vta_470",
+            "vta_dff",
+        ]
+        # the fluorophores are referenced through the fibers table. A series matches when it references one of the
+        # rows of each table, e.g. nac_and_vta references a VTA fiber and a (NAc) fiber with dlight
+        vta = np.flatnonzero(fiber_photometry.fibers["location"].data[:] == "VTA")
+        dlight = np.flatnonzero(fiber_photometry.fluorophores["label"].data[:] == "dlight")
+        assert _names(fiber_photometry.get_response_series(fluorophores=dlight, fibers=vta)) == [
+            "nac_and_vta",
+            "vta",
+            "vta_470",
+            "vta_dff",
+        ]
+        assert _names(fiber_photometry.get_response_series(fluorophores=1)) == ["nac_and_vta"]
+        assert _names(fiber_photometry.get_response_series(photodetectors=0, excitation_sources=0)) == ["vta_470"]
+        assert fiber_photometry.get_response_series(excitation_sources=1) == []
+        # the index is built once
+        index = fiber_photometry._series_index
+        fiber_photometry.get_response_series(fibers=0)
+        assert fiber_photometry._series_index is index
+        fiber_photometry.get_response_series(fibers=0, rebuild=True)
+        assert fiber_photometry._series_index is not index
+
+
+def test_get_response_series_not_in_file():
+    fiber_photometry = FiberPhotometry(
+        fibers=FibersTable(description="fibers"),
+        excitation_sources=ExcitationSourcesTable(description="excitation sources"),
+        photodetectors=PhotodetectorsTable(description="photodetectors"),
+        fluorophores=FluorophoresTable(description="fluorophores"),
+    )
+    with pytest.raises(ValueError, match="not in an NWB file"):
+        fiber_photometry.get_response_series(fibers=0)
@@ -0,0 +1,118 @@
+import datetime
+import logging
+import threading
+
+import h5py
+import numpy as np
+import pytest
+from hdmf.backends.hdf5 import HDF5IO
+from hdmf.common import DynamicTable
+from pynwb import NWBHDF5IO, NWBFile
+
+from ndx_photometry import FibersTable, FiberPhotometryResponseSeries, Instrumentation, TimingEvent, instrument
+from ndx_photometry.instrumentation import _signature
+
+
+def _write_and_read(path):
+    nwbfile = NWBFile(
+        session_description="session_description",
+        identifier="identifier",
+        session_start_time=datetime.datetime.now(datetime.timezone.utc),
+    )
+    fibers_table = FibersTable(description="fibers table")
+    for location in ["VTA", "NAc"]:
+        fibers_table.add_row(location=location)
+    fibers_table.add_rows(location=["DMS", "DLS"])
+    nwbfile.create_processing_module(name="fibers", description="fibers").add(fibers_table)
+    series = FiberPhotometryResponseSeries(
+        name="response",
+        data=np.zeros((100, 4)),
+        unit="F",
+        rate=30.0,
+        fibers=fibers_table.create_fiber_region(region=[0, 1, 2, 3], description="fibers"),
+    )
+    nwbfile.add_acquisition(series)
+    with NWBHDF5IO(path, mode="w") as io:
+        io.write(nwbfile)
+    with NWBHDF5IO(path, mode="r") as io:
+        io.read().acquisition["response"].data[:50]
+
+
+def test_instrument_dict(tmp_path):
+    add_row, getitem = DynamicTable.add_row, h5py.Dataset.__getitem__
+    metrics = dict()
+    with instrument(metrics):
+        _write_and_read(tmp_path / "test.nwb")
+    assert metrics["add_row", "FibersTable"]["calls"] == 2
+    assert metrics["add_rows", "FibersTable"]["calls"] == 1
+    assert metrics["create_region", "FibersTable"]["calls"] == 1
+    # the series is constructed once in memory and once when read
+    assert metrics["construct", "FiberPhotometryResponseSeries"]["calls"] == 2
+    assert metrics["write", "FiberPhotometryResponseSeries"]["bytes"] >= 100 * 4 * 8
+    assert metrics["read", "FiberPhotometryResponseSeries"]["bytes"] >= 50 * 4 * 8
+    assert ("load_namespaces", None) in metrics
+    assert all(totals["seconds"] >= 0 for totals in metrics.values())
+    # the replaced methods are restored on exit
+    assert DynamicTable.add_row is add_row
+    assert h5py.Dataset.__getitem__ is getitem
+    n_calls = metrics["add_row", "FibersTable"]["calls"]
+    FibersTable(description="fibers table").add_row(location="VTA")
+    assert metrics["add_row", "FibersTable"]["calls"] == n_calls
+
+
+def test_instrument_callback_and_logger(tmp_path, caplog):
+    events = []
+    logger = logging.getLogger("test_instrumentation")
+    with caplog.at_level(logging.INFO, logger="test_instrumentation"):
+        with instrument(events.append), instrument(logger):
+            FibersTable(description="fibers table").add_rows(location=["VTA", "NAc"])
+    assert all(isinstance(event, TimingEvent) for event in events)
+    assert [(event.operation, event.neurodata_type) for event in events] == [
+        ("construct", "FibersTable"),
+        ("add_rows", "FibersTable"),
+    ]
+    assert [record.getMessage().split(":")[0] for record in caplog.records] == [
+        "construct FibersTable",
+        "add_rows FibersTable",
+    ]
+
+
+def test_instrument_startup():
+    metrics = dict()
+    with instrument(metrics, startup=True):
+        pass
+    assert metrics["load_namespaces", None]["calls"] == 1
+
+
+def test_instrument_twice():
+    instrumentation = Instrumentation(dict())
+    with instrumentation:
+        with pytest.raises(RuntimeError, match="already active"):
+            instrumentation.__enter__()
+
+
+def test_instrument_other_threads():
+    main_events, thread_events = [], []
+    fibers_table = FibersTable(description="fibers table")
+
+    def add_rows():
+        fibers_table.add_rows(location=["VTA"])
+
+    def add_rows_instrumented():
+        with instrument(thread_events.append):
+            add_rows()
+
+    with instrument(main_events.append):
+        # a thread that is not instrumented, and a thread with its own instrumentation
+        for target in (add_rows, add_rows_instrumented):
+            thread = threading.Thread(target=target)
+            thread.start()
+            thread.join()
+        add_rows()
+    assert [event.operation for event in main_events] == ["add_rows"]
+    assert [event.operation for event in thread_events] == ["add_rows"]
+
+
+@pytest.mark.parametrize("args, kwargs", [(("parent", "builder"), dict()), (("parent",), dict(builder="builder"))])
+def test_write_dataset_arguments(args, kwargs):
+    assert _signature(HDF5IO.write_dataset).bind_partial(None, *args, **kwargs).arguments["builder"] == "builder"
@@ -0,0 +1,102 @@
+import datetime
+
+import h5py
+import numpy as np
+import pandas as pd
+import pytest
+from hdmf.common import VectorData, VectorIndex
+from pynwb import NWBHDF5IO, NWBFile
+
+from ndx_photometry import FibersTable, RowReference
+
+from .test_export import nwbfile  # noqa: F401
+
+
+@pytest.fixture()
+def fibers_table(nwbfile, tmp_path):  # noqa: F811
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="w") as io:
+        io.write(nwbfile)
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="r") as io:
+        yield io.read().lab_meta_data["fiber_photometry"].fibers
+
+
+def test_read_rows_index(fibers_table):
+    df = fibers_table.read_rows(references="index")
+    assert list(df.index) == [0, 1, 2]
+    assert list(df["location"]) == ["VTA", "NAc", "DMS"]
+    np.testing.assert_array_equal(df["coordinates"][1], [3.0, 4.0, 5.0])
+    assert list(df["excitation_source"]) == [1, 0, 1]
+    assert [rows.tolist() for rows in df["fluorophores"]] == [[0, 2], [], [1]]
+    # same rows as the eager read
+    eager = fibers_table.to_dataframe(index=True)
+    assert list(df.columns) == list(eager.columns)
+    assert list(df["photodetector"]) == list(eager["photodetector"])
+
+
+@pytest.mark.parametrize("key, expected", [(1, [1]), (slice(1, None), [1, 2]), ([2, 0], [2, 0]), (-1, [2])])
+def test_read_rows_key(fibers_table, key, expected):
+    df = fibers_table.read_rows(key=key, references="index")
+    assert list(df.index) == expected
+    assert [rows.tolist() for rows in df["fluorophores"]] == [[[0, 2], [], [1]][i] for i in expected]
+
+
+def test_read_rows_proxy(fibers_table):
+    df = fibers_table.read_rows(key=[0, 2])
+    reference = df["fluorophores"][0]
+    assert isinstance(reference, RowReference)
+    assert reference.table.name == "fluorophores"
+    assert repr(reference) == "RowReference('fluorophores', [0, 2])"
+    fluorophores = reference.resolve()
+    assert isinstance(fluorophores, pd.DataFrame)
+    assert list(fluorophores["label"]) == ["dlight", "rcamp"]
+    assert list(df["fluorophores"][2].resolve()["label"]) == ["gcamp"]
+    assert list(df["excitation_source"][2].resolve()["peak_wavelength"]) == [405.0]
+    # the rows referenced by all the rows of the column are read at once
+    assert reference._resolver is df["fluorophores"][2]._resolver
+
+
+def test_read_rows_errors(fibers_table):
+    with pytest.raises(IndexError):
+        fibers_table.read_rows(key=3)
+    with pytest.raises(ValueError, match="references must be one of"):
+        fibers_table.read_rows(references="nested")
+
+
+def test_sparse_rows_are_read_in_runs(tmp_path, monkeypatch):
+    n_rows = 200_000
+    values = VectorData(name="values", description="values of each row", data=np.arange(n_rows, dtype=np.float64))
+    fibers = FibersTable(
+        description="fibers",
+        id=np.arange(n_rows),
+        columns=[
+            VectorData(name="location", description="location", data=np.arange(n_rows).astype(str)),
+            values,
+            VectorIndex(name="values_index", data=np.arange(1, n_rows + 1), target=values),
+        ],
+    )
+    session = NWBFile(
+        session_description="session_description",
+        identifier="identifier",
+        session_start_time=datetime.datetime.now(datetime.timezone.utc),
+    )
+    session.create_processing_module(name="fibers", description="fibers").add(fibers)
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="w") as io:
+        io.write(session)
+
+    sizes = []
+    getitem = h5py.Dataset.__getitem__
+
+    def record(self, key):
+        values = getitem(self, key)
+        sizes.append(np.asarray(values).nbytes)
+        return values
+
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="r") as io:
+        fibers = io.read().processing["fibers"][fibers.name]
+        monkeypatch.setattr(h5py.Dataset, "__getitem__", record)
+        df = fibers.read_rows(key=[0, n_rows - 1, 1])
+    assert list(df.index) == [0, n_rows - 1, 1]
+    assert list(df["location"]) == ["0", str(n_rows - 1), "1"]
+    assert [values.tolist() for values in df["values"]] == [[0.0], [n_rows - 1], [1.0]]
+    # the first and last rows are read apart, not the 1.6 MB of each column between them
+    assert 0 < max(sizes) <= 64 * 1024
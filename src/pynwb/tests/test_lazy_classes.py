@@ -0,0 +1,93 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+import ndx_photometry
+from ndx_photometry import photometry
+
+
+def run(code, runtime_classes=False):
+    env = dict(os.environ, NDX_PHOTOMETRY_RUNTIME_CLASSES="1" if runtime_classes else "0")
+    result = subprocess.run([sys.executable, "-c", textwrap.dedent(code)], env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return result.stdout.split()
+
+
+def test_import_generates_no_classes():
+    out = run(
+        """
+        import ndx_photometry
+        print(len(ndx_photometry.photometry._classes))
+        """,
+        runtime_classes=True,
+    )
+    assert out == ["0"]
+
+
+def test_classes_are_generated_on_first_access():
+    out = run(
+        """
+        from ndx_photometry import FibersTable
+        import ndx_photometry
+        print(hasattr(FibersTable, "create_fiber_region"))
+        print(",".join(sorted(ndx_photometry.photometry._classes)))
+        """,
+        runtime_classes=True,
+    )
+    assert out == ["True", "FibersTable"]
+
+
+@pytest.mark.parametrize("runtime_classes", [False, True])
+def test_read_before_access(tmp_path, runtime_classes):
+    path = str(tmp_path / "test.nwb")
+    out = run(
+        f"""
+        import datetime
+        from pynwb import NWBFile, NWBHDF5IO
+        import ndx_photometry
+
+        nwbfile = NWBFile(session_description="d", identifier="i",
+                          session_start_time=datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc))
+        fibers = ndx_photometry.FibersTable(description="fibers")
+        fibers.add_row(location="VTA")
+        nwbfile.add_lab_meta_data(ndx_photometry.FiberPhotometry(
+            fibers=fibers,
+            excitation_sources=ndx_photometry.ExcitationSourcesTable(description="sources"),
+            photodetectors=ndx_photometry.PhotodetectorsTable(description="photodetectors"),
+            fluorophores=ndx_photometry.FluorophoresTable(description="fluorophores"),
+        ))
+        with NWBHDF5IO({path!r}, "w") as io:
+            io.write(nwbfile)
+        """,
+        runtime_classes=runtime_classes,
+    )
+    out = run(
+        f"""
+        from pynwb import NWBHDF5IO
+        import ndx_photometry
+
+        with NWBHDF5IO({path!r}, "r") as io:
+            fibers = io.read().lab_meta_data["fiber_photometry"].fibers
+            print(fibers.create_fiber_region(region=[0], description="fiber").data)
+            print(type(fibers) is ndx_photometry.FibersTable)
+        with NWBHDF5IO({path!r}, "r") as io:
+            print(type(io.read().lab_meta_data["fiber_photometry"].fibers) is ndx_photometry.FibersTable)
+        """,
+        runtime_classes=runtime_classes,
+    )
+    assert out == ["[0]", "True", "True"]
+
+
+def test_same_class_from_package_and_module():
+    assert ndx_photometry.FibersTable is photometry.FibersTable
+    assert ndx_photometry.get_photometry_class("FibersTable") is ndx_photometry.FibersTable
+
+
+def test_unknown_attribute():
+    with pytest.raises(AttributeError):
+        ndx_photometry.NotAType
+    with pytest.raises(ValueError):
+        ndx_photometry.get_photometry_class("TimeSeries")
@@ -0,0 +1,78 @@
+import datetime
+
+import h5py
+import numpy as np
+from pynwb import NWBHDF5IO, NWBFile
+
+from ndx_photometry import CommandedVoltageSeries, FiberPhotometryResponseSeries, MultiCommandedVoltage, as_memmap
+
+
+def _write(path, compressed):
+    nwbfile = NWBFile(
+        session_description="session_description",
+        identifier="identifier",
+        session_start_time=datetime.datetime.now(datetime.timezone.utc),
+    )
+    series = FiberPhotometryResponseSeries(
+        name="MyFPRecording",
+        data=np.arange(3000, dtype=np.float32).reshape(1000, 3),
+        unit="F",
+        timestamps=np.arange(1000) / 30.0,
+    )
+    if compressed:
+        series.set_chunked_compression(rate=30.0)
+    nwbfile.add_acquisition(series)
+    commanded_voltages = MultiCommandedVoltage()
+    commanded_voltages.create_commanded_voltage_series(
+        name="commanded_voltage", data=np.sin(np.arange(100.0)), power=500.0, rate=30.0, unit="volts"
+    )
+    nwbfile.create_processing_module(name="photometry", description="photometry").add(commanded_voltages)
+    with NWBHDF5IO(path, mode="w") as io:
+        io.write(nwbfile)
+
+
+def test_read_data_memmap(tmp_path):
+    _write(tmp_path / "test.nwb", compressed=False)
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="r") as io:
+        nwbfile = io.read()
+        series = nwbfile.acquisition["MyFPRecording"]
+        data = series.read_data()
+        assert isinstance(data, np.memmap)
+        assert not data.flags.writeable
+        np.testing.assert_array_equal(data, np.arange(3000, dtype=np.float32).reshape(1000, 3))
+        timestamps = series.read_timestamps()
+        assert isinstance(timestamps, np.memmap)
+        np.testing.assert_array_equal(timestamps, np.arange(1000) / 30.0)
+
+        commanded_voltage = nwbfile.processing["photometry"]["commanded_voltages"]["commanded_voltage"]
+        assert isinstance(commanded_voltage, CommandedVoltageSeries)
+        data = commanded_voltage.read_data()
+        assert isinstance(data, np.memmap)
+        np.testing.assert_array_equal(data, np.sin(np.arange(100.0)))
+        assert commanded_voltage.read_timestamps() is None
+
+        assert not isinstance(series.read_data(memmap=False), np.memmap)
+
+
+def test_read_data_falls_back(tmp_path):
+    _write(tmp_path / "test.nwb", compressed=True)
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="r") as io:
+        series = io.read().acquisition["MyFPRecording"]
+        data = series.read_data()
+        assert type(data) is np.ndarray
+        np.testing.assert_array_equal(data, np.arange(3000, dtype=np.float32).reshape(1000, 3))
+        assert isinstance(series.read_timestamps(), np.memmap)
+
+
+def test_as_memmap(tmp_path):
+    with h5py.File(tmp_path / "test.h5", "w") as f:
+        f.create_dataset("contiguous", data=np.arange(10))
+        f.create_dataset("chunked", data=np.arange(10), chunks=(5,))
+        f.create_dataset("empty", shape=(10,), dtype=float)
+        f.create_dataset("text", data=["a", "b"])
+    with h5py.File(tmp_path / "test.h5", "r") as f:
+        np.testing.assert_array_equal(as_memmap(f["contiguous"]), np.arange(10))
+        assert as_memmap(f["chunked"]) is None
+        assert as_memmap(f["empty"]) is None
+        assert as_memmap(f["text"]) is None
+    assert as_memmap(np.arange(10)) is None
@@ -0,0 +1,185 @@
+import datetime
+
+import numpy as np
+import pytest
+from pynwb import NWBHDF5IO, NWBFile
+
+from ndx_photometry import (
+    DeconvolvedFiberPhotometryResponseSeries,
+    FiberPhotometryResponseSeries,
+    FibersTable,
+    compute_delta_f_over_f,
+    downsample,
+    fit_isosbestic,
+)
+from ndx_photometry.processing import _fir_decimate, lowpass_filter_taps
+
+
+@pytest.fixture()
+def traces():
+    rng = np.random.default_rng(0)
+    n_samples = 5000
+    control = 1.0 + 0.1 * np.sin(np.arange(n_samples) / 300.0)[:, None] + 0.01 * rng.standard_normal((n_samples, 2))
+    signal = control * [2.0, 0.5] + [0.5, 1.0] + 0.01 * rng.standard_normal((n_samples, 2))
+    return signal, control
+
+
+@pytest.mark.parametrize("block_size", [1000, 777, 10000])
+def test_fit_isosbestic(traces, block_size):
+    signal, control = traces
+    slopes, intercepts = fit_isosbestic(
+        signal=FiberPhotometryResponseSeries(name="signal", data=signal, unit="F", rate=100.0),
+        isosbestic=FiberPhotometryResponseSeries(name="isosbestic", data=control, unit="F", rate=100.0),
+        block_size=block_size,
+    )
+    for fiber in range(2):
+        expected_slope, expected_intercept = np.polyfit(control[:, fiber], signal[:, fiber], 1)
+        assert slopes[fiber] == pytest.approx(expected_slope)
+        assert intercepts[fiber] == pytest.approx(expected_intercept)
+
+
+def test_compute_delta_f_over_f(traces, tmp_path):
+    signal, control = traces
+    nwbfile = NWBFile(
+        session_description="session_description",
+        identifier="identifier",
+        session_start_time=datetime.datetime.now(datetime.timezone.utc),
+    )
+    fibers_table = FibersTable(description="fibers table")
+    fibers_table.add_rows(location=["VTA", "NAc"])
+    module = nwbfile.create_processing_module(name="ophys", description="fiber photometry")
+    module.add(fibers_table)
+    timestamps = np.arange(len(signal)) / 100.0
+    signal_series = FiberPhotometryResponseSeries(
+        name="signal",
+        data=signal,
+        unit="F",
+        timestamps=timestamps,
+        fibers=fibers_table.create_fiber_region(region=[0, 1], description="fibers"),
+    )
+    control_series = FiberPhotometryResponseSeries(name="isosbestic", data=control, unit="F", timestamps=signal_series)
+    nwbfile.add_acquisition(signal_series)
+    nwbfile.add_acquisition(control_series)
+    dff_series = compute_delta_f_over_f(signal=signal_series, isosbestic=control_series, block_size=1000)
+    module.add(dff_series)
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="w") as io:
+        io.write(nwbfile)
+
+    slopes, intercepts = fit_isosbestic(signal=signal_series, isosbestic=control_series)
+    fit = control * slopes + intercepts
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="r") as io:
+        dff_series = io.read().processing["ophys"]["DfOverF"]
+        assert isinstance(dff_series, DeconvolvedFiberPhotometryResponseSeries)
+        assert dff_series.raw.name == "signal"
+        assert dff_series.unit == "dF/F"
+        np.testing.assert_allclose(dff_series.data[:], (signal - fit) / fit, rtol=1e-5, atol=1e-6)
+        np.testing.assert_array_equal(dff_series.timestamps[:], timestamps)
+        assert dff_series.fibers.data[:].tolist() == [0, 1]
+        assert "isosbestic" in dff_series.deconvolution_filter.data[0]
+        assert f"slope {slopes[0]:.6g}" in dff_series.deconvolution_filter.data[0]
+
+
+def test_compute_delta_f_over_f_shape_mismatch():
+    with pytest.raises(ValueError, match="same shape"):
+        compute_delta_f_over_f(
+            signal=FiberPhotometryResponseSeries(name="signal", data=np.ones((10, 2)), unit="F", rate=10.0),
+            isosbestic=FiberPhotometryResponseSeries(name="isosbestic", data=np.ones((10, 1)), unit="F", rate=10.0),
+        )
+
+
+def _downsample_reference(data, factor, taps):
+    half = (len(taps) - 1) // 2
+    padded = np.concatenate([np.repeat(data[:1], half, axis=0), data, np.repeat(data[-1:], half, axis=0)])
+    filtered = np.stack([np.convolve(padded[:, i], taps, mode="valid") for i in range(data.shape[1])], axis=1)
+    return filtered[::factor]
+
+
+@pytest.mark.parametrize("n_samples, n_taps", [(10007, 201), (10000, 31)])
+def test_downsample(tmp_path, n_samples, n_taps):
+    rng = np.random.default_rng(1)
+    data = rng.standard_normal((n_samples, 3))
+    nwbfile = NWBFile(
+        session_description="session_description",
+        identifier="identifier",
+        session_start_time=datetime.datetime.now(datetime.timezone.utc),
+    )
+    source = FiberPhotometryResponseSeries(name="signal", data=data, unit="F", rate=1000.0, starting_time=2.0)
+    nwbfile.add_acquisition(source)
+    # buffers of a few hundred output samples, so that the result is computed over many block boundaries
+    downsampled = downsample(series=source, factor=10, n_taps=n_taps, buffer_gb=1e-5)
+    module = nwbfile.create_processing_module(name="ophys", description="fiber photometry")
+    module.add(downsampled)
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="w") as io:
+        io.write(nwbfile)
+
+    expected = _downsample_reference(data, 10, lowpass_filter_taps(10, n_taps))
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="r") as io:
+        downsampled = io.read().processing["ophys"]["signal_downsampled"]
+        assert isinstance(downsampled, DeconvolvedFiberPhotometryResponseSeries)
+        assert downsampled.raw.name == "signal"
+        assert downsampled.rate == 100.0
+        assert downsampled.starting_time == 2.0
+        assert downsampled.data.dtype == np.float64
+        np.testing.assert_allclose(downsampled.data[:], expected, atol=1e-10)
+        assert f"{n_taps} taps" in downsampled.downsampling_filter.data[0]
+        assert "cutoff 50 Hz" in downsampled.downsampling_filter.data[0]
+
+
+@pytest.mark.parametrize("factor, n_out", [(1, 500), (3, 7), (10, 1000), (50, 1)])
+@pytest.mark.parametrize("shape", [(), (3,)])
+def test_fir_decimate_fft(factor, n_out, shape):
+    rng = np.random.default_rng(2)
+    taps = lowpass_filter_taps(factor, 301)
+    block = rng.standard_normal((factor * (n_out - 1) + len(taps),) + shape)
+    for data in (block, block + 1j * rng.standard_normal(block.shape)):
+        expected = sum(tap * data[k : k + factor * (n_out - 1) + 1 : factor] for k, tap in enumerate(taps))
+        np.testing.assert_allclose(_fir_decimate(data, taps, factor, n_out), expected, atol=1e-12)
+
+
+def test_downsample_filter():
+    taps = lowpass_filter_taps(4, 81)
+    assert taps.sum() == pytest.approx(1.0)
+    response = np.abs(np.fft.rfft(taps, 4096))
+    frequencies = np.fft.rfftfreq(4096)
+    # the passband is kept and the frequencies that would alias are removed
+    assert response[frequencies < 0.08].min() > 0.99
+    assert response[frequencies > 0.16].max() < 0.01
+
+
+def test_downsample_deconvolved(traces, tmp_path):
+    signal, control = traces
+    nwbfile = NWBFile(
+        session_description="session_description",
+        identifier="identifier",
+        session_start_time=datetime.datetime.now(datetime.timezone.utc),
+    )
+    signal_series = FiberPhotometryResponseSeries(
+        name="signal", data=signal, unit="F", timestamps=np.arange(5000) / 100
+    )
+    control_series = FiberPhotometryResponseSeries(name="isosbestic", data=control, unit="F", timestamps=signal_series)
+    nwbfile.add_acquisition(signal_series)
+    nwbfile.add_acquisition(control_series)
+    dff_series = compute_delta_f_over_f(signal=signal_series, isosbestic=control_series)
+    with pytest.raises(ValueError, match="readable"):
+        downsample(series=dff_series, factor=5)
+    module = nwbfile.create_processing_module(name="ophys", description="fiber photometry")
+    module.add(dff_series)
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="w") as io:
+        io.write(nwbfile)
+
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="a") as io:
+        nwbfile = io.read()
+        dff_series = nwbfile.processing["ophys"]["DfOverF"]
+        downsampled = downsample(series=dff_series, factor=5, name="DfOverF_20Hz")
+        nwbfile.processing["ophys"].add(downsampled)
+        io.write(nwbfile)
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="r") as io:
+        ophys = io.read().processing["ophys"]
+        downsampled = ophys["DfOverF_20Hz"]
+        assert downsampled.raw.name == "signal"
+        assert downsampled.unit == "dF/F"
+        assert downsampled.data.dtype == np.float32
+        np.testing.assert_allclose(downsampled.timestamps[:], np.arange(0, 5000, 5) / 100)
+        assert downsampled.deconvolution_filter.data[0] == ophys["DfOverF"].deconvolution_filter.data[0]
+    with pytest.raises(ValueError, match="odd"):
+        downsample(series=signal_series, factor=5, n_taps=20)
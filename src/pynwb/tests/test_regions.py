@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from ndx_photometry import FibersTable, FluorophoresTable
+
+
+@pytest.fixture()
+def fibers_table():
+    fibers_table = FibersTable(description="fibers table")
+    fibers_table.add_rows(location=[f"site {i}" for i in range(5)])
+    return fibers_table
+
+
+@pytest.mark.parametrize("region", [[1, 3], (1, 3), np.array([1, 3]), np.array([1, 3], dtype=np.uint8)])
+def test_create_fiber_region(fibers_table, region):
+    fiber_region = fibers_table.create_fiber_region(region=region, description="source fibers")
+    assert fiber_region.name == "fibers"
+    assert fiber_region.table is fibers_table
+    assert fiber_region.data == [1, 3]
+    assert fiber_region.description == "source fibers"
+
+
+def test_create_fiber_region_from_slice(fibers_table):
+    fiber_region = fibers_table.create_fiber_region(region=slice(1, 4), description="source fibers")
+    assert fiber_region.data == [1, 2, 3]
+
+
+@pytest.mark.parametrize(
+    "region, data", [(slice(None), [0, 1, 2, 3, 4]), (slice(5, None), []), (slice(0, 5, 2), [0, 2, 4])]
+)
+def test_create_fiber_region_from_slice_bounds(fibers_table, region, data):
+    fiber_region = fibers_table.create_fiber_region(region=region, description="source fibers")
+    assert fiber_region.data == data
+
+
+def test_create_fiber_region_reuses_validation_without_sharing_data(fibers_table):
+    first = fibers_table.create_fiber_region(region=[0, 2], description="first")
+    second = fibers_table.create_fiber_region(region=[0, 2], description="second")
+    assert first.data == second.data
+    assert first.data is not second.data
+
+
+def test_appended_indices_are_still_validated(fibers_table):
+    fiber_region = fibers_table.create_fiber_region(region=[0], description="source fibers")
+    fiber_region.append(4)
+    with pytest.raises(IndexError):
+        fiber_region.append(5)
+
+
+@pytest.mark.parametrize(
+    "region", [[0, 5], [-1], slice(0, 6), slice(6, None), slice(-1, None), slice(0, -1), np.array([7])]
+)
+def test_create_fiber_region_out_of_range(fibers_table, region):
+    with pytest.raises(IndexError):
+        fibers_table.create_fiber_region(region=region, description="source fibers")
+
+
+def test_create_fiber_region_not_integers(fibers_table):
+    with pytest.raises(TypeError):
+        fibers_table.create_fiber_region(region=[0.5], description="source fibers")
+
+
+def test_create_fiber_regions(fibers_table):
+    fiber_regions = fibers_table.create_fiber_regions(
+        regions=[[0, 1], slice(2, 4), np.array([4])], description=["a", "b", "c"]
+    )
+    assert [fiber_region.data for fiber_region in fiber_regions] == [[0, 1], [2, 3], [4]]
+    assert [fiber_region.description for fiber_region in fiber_regions] == ["a", "b", "c"]
+
+
+def test_create_fiber_regions_from_array(fibers_table):
+    fiber_regions = fibers_table.create_fiber_regions(regions=np.arange(5).reshape(5, 1), description="single fiber")
+    assert [fiber_region.data for fiber_region in fiber_regions] == [[0], [1], [2], [3], [4]]
+    assert all(fiber_region.description == "single fiber" for fiber_region in fiber_regions)
+    with pytest.raises(IndexError):
+        fibers_table.create_fiber_regions(regions=np.array([[0, 5]]), description="single fiber")
+
+
+def test_create_fiber_regions_description_mismatch(fibers_table):
+    with pytest.raises(ValueError, match="descriptions"):
+        fibers_table.create_fiber_regions(regions=[[0], [1]], description=["a"])
+
+
+def test_create_fluorophore_regions():
+    fluorophores_table = FluorophoresTable(description="fluorophores")
+    fluorophores_table.add_rows(
+        label=["dlight", "gcamp"], excitation_peak_wavelength=[470.0, 470.0], emission_peak_wavelength=[516.0, 512.0]
+    )
+    fluorophore_regions = fluorophores_table.create_fluorophore_regions(regions=[[0], [0, 1]], description="f")
+    assert [region.name for region in fluorophore_regions] == ["fluorophores", "fluorophores"]
+    assert fluorophore_regions[1].data == [0, 1]
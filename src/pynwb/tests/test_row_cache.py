@@ -0,0 +1,135 @@
+import datetime
+
+import numpy as np
+import pytest
+from pynwb import NWBHDF5IO, NWBFile
+
+from ndx_photometry import (
+    ExcitationSourcesTable,
+    FiberPhotometry,
+    FiberPhotometryResponseSeries,
+    FibersTable,
+    FluorophoresTable,
+    PhotodetectorsTable,
+)
+
+# the tables that the regions of the fibers table reference are added to the same container after the region
+pytestmark = pytest.mark.filterwarnings("ignore:The linked table")
+
+
+def _nwbfile():
+    fluorophores = FluorophoresTable(description="fluorophores")
+    fluorophores.add_rows(
+        label=["dLight", "GCaMP"], excitation_peak_wavelength=[470.0, 480.0], emission_peak_wavelength=[516.0, 512.0]
+    )
+    excitation_sources = ExcitationSourcesTable(description="excitation sources")
+    excitation_sources.add_rows(peak_wavelength=[470.0, 405.0], source_type=["LED", "laser"])
+    photodetectors = PhotodetectorsTable(description="photodetectors")
+    photodetectors.add_row(peak_wavelength=500.0, type="PMT", gain=2.0)
+    fibers = FibersTable(description="fibers")
+    fibers.add_column("excitation_source", "the excitation source of each fiber", table=excitation_sources)
+    fibers.add_column("fluorophores", "the fluorophores of each fiber", table=fluorophores, index=True)
+    fibers.add_rows(location=["VTA", "NAc"], excitation_source=[1, 0], fluorophores=[[0, 1], [1]])
+    fiber_photometry = FiberPhotometry(
+        fibers=fibers,
+        excitation_sources=excitation_sources,
+        photodetectors=photodetectors,
+        fluorophores=fluorophores,
+    )
+    nwbfile = NWBFile(
+        session_description="session_description",
+        identifier="identifier",
+        session_start_time=datetime.datetime.now(datetime.timezone.utc),
+    )
+    nwbfile.add_lab_meta_data(fiber_photometry)
+    series = FiberPhotometryResponseSeries(
+        name="response",
+        data=np.zeros((10, 2)),
+        unit="F",
+        rate=1.0,
+        fibers=fibers.create_fiber_region(region=[0, 1], description="fibers"),
+        photodetectors=photodetectors.create_photodetector_region(region=[0, 0], description="photodetectors"),
+    )
+    nwbfile.add_acquisition(series)
+    return nwbfile
+
+
+@pytest.mark.parametrize("read", [False, True])
+def test_lookups(tmp_path, read):
+    nwbfile = _nwbfile()
+    if read:
+        with NWBHDF5IO(tmp_path / "test.nwb", mode="w") as io:
+            io.write(nwbfile)
+        io = NWBHDF5IO(tmp_path / "test.nwb", mode="r")
+        nwbfile = io.read()
+    fiber_photometry = nwbfile.lab_meta_data["fiber_photometry"]
+
+    assert fiber_photometry.get_row(row=0) == dict(id=0, location="VTA", excitation_source=1, fluorophores=[0, 1])
+    labels = [row["label"] for row in fiber_photometry.get_referenced_rows(row=0, column="fluorophores")]
+    assert labels == ["dLight", "GCaMP"]
+    source = fiber_photometry.get_referenced_rows(row=0, column="excitation_source")
+    assert source == [dict(id=1, peak_wavelength=405.0, source_type="laser")]
+    gains = [
+        row["gain"] for row in fiber_photometry.get_region_rows(region=nwbfile.acquisition["response"].photodetectors)
+    ]
+    assert gains == [2.0, 2.0]
+    assert fiber_photometry.get_row(row=1, table="fluorophores")["label"] == "GCaMP"
+    # rows 0 and 1 of the fibers, fluorophores, excitation source 1 and photodetector 0, and three region lookups
+    info = fiber_photometry.row_cache_info()
+    assert (info.misses, info.currsize) == (8, 8)
+    # the row of GCaMP and the photodetector were read once
+    assert info.hits == 2
+
+    # the returned rows can be modified without changing the cache
+    fiber_photometry.get_row(row=0)["location"] = "DMS"
+    assert fiber_photometry.get_row(row=0)["location"] == "VTA"
+    if read:
+        io.close()
+
+
+def test_invalidation_when_rows_are_added():
+    fiber_photometry = _nwbfile().lab_meta_data["fiber_photometry"]
+    fibers, fluorophores = fiber_photometry.fibers, fiber_photometry.fluorophores
+    fiber_photometry.get_referenced_rows(row=1, column="fluorophores")
+    fiber_photometry.get_row(row=0, table="excitation_sources")
+    assert fiber_photometry.row_cache_info().currsize == 3
+
+    fluorophores.add_row(label="jRGECO", excitation_peak_wavelength=560.0, emission_peak_wavelength=600.0)
+    fiber_photometry.get_row(row=0, table="excitation_sources")
+    assert fiber_photometry.row_cache_info().invalidations == 0
+    # the fluorophore row is read again, the region lookup of the fibers table is still cached
+    fiber_photometry.get_referenced_rows(row=1, column="fluorophores")
+    info = fiber_photometry.row_cache_info()
+    assert (info.hits, info.misses, info.invalidations) == (2, 4, 1)
+
+    fibers.add_rows(location=["DMS"], excitation_source=[0], fluorophores=[[2]])
+    assert fiber_photometry.get_referenced_rows(row=2, column="fluorophores")[0]["label"] == "jRGECO"
+    assert fiber_photometry.row_cache_info().invalidations == 2
+
+
+def test_size_bound_and_clear():
+    fiber_photometry = _nwbfile().lab_meta_data["fiber_photometry"]
+    fiber_photometry.clear_row_cache(maxsize=2)
+    for row in (0, 1, 0):
+        fiber_photometry.get_row(row=row, table="fluorophores")
+    fiber_photometry.get_row(row=0, table="excitation_sources")
+    # row 1 of the fluorophores was the least recently used
+    fiber_photometry.get_row(row=0, table="fluorophores")
+    fiber_photometry.get_row(row=1, table="fluorophores")
+    info = fiber_photometry.row_cache_info()
+    assert (info.hits, info.misses, info.maxsize, info.currsize) == (2, 4, 2, 2)
+
+    fiber_photometry.clear_row_cache()
+    assert fiber_photometry.row_cache_info() == (0, 0, 0, 2, 0)
+    fiber_photometry.clear_row_cache(maxsize=0)
+    fiber_photometry.get_row(row=0)
+    assert fiber_photometry.row_cache_info().currsize == 0
+
+    with pytest.raises(IndexError, match="out of range"):
+        fiber_photometry.get_row(row=2)
+    with pytest.raises(ValueError, match="is not a region"):
+        fiber_photometry.get_referenced_rows(row=0, column="location")
+    with pytest.raises(KeyError, match="no column"):
+        fiber_photometry.get_referenced_rows(row=0, column="missing")
+    with pytest.raises(ValueError, match="table must be"):
+        fiber_photometry.get_row(row=0, table="series")
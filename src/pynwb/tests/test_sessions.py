@@ -0,0 +1,142 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from hdmf.backends.hdf5 import HDF5IO
+from pynwb import NWBHDF5IO, NWBFile
+
+from ndx_photometry import (
+    CommandedVoltageSeries,
+    ExcitationSourcesTable,
+    FiberPhotometry,
+    FiberPhotometryResponseSeries,
+    FibersTable,
+    FluorophoresTable,
+    MultiCommandedVoltage,
+    PhotodetectorsTable,
+    instrument,
+    iter_sessions,
+    read_fiber_photometry,
+    read_session,
+)
+from ndx_photometry import sessions
+
+
+def _write_session(path, n_fibers):
+    nwbfile = NWBFile(
+        session_description="session_description",
+        identifier=str(path),
+        session_start_time=datetime.datetime.now(datetime.timezone.utc),
+    )
+    multi_commanded_voltage = MultiCommandedVoltage()
+    commanded_voltage = multi_commanded_voltage.add_commanded_voltage_series(
+        CommandedVoltageSeries(name="commanded_voltage", data=[1.0, 2.0], power=500.0, rate=30.0, unit="volts")
+    )
+    excitation_sources_table = ExcitationSourcesTable(description="excitation sources table")
+    excitation_sources_table.add_row(peak_wavelength=470.0, source_type="LED", commanded_voltage=commanded_voltage)
+    photodetectors_table = PhotodetectorsTable(description="photodetectors table")
+    photodetectors_table.add_row(peak_wavelength=500.0, type="PMT", gain=100.0)
+    fluorophores_table = FluorophoresTable(description="fluorophores")
+    fluorophores_table.add_rows(label=["dlight"], excitation_peak_wavelength=[470.0], emission_peak_wavelength=[516.0])
+    fibers_table = FibersTable(description="fibers table")
+    fibers_table.add_rows(location=[f"site {i}" for i in range(n_fibers)])
+    nwbfile.add_lab_meta_data(
+        FiberPhotometry(
+            fibers=fibers_table,
+            excitation_sources=excitation_sources_table,
+            photodetectors=photodetectors_table,
+            fluorophores=fluorophores_table,
+            commanded_voltages=multi_commanded_voltage,
+        )
+    )
+    nwbfile.add_acquisition(
+        FiberPhotometryResponseSeries(
+            name="MyFPRecording",
+            data=np.full((10, n_fibers), float(n_fibers)),
+            unit="F",
+            rate=30.0,
+            fibers=fibers_table.create_fiber_region(region=slice(0, n_fibers), description="source fibers"),
+        )
+    )
+    with NWBHDF5IO(path, mode="w") as io:
+        io.write(nwbfile)
+
+
+@pytest.fixture()
+def session_dir(tmp_path):
+    for n_fibers in range(1, 4):
+        _write_session(tmp_path / f"session{n_fibers}.nwb", n_fibers)
+    return tmp_path
+
+
+def test_read_session(session_dir):
+    result = read_session(path=session_dir / "session2.nwb", series=["MyFPRecording"])
+    assert result["path"] == str(session_dir / "session2.nwb")
+    assert list(result["fibers"]["location"]) == ["site 0", "site 1"]
+    assert list(result["excitation_sources"]["commanded_voltage"]) == ["commanded_voltage"]
+    assert list(result["fluorophores"]["label"]) == ["dlight"]
+    assert list(result["photodetectors"]["type"]) == ["PMT"]
+    np.testing.assert_array_equal(result["series"]["MyFPRecording"]["data"], np.full((10, 2), 2.0))
+    assert result["series"]["MyFPRecording"]["rate"] == 30.0
+    with pytest.raises(KeyError, match="no series named"):
+        read_session(path=session_dir / "session2.nwb", series=["missing"])
+
+
+def test_read_fiber_photometry(session_dir):
+    metrics = dict()
+    with NWBHDF5IO(session_dir / "session2.nwb", mode="r") as io:
+        with instrument(metrics):
+            fiber_photometry = read_fiber_photometry(io=io)
+        assert isinstance(fiber_photometry, FiberPhotometry)
+        assert list(fiber_photometry.fibers["location"][:]) == ["site 0", "site 1"]
+        commanded_voltage = fiber_photometry.excitation_sources["commanded_voltage"][0]
+        assert commanded_voltage is fiber_photometry.commanded_voltages["commanded_voltage"]
+        assert read_fiber_photometry(io=io, name="missing") is None
+        # the same objects as in the whole file
+        assert io.read().lab_meta_data["fiber_photometry"] is fiber_photometry
+    # the response series of the file are not constructed
+    assert ("construct", "FibersTable") in metrics
+    assert ("construct", "FiberPhotometryResponseSeries") not in metrics
+
+
+def test_read_ref_is_available():
+    # without it, the metadata and series are read by reading the whole file, which is correct but slow
+    assert hasattr(HDF5IO, sessions._READ_REF), "HDF5IO has no __read_ref, update ndx_photometry.sessions"
+
+
+@pytest.mark.parametrize("signature_changed", [False, True], ids=["removed", "signature_changed"])
+def test_read_session_without_read_ref(session_dir, monkeypatch, signature_changed):
+    # hdmf calls __read_ref itself when it reads the whole file, so only the name used by sessions is changed
+    expected = read_session(path=session_dir / "session2.nwb", series=["MyFPRecording"])
+    if signature_changed:
+        monkeypatch.setattr(HDF5IO, "_HDF5IO__read_ref_changed", lambda self, h5obj, path: None, raising=False)
+    monkeypatch.setattr(sessions, "_READ_REF", "_HDF5IO__read_ref_changed")
+    result = read_session(path=session_dir / "session2.nwb", series=["MyFPRecording"])
+    for name in ("fibers", "fluorophores", "excitation_sources", "photodetectors"):
+        pd.testing.assert_frame_equal(result[name], expected[name])
+    np.testing.assert_array_equal(
+        result["series"]["MyFPRecording"]["data"], expected["series"]["MyFPRecording"]["data"]
+    )
+    with NWBHDF5IO(session_dir / "session2.nwb", mode="r") as io:
+        assert list(read_fiber_photometry(io=io).fibers["location"][:]) == ["site 0", "site 1"]
+        assert read_fiber_photometry(io=io, name="missing") is None
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_iter_sessions(session_dir, max_workers):
+    results = list(iter_sessions(paths=session_dir, series=["MyFPRecording"], max_workers=max_workers))
+    assert sorted(result["path"] for result in results) == sorted(str(p) for p in session_dir.glob("*.nwb"))
+    for result in results:
+        n_fibers = len(result["fibers"])
+        np.testing.assert_array_equal(result["series"]["MyFPRecording"]["data"], np.full((10, n_fibers), n_fibers))
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_iter_sessions_errors(session_dir, max_workers):
+    (session_dir / "broken.nwb").write_bytes(b"not an hdf5 file")
+    with pytest.raises(OSError, match="broken.nwb"):
+        list(iter_sessions(paths=session_dir, max_workers=max_workers))
+    with pytest.warns(UserWarning, match="broken.nwb"):
+        results = list(iter_sessions(paths=session_dir, max_workers=max_workers, skip_errors=True))
+    assert len(results) == 3
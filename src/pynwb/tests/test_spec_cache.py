@@ -0,0 +1,109 @@
+import os
+import pickle
+import subprocess
+import sys
+
+import pytest
+
+from ndx_photometry import _spec_cache
+
+
+def run_import(cache_dir, code="import ndx_photometry"):
+    env = dict(os.environ, NDX_PHOTOMETRY_CACHE_DIR=str(cache_dir))
+    env.pop("NDX_PHOTOMETRY_NO_CACHE", None)
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+@pytest.fixture()
+def spec_dir(tmp_path):
+    namespace_path = os.path.join(os.path.dirname(_spec_cache.__file__), "..", "..", "..", "spec")
+    for name in ("ndx-photometry.namespace.yaml", "ndx-photometry.extensions.yaml"):
+        with open(os.path.join(namespace_path, name)) as src, open(tmp_path / name, "w") as dst:
+            dst.write(src.read())
+    return tmp_path
+
+
+def test_cache_is_created_and_reused(tmp_path):
+    run_import(tmp_path)
+    cached = os.listdir(tmp_path)
+    assert len(cached) == 1 and cached[0].endswith(".pkl")
+    mtime = os.path.getmtime(tmp_path / cached[0])
+
+    run_import(tmp_path)
+    assert os.listdir(tmp_path) == cached
+    assert os.path.getmtime(tmp_path / cached[0]) == mtime
+
+
+def test_corrupt_cache_is_rebuilt(tmp_path):
+    run_import(tmp_path)
+    (cached,) = os.listdir(tmp_path)
+    with open(tmp_path / cached, "wb") as f:
+        f.write(b"not a pickle")
+
+    out = run_import(tmp_path, "import ndx_photometry; print(ndx_photometry.FibersTable.__name__)")
+    assert out.strip() == "FibersTable"
+    assert os.path.getsize(tmp_path / cached) > len(b"not a pickle")
+
+
+def test_cached_spec_written_to_file_is_unchanged(tmp_path):
+    code = (
+        "import datetime, h5py\n"
+        "from pynwb import NWBFile, NWBHDF5IO\n"
+        "import ndx_photometry\n"
+        "nwbfile = NWBFile(session_description='d', identifier='i',\n"
+        "                  session_start_time=datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc))\n"
+        "with NWBHDF5IO({path!r}, 'w') as io:\n"
+        "    io.write(nwbfile)\n"
+        "with h5py.File({path!r}, 'r') as f:\n"
+        "    print(f['specifications/ndx-photometry/0.5.0/ndx-photometry.extensions'][()].decode())\n"
+    )
+    cache_dir = tmp_path / "cache"
+    without_cache = run_import(cache_dir, code.format(path=str(tmp_path / "first.nwb")))
+    with_cache = run_import(cache_dir, code.format(path=str(tmp_path / "second.nwb")))
+    assert without_cache == with_cache
+
+
+def test_cache_key_changes_with_spec(spec_dir):
+    namespace_path = str(spec_dir / "ndx-photometry.namespace.yaml")
+    key = _spec_cache.get_cache_key(namespace_path)
+    assert _spec_cache.get_cache_key(namespace_path) == key
+
+    with open(spec_dir / "ndx-photometry.extensions.yaml", "a") as f:
+        f.write("\n# edited\n")
+    assert _spec_cache.get_cache_key(namespace_path) != key
+
+
+def test_cache_that_fails_to_register_is_rebuilt(tmp_path):
+    run_import(tmp_path)
+    (cached,) = os.listdir(tmp_path)
+    with open(tmp_path / cached, "rb") as f:
+        payload = pickle.load(f)
+    # the namespace is added to the catalog, then registering the unknown type fails
+    payload["source_types"].append("NotANeurodataType")
+    with open(tmp_path / cached, "wb") as f:
+        pickle.dump(payload, f)
+
+    code = (
+        "import ndx_photometry\n"
+        "table = ndx_photometry.FibersTable(description='fibers')\n"
+        "table.add_row(location='VTA')\n"
+        "print(len(table))"
+    )
+    assert run_import(tmp_path, code).strip() == "1"
+    with open(tmp_path / cached, "rb") as f:
+        assert "NotANeurodataType" not in pickle.load(f)["source_types"]
+
+
+def test_caches_of_other_versions_are_kept(tmp_path):
+    # the cache of an environment with other library versions, and an older cache of this spec and these versions
+    other = tmp_path / "namespace-0123456789abcdef-0123456789abcdef0123456789abcdef.pkl"
+    other.write_bytes(b"other versions")
+    run_import(tmp_path)
+    (cached,) = [name for name in os.listdir(tmp_path) if name != other.name]
+    stale = tmp_path / (cached.rsplit("-", 1)[0] + "-" + "0" * 32 + ".pkl")
+    stale.write_bytes(b"older spec")
+    os.remove(tmp_path / cached)
+    run_import(tmp_path)
+    assert sorted(os.listdir(tmp_path)) == sorted([other.name, cached])
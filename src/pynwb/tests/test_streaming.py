@@ -0,0 +1,113 @@
+import datetime
+
+import h5py
+import numpy as np
+import pytest
+from pynwb import NWBHDF5IO, NWBFile
+
+from ndx_photometry import FibersTable, ResponseSeriesStream
+
+
+def _blocks(n_blocks, block_size=100, n_fibers=2, timestamps=True, consumed=None):
+    for i in range(n_blocks):
+        if consumed is not None:
+            consumed.append(i)
+        data = np.arange(i * block_size, (i + 1) * block_size, dtype=np.float32)[:, None].repeat(n_fibers, axis=1)
+        if timestamps:
+            yield data, np.arange(i * block_size, (i + 1) * block_size) / 100.0
+        else:
+            yield data
+
+
+def _write(path, stream, exhaust_dci=True, **kwargs):
+    nwbfile = NWBFile(
+        session_description="session_description",
+        identifier="identifier",
+        session_start_time=datetime.datetime.now(datetime.timezone.utc),
+    )
+    fibers_table = FibersTable(description="fibers table")
+    fibers_table.add_rows(location=["site 0", "site 1"])
+    nwbfile.create_processing_module(name="fibers", description="fibers").add(fibers_table)
+    series = stream.create_series(
+        name="MyFPRecording",
+        unit="F",
+        fibers=fibers_table.create_fiber_region(region=[0, 1], description="source fibers"),
+        **kwargs,
+    )
+    nwbfile.add_acquisition(series)
+    with NWBHDF5IO(path, mode="w") as io:
+        io.write(nwbfile, exhaust_dci=exhaust_dci)
+    return series
+
+
+@pytest.mark.parametrize("exhaust_dci", [True, False])
+def test_stream_with_timestamps(tmp_path, exhaust_dci):
+    consumed = []
+    stream = ResponseSeriesStream(blocks=_blocks(25, consumed=consumed))
+    # only the first block is read before the file is written
+    assert consumed == [0]
+    _write(tmp_path / "test.nwb", stream, exhaust_dci=exhaust_dci)
+    assert consumed == list(range(25))
+    assert stream.n_samples == 2500
+    assert stream.last_timestamp == 24.99
+
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="r") as io:
+        series = io.read().acquisition["MyFPRecording"]
+        np.testing.assert_array_equal(series.data[:, 0], np.arange(2500))
+        np.testing.assert_array_equal(series.timestamps[:], np.arange(2500) / 100.0)
+
+
+def test_stream_with_rate_and_compression(tmp_path):
+    stream = ResponseSeriesStream(blocks=_blocks(10, timestamps=False), rate=100.0)
+    series = stream.create_series(
+        name="MyFPRecording",
+        unit="F",
+        fibers=FibersTable(description="fibers table").create_fiber_region(region=[], description="fibers"),
+    )
+    assert series.rate == 100.0
+    assert series.timestamps is None
+
+    stream = ResponseSeriesStream(blocks=_blocks(10, timestamps=False), rate=100.0, chunk_bytes=2 * 4 * 300)
+    series = _write(tmp_path / "test.nwb", stream, starting_time=5.0)
+    with h5py.File(tmp_path / "test.nwb", "r") as f:
+        assert f["acquisition/MyFPRecording/data"].shape == (1000, 2)
+        assert f["acquisition/MyFPRecording/data"].chunks == (300, 2)
+        assert f["acquisition/MyFPRecording/starting_time"][()] == 5.0
+
+
+def test_stream_set_chunked_compression(tmp_path):
+    stream = ResponseSeriesStream(blocks=_blocks(10))
+    nwbfile = NWBFile(
+        session_description="session_description",
+        identifier="identifier",
+        session_start_time=datetime.datetime.now(datetime.timezone.utc),
+    )
+    series = stream.create_series(name="MyFPRecording", unit="F")
+    with pytest.raises(ValueError, match="pass the sampling rate"):
+        series.set_chunked_compression()
+    series.set_chunked_compression(rate=100.0)
+    nwbfile.add_acquisition(series)
+    with NWBHDF5IO(tmp_path / "test.nwb", mode="w") as io:
+        io.write(nwbfile)
+    with h5py.File(tmp_path / "test.nwb", "r") as f:
+        assert f["acquisition/MyFPRecording/data"].compression == "gzip"
+        assert f["acquisition/MyFPRecording/data"].shape == (1000, 2)
+
+
+def test_stream_errors():
+    with pytest.raises(ValueError, match="empty"):
+        ResponseSeriesStream(blocks=iter([]))
+    with pytest.raises(ValueError, match="pairs"):
+        ResponseSeriesStream(blocks=_blocks(1, timestamps=False))
+    with pytest.raises(ValueError, match="timestamps for a block"):
+        ResponseSeriesStream(blocks=[(np.zeros((3, 2)), np.arange(2))])
+
+    stream = ResponseSeriesStream(blocks=[(np.zeros((3, 2)), np.arange(3)), (np.zeros((3, 2)), np.arange(3))])
+    next(stream.data)
+    with pytest.raises(ValueError, match="strictly increasing"):
+        next(stream.data)
+
+    stream = ResponseSeriesStream(blocks=[np.zeros((3, 2)), np.zeros((3, 3))], rate=10.0)
+    next(stream.data)
+    with pytest.raises(ValueError, match="does not match"):
+        next(stream.data)
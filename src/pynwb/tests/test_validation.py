@@ -0,0 +1,79 @@
+import h5py
+import numpy as np
+import pytest
+from pynwb import NWBHDF5IO
+
+from ndx_photometry import FiberPhotometryResponseSeries, Violation, validate_references
+
+from .test_export import nwbfile  # noqa: F401
+
+
+@pytest.fixture()
+def path(nwbfile, tmp_path):  # noqa: F811
+    fiber_photometry = nwbfile.lab_meta_data["fiber_photometry"]
+    nwbfile.add_acquisition(
+        FiberPhotometryResponseSeries(
+            name="response",
+            data=np.zeros((100, 2)),
+            unit="F",
+            rate=30.0,
+            fibers=fiber_photometry.fibers.create_fiber_region(region=[0, 2], description="fibers"),
+            excitation_sources=fiber_photometry.excitation_sources.create_excitation_source_region(
+                region=[1], description="source"
+            ),
+        )
+    )
+    path = tmp_path / "test.nwb"
+    with NWBHDF5IO(path, mode="w") as io:
+        io.write(nwbfile)
+    return path
+
+
+def test_validate_references(path):
+    assert validate_references(paths=path) == []
+    # the directory of the file, read one row at a time
+    assert validate_references(paths=path.parent, chunk_rows=1) == []
+
+
+def test_validate_references_violations(path):
+    with h5py.File(path, mode="r+") as file:
+        fibers = file["general/fiber_photometry/fibers"]
+        fibers["excitation_source"][2] = 5
+        fibers["fluorophores"][0] = -1
+        fibers["fluorophores_index"][1] = 0
+        series = file["acquisition/response"]
+        series["excitation_sources"].attrs["table"] = fibers.ref
+        del series["fibers"]
+        series["fibers"] = np.array([0, 7, 1])
+        series["fibers"].attrs["neurodata_type"] = "DynamicTableRegion"
+        series["fibers"].attrs["table"] = fibers.ref
+    violations = validate_references(paths=[path], chunk_rows=2)
+    assert all(isinstance(violation, Violation) and violation.path == str(path) for violation in violations)
+    messages = {violation.location: violation.message for violation in violations}
+    assert messages["/general/fiber_photometry/fibers/excitation_source"] == (
+        "1 values are out of range for '/general/fiber_photometry/excitation_sources', which has 2 rows, "
+        "first at positions [2]"
+    )
+    assert messages["/general/fiber_photometry/fibers/fluorophores"].startswith("1 values are out of range")
+    assert messages["/general/fiber_photometry/fibers/fluorophores_index"] == (
+        "1 offsets decrease or are past the 3 values of the column, first at rows [1]"
+    )
+    assert messages["/acquisition/response/excitation_sources"] == (
+        "references FibersTable '/general/fiber_photometry/fibers' instead of a table of type ExcitationSourcesTable"
+    )
+    fibers_messages = [v.message for v in violations if v.location == "/acquisition/response/fibers"]
+    assert fibers_messages == [
+        "1 values are out of range for '/general/fiber_photometry/fibers', which has 3 rows, first at positions [1]",
+        "references 3 fibers, the data has 2 columns of fibers",
+    ]
+    assert len(violations) == 6
+
+
+def test_validate_references_unreadable(tmp_path):
+    (tmp_path / "broken.nwb").write_bytes(b"not an hdf5 file")
+    violations = validate_references(paths=tmp_path)
+    assert [(violation.location, violation.message.split(":")[0]) for violation in violations] == [
+        ("/", "the file cannot be opened")
+    ]
+    with pytest.raises(ValueError, match="chunk_rows"):
+        validate_references(paths=tmp_path, chunk_rows=0)
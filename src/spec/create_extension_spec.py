@@ -11,6 +11,8 @@ from pynwb.spec import (
     NWBLinkSpec,
 )
 
+from generate_classes import main as generate_classes
+
 
 def main():
     # these arguments were auto-generated from your cookiecutter inputs
@@ -371,6 +373,9 @@ def main():
     output_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "spec"))
     export_spec(ns_builder, new_data_types, output_dir)
 
+    # generate the Python classes of the types from the exported spec
+    generate_classes()
+
 
 if __name__ == "__main__":
     # usage: python create_extension_spec.py
@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""Generate the Python classes of the ndx-photometry neurodata types from the spec files.
+
+PyNWB generates the class of each neurodata type of an extension at runtime, from its spec. This script generates
+the same classes ahead of time, as Python source with explicit constructors, in
+``src/pynwb/ndx_photometry/_generated.py``. The fields, columns and constructor arguments of each class are the ones
+that hdmf generates at runtime, so both are interchangeable.
+
+usage: python generate_classes.py [--check]
+
+With ``--check``, the file is not written and the script fails if it is not up to date with the spec files. The
+classes depend on the versions of hdmf and pynwb they were generated with, which are recorded in the file, and are
+only used with these versions. With other versions installed, ``--check`` only compares the hash of the spec files.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import re
+import sys
+import textwrap
+from copy import deepcopy
+
+import hdmf
+import pynwb
+from hdmf.build.classgenerator import CustomClassGenerator, MCIClassGenerator
+from hdmf.build.objectmapper import ObjectMapper
+from hdmf.common.io.table import DynamicTableGenerator
+from hdmf.spec import GroupSpec
+from hdmf.utils import get_docval
+from pynwb import get_type_map
+
+NAMESPACE = "ndx-photometry"
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+NAMESPACE_PATH = os.path.join(ROOT, "spec", "ndx-photometry.namespace.yaml")
+OUTPUT_PATH = os.path.join(ROOT, "src", "pynwb", "ndx_photometry", "_generated.py")
+LINE_LENGTH = 120
+# the generators that hdmf applies to each field of a spec, by priority
+GENERATORS = (DynamicTableGenerator, MCIClassGenerator, CustomClassGenerator)
+
+# the argument that hdmf adds at the end of the constructor arguments of every generated class
+SKIP_POST_INIT = {"name": "skip_post_init", "type": bool, "doc": "bool to skip post_init", "default": False}
+
+HEADER = '''\
+"""The classes of the ndx-photometry neurodata types, generated from the spec files by
+``src/spec/generate_classes.py``. Do not edit this file, run ``python src/spec/create_extension_spec.py`` instead.
+
+The fields, columns and constructor arguments of each class are the ones that hdmf generates at runtime from the
+spec, with the versions of hdmf and pynwb below. With other versions, the classes are generated at runtime instead.
+"""
+'''
+
+HELPERS = '''\
+def _inherited(base, required, exclude=()):
+    """Return the required or the optional constructor arguments of a base class, except the excluded ones."""
+    args = get_docval(base.__init__)
+    return [arg for arg in args if ("default" not in arg) == required and arg["name"] not in exclude]
+'''
+
+
+def _load_spec_cache():
+    # import the module by path, importing the package would load the namespace and register its classes
+    path = os.path.join(ROOT, "src", "pynwb", "ndx_photometry", "_spec_cache.py")
+    spec = importlib.util.spec_from_file_location("_ndx_photometry_spec_cache", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class _Writer:
+    """Render Python values as source, recording the imports that they need."""
+
+    def __init__(self, own_types):
+        self.own_types = own_types
+        self.imports = dict()
+
+    def name(self, cls):
+        if getattr(cls, "namespace", None) == NAMESPACE and cls.__name__ in self.own_types:
+            return cls.__name__
+        if cls.__module__ == "builtins":
+            return cls.__name__
+        if cls.__module__.split(".")[0] == "numpy":
+            self.imports.setdefault("numpy as np", None)
+            return f"np.{cls.__name__}"
+        self.imports.setdefault(cls.__module__, set()).add(cls.__name__)
+        return cls.__name__
+
+    def value(self, value):
+        if isinstance(value, type):
+            return self.name(value)
+        if isinstance(value, str):
+            return _string(value)
+        if isinstance(value, tuple):
+            items = [self.value(item) for item in value]
+            return f"({items[0]},)" if len(items) == 1 else f"({', '.join(items)})"
+        if isinstance(value, list):
+            return f"[{', '.join(self.value(item) for item in value)}]"
+        if isinstance(value, dict):
+            return "{" + ", ".join(f"{self.value(k)}: {self.value(v)}" for k, v in value.items()) + "}"
+        if value is None or isinstance(value, (bool, int, float)):
+            return repr(value)
+        raise TypeError(f"cannot render {value!r}")
+
+    def item(self, key, value, indent):
+        """Render one item of a dict, splitting a long string over several lines."""
+        prefix = " " * indent + f"{json.dumps(key)}: "
+        line = prefix + self.value(value) + ","
+        if len(line) <= LINE_LENGTH or not isinstance(value, str):
+            return [line]
+        width = LINE_LENGTH - len(prefix) - 2
+        words = textwrap.wrap(value, width=width, drop_whitespace=False, break_long_words=False)
+        lines = [prefix + _string(words[0])]
+        lines += [" " * indent + _string(word) for word in words[1:]]
+        return lines[:-1] + [lines[-1] + ","]
+
+    def dict(self, value, indent):
+        """Render a dict on one line if it fits, one item per line otherwise."""
+        line = " " * indent + self.value(value) + ","
+        if len(line) <= LINE_LENGTH:
+            return [line]
+        lines = [" " * indent + "{"]
+        for key, item in value.items():
+            lines += self.item(key, item, indent + 4)
+        return lines + [" " * indent + "},"]
+
+    def sequence(self, name, values, indent):
+        """Render the assignment of a list or tuple of dicts, one dict per line."""
+        opening, closing = ("[", "]") if isinstance(values, list) else ("(", ")")
+        lines = [" " * indent + f"{name} = {opening}"]
+        for value in values:
+            lines += self.dict(value, indent + 4)
+        return lines + [" " * indent + closing]
+
+
+def _new_fields(spec, attr_names):
+    """Return the fields defined by a spec and not by the spec of its parent type, as hdmf does."""
+    fields = dict()
+    for name, field_spec in attr_names.items():
+        if isinstance(field_spec, GroupSpec) and field_spec.data_type is None:
+            continue
+        if not spec.is_inherited_spec(field_spec):
+            fields[name] = field_spec
+    return fields
+
+
+def _class_source(writer, type_map, spec):
+    """Return the source of the class of a neurodata type."""
+    neurodata_type = spec.data_type_def
+    base = type_map.get_dt_container_cls(spec.data_type_inc, NAMESPACE)
+    fields = _new_fields(spec, ObjectMapper.get_attr_names(spec))
+    classdict, bases, docval_args = dict(), [base], deepcopy(list(get_docval(base.__init__)))
+    base_args = [arg["name"] for arg in docval_args]
+    for name in fields:
+        for generator in GENERATORS:
+            if generator.apply_generator_to_field(fields[name], bases, type_map):
+                generator.process_field_spec(classdict, docval_args, base, name, fields, type_map, spec)
+                break
+    for generator in GENERATORS:
+        generator.post_process(classdict, bases, docval_args, spec)
+    new_args = [arg for arg in docval_args if arg not in get_docval(base.__init__)]
+    columns = [column["name"] for column in classdict.get("__columns__", ())]
+    fixed = {name: field.value for name, field in fields.items() if getattr(field, "value", None) is not None}
+    to_set = [name for name in fields if name not in fixed and name not in base_args and name not in columns]
+    exclude = [arg["name"] for arg in new_args if arg["name"] in base_args]
+    # hdmf moves skip_post_init to the end of the arguments of each generated class
+    if "skip_post_init" in base_args:
+        exclude.append("skip_post_init")
+    if spec.name is not None:
+        exclude.append("name")
+
+    lines = [f"class {neurodata_type}({', '.join(writer.name(cls) for cls in bases)}):"]
+    doc = textwrap.fill(spec.doc.strip(), width=LINE_LENGTH - 7, subsequent_indent="    ")
+    lines += [f'    """{doc}"""', ""]
+    for key in (base._fieldsname, "__columns__", "__clsconf__"):
+        if classdict.get(key):
+            lines += writer.sequence(key, classdict[key], 4)
+            lines.append("")
+
+    exclude_source = f", exclude=({', '.join(json.dumps(name) for name in exclude)},)" if exclude else ""
+    decorator = ["    @docval("]
+    decorator.append(f"        *_inherited({writer.name(base)}, True{exclude_source}),")
+    for arg in new_args:
+        if "default" not in arg:
+            decorator += writer.dict(_ordered(arg), 8)
+    decorator.append(f"        *_inherited({writer.name(base)}, False{exclude_source}),")
+    for arg in new_args:
+        if "default" in arg:
+            decorator += writer.dict(_ordered(arg), 8)
+    decorator += writer.dict(SKIP_POST_INIT, 8)
+    lines += decorator + ["    )", "    def __init__(self, **kwargs):"]
+    # the classes have no post_init_method, as the classes that pynwb generates for the extension
+    lines.append('        popargs("skip_post_init", kwargs)')
+    if to_set:
+        lines += _call(f"{', '.join(to_set)} = popargs", [json.dumps(name) for name in to_set] + ["kwargs"], 8)
+    name_source = f"name={json.dumps(spec.name)}, " if spec.name is not None else ""
+    lines.append(f"        super().__init__({name_source}**kwargs)")
+    lines += [f"        self.{name} = {name}" for name in to_set]
+    # the setters of fields with fixed values do not allow setting them
+    lines += [f"        self.fields[{json.dumps(name)}] = {writer.value(value)}" for name, value in fixed.items()]
+    return lines
+
+
+def _call(function, args, indent):
+    """Render a call on one line if it fits, with its arguments on the next line or one per line otherwise."""
+    line = " " * indent + f"{function}({', '.join(args)})"
+    if len(line) <= LINE_LENGTH:
+        return [line]
+    inner = " " * (indent + 4) + ", ".join(args)
+    if len(inner) <= LINE_LENGTH:
+        return [" " * indent + f"{function}(", inner, " " * indent + ")"]
+    return [" " * indent + f"{function}("] + [" " * (indent + 4) + f"{arg}," for arg in args] + [" " * indent + ")"]
+
+
+def _string(value):
+    """Render a string with double quotes, or with single quotes if it contains double quotes only, as black does."""
+    if '"' in value and "'" not in value:
+        return "'" + json.dumps(value)[1:-1].replace('\\"', '"') + "'"
+    return json.dumps(value)
+
+
+def _ordered(arg):
+    """Order the keys of a docval argument as in the rest of the package."""
+    keys = ["name", "type", "doc", "shape", "default"]
+    return {key: arg[key] for key in keys + sorted(set(arg) - set(keys)) if key in arg}
+
+
+def _in_dependency_order(type_map, specs):
+    """Sort the specs so that every type comes after the types that it extends or references."""
+    ordered = []
+
+    def visit(spec):
+        if spec in ordered:
+            return
+        dependencies = [spec.data_type_inc]
+        for field_spec in ObjectMapper.get_attr_names(spec).values():
+            dependencies.append(getattr(field_spec, "data_type", None) or getattr(field_spec, "target_type", None))
+        for dependency in dependencies:
+            if dependency in specs and dependency != spec.data_type_def:
+                visit(specs[dependency])
+        ordered.append(spec)
+
+    for spec in specs.values():
+        visit(spec)
+    return ordered
+
+
+def generate():
+    """Return the source of the module of the generated classes."""
+    type_map = get_type_map()
+    type_map.load_namespaces(NAMESPACE_PATH)
+    namespace = type_map.namespace_catalog.get_namespace(NAMESPACE)
+    sources = namespace.get_source_files()
+    # the registered types include the types of the included namespaces
+    specs = {
+        name: namespace.get_spec(name)
+        for name in namespace.get_registered_types()
+        if namespace.catalog.get_spec_source_file(name) in sources
+    }
+    writer = _Writer(set(specs))
+    classes = [_class_source(writer, type_map, spec) for spec in _in_dependency_order(type_map, specs)]
+    writer.imports.setdefault("hdmf.utils", set()).update(("docval", "get_docval", "popargs"))
+
+    spec_hash = _load_spec_cache().get_spec_hash(NAMESPACE_PATH)
+    lines = HEADER.splitlines() + [""]
+    plain = [f"import {module}" for module in writer.imports if writer.imports[module] is None]
+    lines += sorted(plain)
+    for module in sorted(name for name in writer.imports if writer.imports[name] is not None):
+        lines.append(f"from {module} import {', '.join(sorted(writer.imports[module]))}")
+    lines += [
+        "",
+        "# the hash of the spec files, and the versions of hdmf and pynwb, that the classes were generated from",
+    ]
+    lines += [f'SPEC_HASH = "{spec_hash}"', f'HDMF_VERSION = "{hdmf.__version__}"']
+    lines += [f'PYNWB_VERSION = "{pynwb.__version__}"']
+    lines += ["", ""] + HELPERS.splitlines()
+    for source in classes:
+        lines += ["", ""] + source
+    return "\n".join(lines) + "\n"
+
+
+def _constant(source, name):
+    """Return the value of a string constant of the source of the generated module, or None."""
+    match = re.search(rf'^{name} = "(.*)"$', source or "", flags=re.MULTILINE)
+    return None if match is None else match.group(1)
+
+
+def is_up_to_date(current):
+    """Return whether the current source of the generated module is the source generated from the spec files.
+
+    If it was generated with other versions of hdmf or pynwb than the installed ones, it cannot be generated again
+    here and only the hash of the spec files is compared.
+    """
+    if current is None:
+        return False
+    versions = [_constant(current, "HDMF_VERSION"), _constant(current, "PYNWB_VERSION")]
+    if versions != [hdmf.__version__, pynwb.__version__]:
+        return _constant(current, "SPEC_HASH") == _load_spec_cache().get_spec_hash(NAMESPACE_PATH)
+    return current == generate()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--check", action="store_true", help="fail if the generated file is not up to date")
+    args = parser.parse_args(argv)
+    if args.check:
+        try:
+            with open(OUTPUT_PATH, encoding="utf-8") as f:
+                current = f.read()
+        except FileNotFoundError:
+            current = None
+        if not is_up_to_date(current):
+            print(f"{OUTPUT_PATH} is not up to date with the spec, run: python src/spec/generate_classes.py")
+            return 1
+        return 0
+    source = generate()
+    with open(OUTPUT_PATH, "w", encoding="utf-8") as f:
+        f.write(source)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())